@@ -57,3 +57,11 @@ def can_translate_language(user, langid):
             raise ImproperlyConfigured('If you are using custom User Models you must '
                                        'implement a custom authentication method for Mobetta.')
         raise
+
+
+def get_translatable_languages(user):
+    """
+    Return the codes of the languages in ``LANGUAGES`` that ``user`` can
+    translate.
+    """
+    return [code for code, name in settings.LANGUAGES if can_translate_language(user, code)]
@@ -1,9 +1,16 @@
 from django.contrib import admin
 
-from .models import TranslationFile
+from .models import Job, TranslationFile
 
 
 @admin.register(TranslationFile)
 class TranslationFileAdmin(admin.ModelAdmin):
     list_display = ['name', 'filepath', 'language_code']
     list_filter = ['language_code', 'is_valid']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'progress', 'total', 'created', 'finished']
+    list_filter = ['name', 'status']
+    readonly_fields = ['started', 'finished', 'updated']
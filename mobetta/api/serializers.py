@@ -1,13 +1,17 @@
 from rest_framework import serializers
 
-from mobetta.models import MessageComment, TranslationFile
+from mobetta.models import Job, MessageComment, TranslationFile
 
 
 class TranslationFileSerializer(serializers.HyperlinkedModelSerializer):
+    statistics = serializers.SerializerMethodField()
 
     class Meta:
         model = TranslationFile
-        fields = ('name', 'filepath', 'language_code')
+        fields = ('name', 'filepath', 'language_code', 'statistics')
+
+    def get_statistics(self, instance):
+        return instance.get_statistics()
 
 
 class MessageCommentSerializer(serializers.HyperlinkedModelSerializer):
@@ -31,3 +35,33 @@ class MessageCommentSerializer(serializers.HyperlinkedModelSerializer):
 
     def get_user_name(self, instance):
         return str(instance.user)
+
+
+class JobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'progress', 'total', 'result', 'created', 'started', 'finished')
+
+
+class SearchResultSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    file_id = serializers.IntegerField()
+    file_name = serializers.CharField()
+    language_code = serializers.CharField()
+    msghash = serializers.CharField()
+    msgctxt = serializers.CharField()
+    msgid = serializers.CharField()
+    msgstr = serializers.CharField()
+    occurrences = serializers.CharField()
+    url = serializers.CharField(source='get_file_url')
+
+
+class MemoryMatchSerializer(serializers.Serializer):
+    msgid = serializers.CharField()
+    msgstr = serializers.CharField()
+    similarity = serializers.FloatField()
+    count = serializers.IntegerField()
+    kind = serializers.CharField()
+    file_id = serializers.IntegerField()
+    file_name = serializers.CharField()
@@ -7,10 +7,14 @@ from mobetta.api import views
 router = routers.DefaultRouter()
 router.register(r'files', views.TranslationFileViewSet)
 router.register(r'comments', views.MessageCommentViewSet)
+router.register(r'jobs', views.JobViewSet)
 
 app_name = 'mobetta'
 urlpatterns = [
+    url(r'^files/(?P<pk>\d+)/similar/$', views.SimilarMessagesView.as_view(), name='similar_messages'),
     url(r'^', include(router.urls)),
     url(r'^auth/', include('rest_framework.urls', namespace='rest_framework')),
     url(r'^suggestion/', views.TranslationSuggestionsView.as_view(), name='translation_suggestion'),
+    url(r'^memory/', views.TranslationMemoryView.as_view(), name='translation_memory'),
+    url(r'^search/', views.MessageSearchView.as_view(), name='search'),
 ]
@@ -1,13 +1,21 @@
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from mobetta import util
+from mobetta import jobs, util
+from mobetta.access import can_translate_language, get_translatable_languages
 from mobetta.api.permissions import CanTranslatePermission
 from mobetta.api.serializers import (
-    MessageCommentSerializer, TranslationFileSerializer
+    JobSerializer, MemoryMatchSerializer, MessageCommentSerializer,
+    SearchResultSerializer, TranslationFileSerializer
 )
-from mobetta.models import MessageComment, TranslationFile
+from mobetta.memory import lookup
+from mobetta.models import Job, MessageComment, TranslationFile
+from mobetta.search_index import get_search_index
 
 
 class TranslationFileViewSet(viewsets.ModelViewSet):
@@ -44,6 +52,25 @@ class MessageCommentViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for polling the progress of background jobs.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    permission_classes = [CanTranslatePermission]
+
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        user = self.request.user
+
+        if not (user.is_staff or user.is_superuser):
+            queryset = queryset.filter(created_by=user.pk)
+
+        return queryset
+
+
 class TranslationSuggestionsView(APIView):
     """
     View for fetching translation suggestions using MS Translate.
@@ -61,3 +88,123 @@ class TranslationSuggestionsView(APIView):
             'language_code': language,
             'suggestion': suggestion,
         })
+
+
+class TranslationMemoryView(APIView):
+    """
+    View for looking up the translations of ``msgid`` in the other PO files
+    of the language ``language_code``, through the translation memory.
+
+    Returns the translations of the same msgid as ``exact`` and the
+    translations of similar msgids as ``fuzzy``, up to ``limit``.
+    """
+    permission_classes = [CanTranslatePermission]
+    max_limit = 20
+
+    def get(self, request, format=None):
+        msgid = request.query_params.get('msgid')
+        language = request.query_params.get('language_code')
+        if not msgid or not language:
+            raise ValidationError("msgid and language_code are required")
+        if not can_translate_language(request.user, language):
+            raise PermissionDenied
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError("limit must be a number")
+
+        jobs.request_search_index_refresh(user=request.user)
+        exact, fuzzy = lookup(msgid, language, limit=limit)
+
+        return Response({
+            'msgid': msgid,
+            'language_code': language,
+            'exact': MemoryMatchSerializer(exact, many=True).data,
+            'fuzzy': MemoryMatchSerializer(fuzzy, many=True).data,
+        })
+
+
+class MessageSearchView(APIView):
+    """
+    View for searching the messages of all translation files, through the
+    search index.
+
+    Takes the query as ``q``, and optionally ``language_code``, ``kind``
+    (``po`` or ``icu``), ``limit`` and ``offset``.
+    """
+    permission_classes = [CanTranslatePermission]
+    max_limit = 200
+
+    def get(self, request, format=None):
+        query = request.query_params.get('q', '').strip()
+        language_code = request.query_params.get('language_code')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), self.max_limit)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError("limit and offset must be numbers")
+
+        languages = get_translatable_languages(request.user)
+        if language_code:
+            languages = [code for code in languages if code == language_code]
+
+        results = []
+        if query:
+            jobs.request_search_index_refresh(user=request.user)
+            results = get_search_index().search(
+                query, languages=languages, kind=request.query_params.get('kind') or None,
+                limit=limit + 1, offset=offset,
+            )
+
+        return Response({
+            'query': query,
+            'results': SearchResultSerializer(results[:limit], many=True).data,
+            'next_offset': offset + limit if len(results) > limit else None,
+        })
+
+
+class SimilarMessagesView(APIView):
+    """
+    View for finding the messages of a translation file with a msgid similar
+    to ``msgid``, with their translations.
+
+    The message itself (``msgid`` in the context ``msgctxt``) is left out.
+    Takes the number of messages as ``limit``.
+    """
+    permission_classes = [CanTranslatePermission]
+    max_limit = 20
+
+    def get(self, request, pk, format=None):
+        translation_file = get_object_or_404(TranslationFile, pk=pk)
+        if not can_translate_language(request.user, translation_file.language_code):
+            raise PermissionDenied
+
+        msgid = request.query_params.get('msgid')
+        if not msgid:
+            raise ValidationError("msgid is required")
+        msgctxt = request.query_params.get('msgctxt') or None
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError("limit must be a number")
+
+        catalog = translation_file.get_catalog()
+        results = []
+        for similarity, position in translation_file.get_msgid_index().similar(msgid, limit + 1):
+            if position >= len(catalog):
+                continue
+            entry = catalog[position]
+            if entry.msgid == msgid and (entry.msgctxt or None) == msgctxt:
+                continue
+            results.append({
+                'msgid': entry.msgid,
+                'msgctxt': entry.msgctxt,
+                'msgstr': entry.msgstr,
+                'msghash': util.get_message_hash(entry),
+                'similarity': round(similarity, 3),
+            })
+
+        return Response({
+            'msgid': msgid,
+            'results': results[:limit],
+        })
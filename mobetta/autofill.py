@@ -0,0 +1,120 @@
+"""
+Filling the untranslated messages of a PO file from the translation memory.
+
+All messages of a file are looked up at once and the translations are applied
+like the changes of the detail view (see ``util.update_translations``), so
+a file is written once and its edit logs are inserted in one go. Filled
+messages are marked fuzzy, to be reviewed by a translator.
+"""
+from __future__ import absolute_import, unicode_literals
+
+from django.db import transaction
+
+from . import util
+from .edit_logging import log_edits
+from .memory import lookup
+from .models import EditLog
+from .search_index import get_search_index, normalize_source
+
+
+class AutofillResult(object):
+
+    def __init__(self, translation_file, filled, untranslated):
+        self.translation_file = translation_file
+        self.filled = filled
+        self.untranslated = untranslated
+
+
+def get_untranslated_entries(pofile):
+    """
+    Return the entries of ``pofile`` that can be filled: the untranslated
+    messages without plural forms.
+    """
+    return [
+        entry for entry in pofile
+        if not entry.obsolete and not entry.msgid_plural and not entry.msgstr and normalize_source(entry.msgid)
+    ]
+
+
+def find_translations(msgids, language_code, min_similarity=None):
+    """
+    Return a dict mapping the ``msgids`` that are in the translation memory of
+    the language to their most used translation.
+
+    Msgids that aren't in it are looked up by similarity if ``min_similarity``
+    is given, and get the translation of the most similar msgid.
+    """
+    search_index = get_search_index()
+    sources = {msgid: normalize_source(msgid) for msgid in msgids}
+    source_ids = search_index.get_source_ids(language_code, set(sources.values()))
+
+    best = {}
+    for source_id, source, msgstr, count, kind, file_id, file_name in search_index.get_translations(
+            set(source_ids.values())):
+        best.setdefault(source, msgstr)
+
+    translations = {}
+    for msgid, source in sources.items():
+        if source in best:
+            translations[msgid] = best[source]
+        elif min_similarity is not None:
+            exact, fuzzy = lookup(msgid, language_code, limit=1, min_similarity=min_similarity)
+            if fuzzy:
+                translations[msgid] = fuzzy[0].msgstr
+    return translations
+
+
+def autofill_translation_file(translation_file, user, min_similarity=None):
+    """
+    Fill the untranslated messages of ``translation_file`` from the
+    translation memory, marked fuzzy. The changes are logged as edits by
+    ``user``. Returns an ``AutofillResult``.
+    """
+    with translation_file.lock():
+        pofile = translation_file.get_polib_object(for_update=True)
+        entries = get_untranslated_entries(pofile)
+        translations = find_translations(
+            {entry.msgid for entry in entries}, translation_file.language_code, min_similarity)
+
+        changes = []
+        for entry in entries:
+            msgstr = translations.get(entry.msgid)
+            if msgstr is None:
+                continue
+            msghash = util.get_message_hash(entry)
+            changes.append((None, [
+                {'msgid': entry.msgid, 'md5hash': msghash, 'field': 'translation', 'from': '', 'to': msgstr},
+                {'msgid': entry.msgid, 'md5hash': msghash, 'field': 'fuzzy', 'from': False, 'to': True},
+            ]))
+
+        applied_changes, rejected_changes = util.update_translations(pofile, changes)
+        if applied_changes:
+            util.update_metadata(
+                pofile, getattr(user, 'first_name', None), getattr(user, 'last_name', None), user.email)
+
+            # the file is written after the logs are inserted, so a failing
+            # insert leaves it unchanged (and a failing write rolls back the logs)
+            with transaction.atomic():
+                log_edits(EditLog, user, translation_file, applied_changes)
+                translation_file.save_polib_object(pofile)
+
+    filled = len([change for form, change in applied_changes if change['field'] == 'translation'])
+    return AutofillResult(translation_file, filled, len(entries))
+
+
+def autofill_translation_files(translation_files, user, min_similarity=None, progress=None):
+    """
+    Fill the untranslated messages of all ``translation_files``, see
+    ``autofill_translation_file``. Returns a list of ``AutofillResult``.
+
+    ``progress`` is called with the number of files done and the total.
+    """
+    translation_files = list(translation_files)
+    results = []
+    for done, translation_file in enumerate(translation_files):
+        if progress is not None:
+            progress(done, len(translation_files))
+        results.append(autofill_translation_file(translation_file, user, min_similarity))
+    if progress is not None:
+        progress(len(translation_files), len(translation_files))
+    return results
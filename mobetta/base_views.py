@@ -5,22 +5,27 @@ Plugins can use these to implement the plugin-specific behaviour.
 """
 from __future__ import absolute_import, unicode_literals
 
-import re
-
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.db.models import Count, OuterRef, Subquery
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
+from django.utils import six
 from django.utils.decorators import method_decorator
+from django.utils.translation import ugettext as _
 from django.views.generic import FormView, ListView, View
 from django.views.generic.detail import SingleObjectMixin
 
 from .access import can_translate_language
 from .conf import settings as mobetta_settings
+from .edit_logging import log_edits
+from .files import FileLockTimeout
 from .forms import CommentForm
 from .paginators import MovingRangePaginator
+from .search import InvalidSearch, get_matcher
 
 
 class BaseFileListView(ListView):
@@ -41,6 +46,7 @@ class BaseFileListView(ListView):
 
     def get_context_data(self, *args, **kwargs):
         context = super(BaseFileListView, self).get_context_data(*args, **kwargs)
+        context['language_code'] = self.language_code
         context['language_name'] = dict(settings.LANGUAGES)[self.language_code]
         return context
 
@@ -54,9 +60,10 @@ class BaseFileDetailView(FormView):
     translations_per_page = 20
 
     edit_log_model = None  # must be set in subclass
+    comment_model = None  # must be set in subclass
     success_url_pattern = None  # must be set in subclass
 
-    # callback to test if an entry matches
+    # callback to test if an entry matches, called with a ``search`` matcher
     entry_matches = None  # must be set in subclass
 
     @method_decorator(login_required)
@@ -70,27 +77,35 @@ class BaseFileDetailView(FormView):
 
     def filter_by_search_tag(self, entries, tag):
         try:
-            regex = re.compile(tag, re.IGNORECASE)
-        except re.error:  # invalid regex supplied TODO: better feedback
+            matcher = get_matcher(tag)
+        except InvalidSearch as e:
+            messages.error(self.request, six.text_type(e))
             return ()
-        return (entry for entry in entries if self.entry_matches(regex, entry))
+        query = tag if matcher.literal else None
+        if query is not None:
+            candidates = self.get_search_candidates(entries, query)
+            if candidates is not None:
+                entries, query = candidates, None
+        if hasattr(entries, 'search'):
+            # memory mapped files only decode the entries that can contain
+            # the text of a literal query
+            return entries.search(lambda entry: self.entry_matches(matcher, entry), query)
+        return [entry for entry in entries if self.entry_matches(matcher, entry)]
+
+    def get_search_candidates(self, entries, query):
+        """
+        Return the part of ``entries`` that can match the plain text search
+        ``query`` (which is still matched against them), or ``None`` to match
+        all entries.
+        """
+        return None
 
     def form_invalid(self, form):
         form = self.populate_old_data(form)
         return self.render_to_response(self.get_context_data(form=form))
 
     def log_edits(self, changes):
-        if mobetta_settings.USE_EDIT_LOGGING:
-            for f, change in changes:
-                self.edit_log_model.objects.create(
-                    user=self.request.user,
-                    file_edited=self.translation_file,
-                    msghash=change['md5hash'],
-                    msgid=change['msgid'],
-                    fieldname=change['field'],
-                    old_value=change['from'],
-                    new_value=change['to'],
-                )
+        log_edits(self.edit_log_model, self.request.user, self.translation_file, changes)
 
     def form_valid(self, form):
         changes = []
@@ -99,7 +114,14 @@ class BaseFileDetailView(FormView):
                 changes.append((f, f.get_changes()))
 
         if any(changes):
-            rejected_changes = self.save_changes(changes)
+            try:
+                rejected_changes = self.save_changes(changes)
+            except FileLockTimeout:
+                messages.error(
+                    self.request,
+                    _("The file is being saved by someone else at the moment, please try again.")
+                )
+                return self.form_invalid(form)
 
             # Add messages/errors about rejected changes
             if len(rejected_changes) > 0:
@@ -120,6 +142,11 @@ class BaseFileDetailView(FormView):
         ctx['formset'] = ctx.pop('form')
         ctx['formset'].initial = self.get_formset_initial(page)
 
+        # Fetch the edit/comment details for all messages on the page at once
+        msghashes = [translation['md5hash'] for translation in ctx['formset'].initial]
+        ctx['last_edits'] = self.get_last_edits(msghashes)
+        ctx['comment_counts'] = self.get_comment_counts(msghashes)
+
         if mobetta_settings.USE_MS_TRANSLATE:
             ctx['show_suggestions'] = True
 
@@ -159,6 +186,35 @@ class BaseFileDetailView(FormView):
 
         return ctx
 
+    def get_last_edits(self, msghashes):
+        """
+        Return a dict mapping each of the ``msghashes`` that was edited to its
+        most recent edit log.
+        """
+        logs = self.edit_log_model.objects.filter(
+            file_edited=self.translation_file,
+            msghash__in=msghashes,
+        )
+        latest = self.edit_log_model.objects.filter(
+            file_edited=self.translation_file,
+            msghash=OuterRef('msghash'),
+        ).order_by('-created', '-pk').values('pk')[:1]
+        return {
+            log.msghash: log
+            for log in logs.filter(pk=Subquery(latest)).select_related('user')
+        }
+
+    def get_comment_counts(self, msghashes):
+        """
+        Return a dict mapping each of the ``msghashes`` that has comments to
+        the number of comments.
+        """
+        comments = self.comment_model.objects.filter(
+            translation_file=self.translation_file,
+            msghash__in=msghashes,
+        )
+        return dict(comments.order_by().values_list('msghash').annotate(Count('pk')))
+
     def get_page(self, paginator):
         try:
             page = paginator.page(self.request.GET.get('page'))
@@ -0,0 +1,286 @@
+"""
+Process-level cache of parsed translation catalogs.
+
+Parsing a large catalog is expensive, and the detail views need the parsed
+catalog several times per request. Cached catalogs are stored together with
+the signature of the file they were parsed from, so they are discarded as soon
+as the file changes on disk.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import importlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .conf import settings as mobetta_settings
+
+
+def get_file_signature(path):
+    """
+    Return a ``(mtime_ns, size, inode)`` tuple identifying the current
+    version of the file at ``path``, or ``None`` if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return get_stat_signature(stat)
+
+
+def get_stat_signature(stat):
+    """
+    Return the signature of a file (see ``get_file_signature``) from the
+    result of ``os.stat`` or ``os.fstat``.
+    """
+    mtime_ns = getattr(stat, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1e9)
+    return (mtime_ns, stat.st_size, stat.st_ino)
+
+
+# the running ``watcher.BaseWatcher``, if any, and the process it runs in
+_file_watcher = (None, None)
+
+
+def set_file_watcher(watcher):
+    """
+    Use the signatures of the files seen by ``watcher`` (or stat the files
+    again if it is ``None``) in the current process, see
+    ``get_current_signature``.
+    """
+    global _file_watcher
+    _file_watcher = (watcher, os.getpid())
+
+
+def get_file_watcher():
+    """
+    Return the file watcher of the current process, starting it first if
+    ``MOBETTA_FILE_WATCHER`` is set.
+
+    Watchers are started on first use in every process: the thread of a
+    watcher started before a pre-forking server (like uWSGI, or gunicorn with
+    ``--preload``) forks its workers doesn't run in the workers, so its
+    signatures would never change there.
+    """
+    watcher, pid = _file_watcher
+    if pid == os.getpid():
+        return watcher
+    if not mobetta_settings.FILE_WATCHER:
+        return None
+    from .watcher import start_watcher
+    return start_watcher()
+
+
+def get_current_signature(path):
+    """
+    Return the signature of the file at ``path`` like ``get_file_signature``,
+    as last seen by the file watcher if it watches the file, which saves a
+    ``stat`` per request.
+    """
+    watcher = get_file_watcher()
+    if watcher is not None:
+        try:
+            return watcher.get_signature(path)
+        except KeyError:
+            pass
+    return get_file_signature(path)
+
+
+def file_saved(path):
+    """
+    Tell the file watcher that Mobetta itself just wrote the file at ``path``,
+    so the cached variants of the file and its statistics are checked against
+    the new version right away instead of after the watcher's next check.
+    """
+    watcher = get_file_watcher()
+    if watcher is not None:
+        watcher.update_signature(path, get_file_signature(path))
+
+
+class BaseCatalogCache(object):
+    """
+    Cache parsed catalogs keyed on their path and file signature.
+
+    Subclasses implement the storage through ``lookup``, ``store``,
+    ``invalidate`` and ``clear``.
+    """
+
+    def __init__(self):
+        # the variants that were cached in this process
+        self.variants = set()
+
+    def get(self, path, loader, variant=None):
+        """
+        Return the catalog for ``path``, calling ``loader(path)`` to parse it
+        if there is no cached catalog for the current version of the file.
+
+        ``variant`` keeps other representations of the same file (like the
+        ``reader.Catalog``) apart from the parsed ``polib`` object. Variants
+        are read-only, they are checked against the signature seen by the file
+        watcher, if one is running. The ``polib`` object is written back to
+        the file, so it is always checked against the file itself.
+        """
+        key, signature = self._get_key(path, variant)
+        if signature is None:
+            # let the loader raise the appropriate error
+            self.invalidate(key)
+            return loader(path)
+
+        catalog = self.lookup(key, signature)
+        if catalog is None:
+            catalog = loader(path)
+            self.store(key, signature, catalog)
+        return catalog
+
+    def set(self, path, catalog, variant=None):
+        """
+        Replace the cached catalog for ``path``, e.g. after Mobetta itself
+        wrote ``catalog`` to disk.
+        """
+        key, signature = self._get_key(path, variant)
+        if signature is None:
+            self.invalidate(key)
+        else:
+            self.store(key, signature, catalog)
+
+    def _get_key(self, path, variant):
+        if variant is None:
+            return path, get_file_signature(path)
+        self.variants.add(variant)
+        return '{}:{}'.format(variant, path), get_current_signature(path)
+
+    def discard_stale(self, path, signature):
+        """
+        Drop the cached catalogs (of all variants) for ``path`` that were
+        parsed from another version of the file than ``signature``.
+        """
+        for key in [path] + ['{}:{}'.format(variant, path) for variant in self.variants]:
+            if signature is None or self.lookup(key, signature) is None:
+                self.invalidate(key)
+
+    def lookup(self, path, signature):
+        raise NotImplementedError
+
+    def store(self, path, signature, catalog):
+        raise NotImplementedError
+
+    def invalidate(self, path):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocMemCatalogCache(BaseCatalogCache):
+    """
+    Keep parsed catalogs in the memory of the current process.
+
+    The least recently used catalogs are evicted once the total number of
+    cached entries exceeds ``max_entries``.
+    """
+
+    def __init__(self, max_entries=200000):
+        super(LocMemCatalogCache, self).__init__()
+        self.max_entries = max_entries
+        self._catalogs = OrderedDict()
+        self._total_entries = 0
+        self._lock = threading.RLock()
+
+    def lookup(self, path, signature):
+        with self._lock:
+            cached = self._catalogs.get(path)
+            if cached is None:
+                return None
+            if cached[0] != signature:
+                self._discard(path)
+                return None
+            # mark as most recently used
+            self._catalogs[path] = self._catalogs.pop(path)
+            return cached[1]
+
+    def store(self, path, signature, catalog):
+        size = len(catalog)
+        with self._lock:
+            self._discard(path)
+            self._catalogs[path] = (signature, catalog, size)
+            self._total_entries += size
+            while self._total_entries > self.max_entries and self._catalogs:
+                self._discard(next(iter(self._catalogs)))
+
+    def invalidate(self, path):
+        with self._lock:
+            self._discard(path)
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
+            self._total_entries = 0
+
+    def _discard(self, path):
+        cached = self._catalogs.pop(path, None)
+        if cached is not None:
+            self._total_entries -= cached[2]
+
+
+class DjangoCatalogCache(BaseCatalogCache):
+    """
+    Store parsed catalogs in one of the configured Django caches, so they can
+    be shared between worker processes.
+    """
+
+    key_prefix = 'mobetta.catalog'
+
+    def __init__(self, alias='default', timeout=None):
+        super(DjangoCatalogCache, self).__init__()
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _make_key(self, path, signature=None):
+        digest = hashlib.md5(repr((path, signature)).encode('utf8')).hexdigest()
+        return '{}.{}'.format(self.key_prefix, digest)
+
+    def lookup(self, path, signature):
+        return self.cache.get(self._make_key(path, signature))
+
+    def store(self, path, signature, catalog):
+        key = self._make_key(path, signature)
+        self.cache.set_many({
+            key: catalog,
+            # remember the latest key so it can be invalidated
+            self._make_key(path): key,
+        }, self.timeout)
+
+    def invalidate(self, path):
+        latest = self._make_key(path)
+        key = self.cache.get(latest)
+        self.cache.delete_many([latest, key] if key else [latest])
+
+    def clear(self):
+        # the keys are not enumerable, stale catalogs expire with the cache
+        pass
+
+
+_catalog_cache = None
+_catalog_cache_lock = threading.Lock()
+
+
+def get_catalog_cache():
+    """
+    Return the catalog cache configured with ``MOBETTA_CATALOG_CACHE_BACKEND``.
+    """
+    global _catalog_cache
+    if _catalog_cache is None:
+        with _catalog_cache_lock:
+            if _catalog_cache is None:
+                module_path, class_name = mobetta_settings.CATALOG_CACHE_BACKEND.rsplit('.', 1)
+                backend = getattr(importlib.import_module(module_path), class_name)
+                _catalog_cache = backend(**mobetta_settings.CATALOG_CACHE_OPTIONS)
+    return _catalog_cache
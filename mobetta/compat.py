@@ -1,3 +1,8 @@
 import django
 
 HAS_STRIP_KWARG = django.VERSION >= (1, 9)
+
+try:
+    from os import replace as replace_file
+except ImportError:  # Python 2, rename replaces the target on POSIX systems
+    from os import rename as replace_file
@@ -0,0 +1,150 @@
+"""
+Compiling PO files into MO files.
+
+Catalogs are compiled on a pool of worker processes, and catalogs that did not
+change since they were last compiled are skipped. The pool is only used by the
+management command and the ``DatabaseJobRunner``, jobs in the web processes
+compile one file after the other.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+
+from django.utils import timezone
+
+import polib
+
+from .conf import settings as mobetta_settings
+from .files import atomic_write
+from .mofile import UnsupportedCatalog, compile_mofile
+
+logger = logging.getLogger(__name__)
+
+COMPILED = 'compiled'
+SKIPPED = 'skipped'
+MISSING = 'missing'
+FAILED = 'failed'
+
+
+class CompilationResult(object):
+
+    def __init__(self, translation_file, status, duration=None, error=None):
+        self.translation_file = translation_file
+        self.status = status
+        self.duration = duration
+        self.error = error
+
+
+def get_mofile_path(path):
+    return "{}mo".format(path[:-2])
+
+
+def get_content_hash(path):
+    """
+    Return the SHA-1 hex digest of the contents of the file at ``path``.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compile_pofile(path):
+    """
+    Write the MO file for the PO file at ``path``.
+
+    Returns the content hash of the compiled PO file.
+    """
+    # hash before parsing, so a concurrent change is compiled again next time
+    content_hash = get_content_hash(path)
+    try:
+        data = compile_mofile(path)
+    except UnsupportedCatalog:
+        data = polib.pofile(path).to_binary()
+    atomic_write(get_mofile_path(path), data)
+    return content_hash
+
+
+def _compile_worker(path):
+    # runs in the worker processes, exceptions are returned as text since
+    # they can't always be pickled
+    started = time.time()
+    try:
+        content_hash = compile_pofile(path)
+    except Exception as exc:
+        return path, None, time.time() - started, '{}: {}'.format(type(exc).__name__, exc)
+    return path, content_hash, time.time() - started, None
+
+
+def compile_translation_files(translation_files, force=False, processes=None, progress=None):
+    """
+    Compile the MO files for ``translation_files`` and return a
+    ``CompilationResult`` for each of them.
+
+    Files whose PO file has the same content hash as when they were last
+    compiled are skipped, unless ``force`` is set. ``processes`` defaults to
+    ``MOBETTA_COMPILE_PROCESSES``. ``progress(done, total)`` is called as the
+    files are compiled.
+    """
+    translation_files = list(translation_files)
+    results = []
+    pending = {}
+    for translation_file in translation_files:
+        path = translation_file.filepath
+        if not os.path.isfile(path):
+            translation_file.is_valid = False
+            translation_file.save(update_fields=['is_valid'])
+            results.append(CompilationResult(translation_file, MISSING))
+            continue
+
+        if (not force and translation_file.compiled_hash and
+                os.path.isfile(get_mofile_path(path)) and
+                get_content_hash(path) == translation_file.compiled_hash):
+            results.append(CompilationResult(translation_file, SKIPPED))
+            continue
+
+        pending[path] = translation_file
+
+    if progress is not None:
+        progress(len(results), len(translation_files))
+
+    for path, content_hash, duration, error in _run(sorted(pending), processes):
+        translation_file = pending[path]
+        if error is not None:
+            logger.error("Could not compile %s: %s", path, error)
+            results.append(CompilationResult(translation_file, FAILED, duration, error))
+        else:
+            translation_file.compiled_hash = content_hash
+            translation_file.last_compiled = timezone.now()
+            translation_file.save(update_fields=['compiled_hash', 'last_compiled'])
+            logger.info("Compiled %s in %.1f ms", path, duration * 1000)
+            results.append(CompilationResult(translation_file, COMPILED, duration))
+
+        if progress is not None:
+            progress(len(results), len(translation_files))
+
+    return results
+
+
+def _run(paths, processes):
+    if processes is None:
+        processes = mobetta_settings.COMPILE_PROCESSES or multiprocessing.cpu_count()
+    processes = min(processes, len(paths))
+
+    if processes <= 1:
+        for path in paths:
+            yield _compile_worker(path)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(_compile_worker, paths):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
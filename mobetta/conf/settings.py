@@ -28,9 +28,101 @@ MOBETTA_LANGUAGE_GROUPS = getattr(settings, 'MOBETTA_LANGUAGE_GROUPS', False)
 
 USE_EDIT_LOGGING = getattr(settings, 'MOBETTA_USE_EDIT_LOGGING', True)
 
+# Number of edit logs written per INSERT query.
+EDIT_LOG_BATCH_SIZE = getattr(settings, 'MOBETTA_EDIT_LOG_BATCH_SIZE', 500)
+
+# When more changes than this are saved at once, e.g. for large imports, the
+# edit logs are written in the background after the request. ``None`` always
+# writes them during the request.
+EDIT_LOG_DEFER_THRESHOLD = getattr(settings, 'MOBETTA_EDIT_LOG_DEFER_THRESHOLD', None)
+
 # Whether to use Microsoft Translate to offer suggestions. This requires
 # installing `microsofttranslate` from PyPI, and also uses the settings
 # `MS_TRANSLATE_CLIENT_ID` and `MS_TRANSLATE_CLIENT_SECRET`
 USE_MS_TRANSLATE = getattr(settings, 'MOBETTA_USE_MS_TRANSLATE', False)
 
 MOBETTA_PO_FILENAMES = getattr(settings, 'MOBETTA_PO_FILENAMES', ['django.po', 'djangojs.po'])
+
+# Language the ICU files are translated from. The other ICU files are compared
+# with the file for this language in the same directory (e.g. ``en.json``) to
+# find the messages that are identical to the source.
+ICU_SOURCE_LANGUAGE = getattr(settings, 'MOBETTA_ICU_SOURCE_LANGUAGE', settings.LANGUAGE_CODE)
+
+# File holding the modification times and listings of the locale directories
+# seen by ``locate_translation_files``, so only changed directories are listed
+# again. ``None`` keeps it in the temporary directory.
+DISCOVERY_SNAPSHOT_PATH = getattr(settings, 'MOBETTA_DISCOVERY_SNAPSHOT_PATH', None)
+
+# Maximum number of seconds to wait for a concurrent save of the same file to
+# finish.
+FILE_LOCK_TIMEOUT = getattr(settings, 'MOBETTA_FILE_LOCK_TIMEOUT', 10)
+
+# Directory holding the lock files that serialize saves of the same file
+# between processes. All processes that save translation files must use the
+# same directory. ``None`` keeps a hidden lock file next to each file.
+LOCK_DIRECTORY = getattr(settings, 'MOBETTA_LOCK_DIRECTORY', None)
+
+# Number of worker processes used to compile MO files, ``None`` uses one per
+# CPU. Jobs running in the web processes always compile in the process itself.
+COMPILE_PROCESSES = getattr(settings, 'MOBETTA_COMPILE_PROCESSES', None)
+
+# Class that runs the jobs for compiling and finding translation files outside
+# of the request. 'mobetta.jobs.DatabaseJobRunner' leaves them to the
+# ``run_mobetta_jobs`` management command, 'mobetta.jobs.SynchronousJobRunner'
+# runs them during the request.
+JOB_RUNNER = getattr(settings, 'MOBETTA_JOB_RUNNER', 'mobetta.jobs.ThreadJobRunner')
+
+# Keyword arguments for the job runner, e.g. ``{'workers': 2}`` for the
+# thread runner.
+JOB_RUNNER_OPTIONS = getattr(settings, 'MOBETTA_JOB_RUNNER_OPTIONS', {})
+
+# Pending and running jobs that made no progress for this many seconds are
+# considered abandoned, e.g. by a worker that was killed, and marked as failed.
+JOB_TIMEOUT = getattr(settings, 'MOBETTA_JOB_TIMEOUT', 30 * 60)
+
+# Class that watches the translation files for changes made outside of
+# Mobetta, e.g. by deploys, on a background thread of every process.
+# 'mobetta.watcher.InotifyWatcher' is notified by the kernel on Linux and falls
+# back to 'mobetta.watcher.PollingWatcher' elsewhere. ``None`` checks the
+# modification time of a file whenever it is read instead.
+FILE_WATCHER = getattr(settings, 'MOBETTA_FILE_WATCHER', None)
+
+# Keyword arguments for the file watcher, e.g. ``{'rescan_interval': 60}``
+# for both or ``{'interval': 1}`` for the polling watcher.
+FILE_WATCHER_OPTIONS = getattr(settings, 'MOBETTA_FILE_WATCHER_OPTIONS', {})
+
+##########################
+#                        #
+# Settings for caching   #
+#                        #
+##########################
+
+# Class used to cache parsed catalogs between requests. Use
+# 'mobetta.cache.DjangoCatalogCache' to share them between worker processes
+# through the Django cache framework.
+CATALOG_CACHE_BACKEND = getattr(settings, 'MOBETTA_CATALOG_CACHE_BACKEND', 'mobetta.cache.LocMemCatalogCache')
+
+# Keyword arguments for the catalog cache backend, e.g. ``{'max_entries': 200000}``
+# for the in-memory cache or ``{'alias': 'default', 'timeout': None}`` for the
+# Django cache.
+CATALOG_CACHE_OPTIONS = getattr(settings, 'MOBETTA_CATALOG_CACHE_OPTIONS', {})
+
+# PO and JSON files larger than this many bytes are memory mapped instead of
+# read into the memory of every process, see ``mobetta.mapped``. ``None`` never
+# maps files.
+MMAP_THRESHOLD = getattr(settings, 'MOBETTA_MMAP_THRESHOLD', 10 * 1024 * 1024)
+
+###########################
+#                         #
+# Settings for searching  #
+#                         #
+###########################
+
+# SQLite database holding the full-text index of the messages of all
+# translation files, used to search across files. ``None`` keeps it in the
+# temporary directory.
+SEARCH_INDEX_PATH = getattr(settings, 'MOBETTA_SEARCH_INDEX_PATH', None)
+
+# Searching refreshes the index in a background job when it was last
+# refreshed more than this many seconds ago.
+SEARCH_INDEX_REFRESH_INTERVAL = getattr(settings, 'MOBETTA_SEARCH_INDEX_REFRESH_INTERVAL', 300)
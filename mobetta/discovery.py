@@ -0,0 +1,188 @@
+"""
+Finding the PO files of the project and keeping the ``TranslationFile``s in
+sync with them.
+
+Every discovery saves a snapshot of the modification times and listings of the
+locale directories it listed (``MOBETTA_DISCOVERY_SNAPSHOT_PATH``). Adding or
+removing a file or directory changes the modification time of the directory
+holding it, so the next discovery only lists the directories whose
+modification time changed and reuses the listings of the others. That makes it
+cheap enough to run on every deploy.
+
+Files that vanished are marked invalid instead of being deleted, so their edit
+logs and comments are kept, and are marked valid again when they come back.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+from .conf import settings as mobetta_settings
+from .files import atomic_write
+from .models import TranslationFile
+from .util import (
+    app_name_from_filepath, find_all_pofiles, get_locale_paths, list_directory
+)
+
+logger = logging.getLogger(__name__)
+
+# a directory that was listed less than this many seconds after it was
+# modified can change again without a different modification time, on file
+# systems that store them with a low resolution
+MTIME_RESOLUTION = 2
+
+# the number of files changed with a single query
+BATCH_SIZE = 500
+
+
+class DirectoryLister(object):
+    """
+    List directories like ``util.list_directory``, reusing the listings in
+    ``snapshot`` of the directories that weren't modified since.
+
+    The listings of all directories that were asked for are kept in
+    ``directories``, to be saved as the snapshot for the next discovery.
+    """
+
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot or {}
+        self.directories = {}
+        self.listed = 0
+        self.reused = 0
+
+    def __call__(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return []
+
+        cached = self.snapshot.get(path)
+        if cached is not None and cached[0] == mtime and cached[1] - mtime > MTIME_RESOLUTION:
+            listed_at, entries = cached[1], cached[2]
+            self.reused += 1
+        else:
+            listed_at = time.time()
+            entries = list_directory(path)
+            self.listed += 1
+        self.directories[path] = [mtime, listed_at, entries]
+        return entries
+
+
+def get_snapshot_path():
+    """
+    Return ``MOBETTA_DISCOVERY_SNAPSHOT_PATH``, or a file in the temporary
+    directory for the project database.
+    """
+    path = mobetta_settings.DISCOVERY_SNAPSHOT_PATH
+    if path is None:
+        database = settings.DATABASES.get('default', {}).get('NAME', '')
+        digest = hashlib.md5(str(database).encode('utf8')).hexdigest()[:12]
+        path = os.path.join(tempfile.gettempdir(), 'mobetta-discovery-{}.json'.format(digest))
+    return path
+
+
+def load_snapshot():
+    """
+    Return the directories of the last saved snapshot, or an empty dict if
+    there is none (or it can't be read).
+    """
+    try:
+        with open(get_snapshot_path(), 'rb') as f:
+            return json.loads(f.read().decode('utf8'))['directories']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_snapshot(directories):
+    try:
+        atomic_write(get_snapshot_path(), json.dumps({'directories': directories}).encode('utf8'))
+    except (IOError, OSError):
+        # the next discovery lists all directories again
+        logger.warning("Could not save the discovery snapshot to %s", get_snapshot_path(), exc_info=True)
+
+
+class DiscoveryResult(object):
+
+    def __init__(self, found, created, invalidated, restored, listed, reused):
+        # ``(lang, filepath)`` for the found files and the files that were
+        # added, the paths of the files that vanished and came back
+        self.found = found
+        self.created = created
+        self.invalidated = invalidated
+        self.restored = restored
+        # the number of directories that were listed and reused
+        self.listed = listed
+        self.reused = reused
+
+
+def _set_valid(file_ids, is_valid):
+    for start in range(0, len(file_ids), BATCH_SIZE):
+        TranslationFile.objects.filter(pk__in=file_ids[start:start + BATCH_SIZE]).update(is_valid=is_valid)
+
+
+def update_translation_files(found, locale_paths):
+    """
+    Bring the ``TranslationFile``s in line with the ``found`` files (a list of
+    ``(lang, filepath)``) in ``locale_paths``.
+
+    New files are added with a single bulk insert. Files in ``locale_paths``
+    that weren't found, and files elsewhere that don't exist anymore (e.g. of
+    third party apps when they weren't searched), are marked invalid. Invalid
+    files that were found are marked valid again. Returns the created, the
+    invalidated and the restored files like ``DiscoveryResult``.
+    """
+    found_keys = {(filepath, lang) for lang, filepath in found}
+    prefixes = tuple(os.path.join(path, '') for path in locale_paths)
+
+    known = set()
+    invalidated = {}
+    restored = {}
+    for pk, filepath, lang, is_valid in TranslationFile.objects.values_list(
+            'pk', 'filepath', 'language_code', 'is_valid'):
+        known.add((filepath, lang))
+        if (filepath, lang) in found_keys:
+            if not is_valid:
+                restored[pk] = filepath
+        elif is_valid and (filepath.startswith(prefixes) or not os.path.isfile(filepath)):
+            invalidated[pk] = filepath
+
+    created = [(lang, filepath) for lang, filepath in found if (filepath, lang) not in known]
+    TranslationFile.objects.bulk_create([
+        TranslationFile(name=app_name_from_filepath(filepath), filepath=filepath, language_code=lang)
+        for lang, filepath in created
+    ], batch_size=BATCH_SIZE)
+    _set_valid(list(invalidated), False)
+    _set_valid(list(restored), True)
+    return created, sorted(invalidated.values()), sorted(restored.values())
+
+
+def discover_translation_files(languages, project_apps=True, third_party_apps=False, full=False, progress=None):
+    """
+    Find the PO files for ``languages`` (a list of language codes) and update
+    the ``TranslationFile``s, see ``update_translation_files``. Returns a
+    ``DiscoveryResult``.
+
+    Only the directories that changed since the last discovery are listed,
+    unless ``full`` is set. ``progress`` is called with the number of
+    searched locale paths and the total (one more, for updating the database).
+    """
+    locale_paths = get_locale_paths(project_apps, third_party_apps)
+    total = len(locale_paths) + 1
+    if progress is not None:
+        progress(0, total)
+    lister = DirectoryLister(None if full else load_snapshot())
+    found = find_all_pofiles(
+        languages, locale_paths=locale_paths, list_directory=lister,
+        progress=None if progress is None else lambda done, count: progress(done, total))
+    save_snapshot(lister.directories)
+
+    created, invalidated, restored = update_translation_files(found, locale_paths)
+    if progress is not None:
+        progress(total, total)
+    return DiscoveryResult(found, created, invalidated, restored, lister.listed, lister.reused)
@@ -0,0 +1,109 @@
+"""
+Writing the edit logs for changes applied to translation files.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import threading
+
+from django.db import close_old_connections, transaction
+from django.utils import six
+from django.utils.six.moves import queue
+
+from .conf import settings as mobetta_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _truncate(edit_log_model, fieldname, value):
+    # values that don't fit are cut off, so they can't fail the insert of the
+    # logs of a file that is saved already
+    max_length = edit_log_model._meta.get_field(fieldname).max_length
+    if isinstance(value, six.string_types) and max_length is not None:
+        return value[:max_length]
+    return value
+
+
+def build_edit_logs(edit_log_model, user, translation_file, changes):
+    """
+    Return (unsaved) edit log instances for the applied ``changes``, in the
+    ``[(form, change), ...]`` format of ``update_translations``.
+
+    Old and new values longer than their fields are truncated.
+    """
+    return [
+        edit_log_model(
+            user=user,
+            file_edited=translation_file,
+            msghash=change['md5hash'],
+            msgid=change['msgid'],
+            fieldname=change['field'],
+            old_value=_truncate(edit_log_model, 'old_value', change['from']),
+            new_value=_truncate(edit_log_model, 'new_value', change['to']),
+        )
+        for form, change in changes
+    ]
+
+
+def write_edit_logs(edit_log_model, logs):
+    edit_log_model.objects.bulk_create(logs, batch_size=mobetta_settings.EDIT_LOG_BATCH_SIZE)
+
+
+def log_edits(edit_log_model, user, translation_file, changes):
+    """
+    Log the applied ``changes`` with a single bulk insert.
+
+    If there are more changes than ``MOBETTA_EDIT_LOG_DEFER_THRESHOLD``, the
+    logs are handed to a background thread once the current transaction is
+    committed instead.
+    """
+    if not mobetta_settings.USE_EDIT_LOGGING or not changes:
+        return
+
+    logs = build_edit_logs(edit_log_model, user, translation_file, changes)
+
+    threshold = mobetta_settings.EDIT_LOG_DEFER_THRESHOLD
+    if threshold is not None and len(logs) > threshold:
+        transaction.on_commit(lambda: edit_log_queue.put((edit_log_model, logs)))
+    else:
+        write_edit_logs(edit_log_model, logs)
+
+
+class EditLogQueue(object):
+    """
+    Queue of edit logs that are written by a background thread.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name='mobetta-edit-logs')
+                self._worker.daemon = True
+                self._worker.start()
+        self._queue.put(item)
+
+    def join(self):
+        """
+        Block until all queued edit logs are written.
+        """
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            edit_log_model, logs = self._queue.get()
+            try:
+                close_old_connections()
+                write_edit_logs(edit_log_model, logs)
+            except Exception:
+                logger.exception("Could not write %d edit logs", len(logs))
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+edit_log_queue = EditLogQueue()
@@ -0,0 +1,190 @@
+"""
+Safe writing of translation files.
+
+Files are written to a temporary file that replaces the original in one
+atomic rename, so a crash can never leave a truncated file behind.
+Concurrent saves are serialized with an advisory lock per file, on a hidden lock
+file next to it or in ``MOBETTA_LOCK_DIRECTORY``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import contextlib
+import errno
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+from .compat import replace_file
+from .conf import settings as mobetta_settings
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+class FileLockTimeout(Exception):
+    """
+    The lock on a file could not be acquired in time.
+    """
+
+
+def atomic_write(path, data):
+    """
+    Replace the contents of ``path`` with the bytes in ``data``.
+
+    The data is written and synced to a temporary file in the same directory,
+    which then replaces ``path``. A symlinked ``path`` stays a symlink, its
+    target is replaced. The permissions (and owner, if allowed) of the
+    original file are kept.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(
+        dir=directory, prefix='.{}.'.format(os.path.basename(path)), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        # mkstemp creates the file readable by the owner only
+        try:
+            original = os.stat(path)
+        except OSError:
+            os.chmod(temp_path, 0o644)
+        else:
+            _copy_owner(original, temp_path)
+            os.chmod(temp_path, original.st_mode & 0o7777)
+
+        replace_file(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _fsync_directory(directory)
+
+
+def _copy_owner(original, path):
+    if not hasattr(os, 'chown'):  # not available on Windows
+        return
+    # only root can give files away, other users can still keep the group if
+    # they are a member of it
+    for uid in (original.st_uid, -1):
+        try:
+            os.chown(path, uid, original.st_gid)
+            return
+        except OSError as exc:
+            if exc.errno != errno.EPERM:
+                raise
+
+
+def _fsync_directory(directory):
+    # persist the rename itself, only possible on POSIX systems
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    handle = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(handle)
+    finally:
+        os.close(handle)
+
+
+def get_lock_path(path):
+    """
+    Return the path of the lock file for ``path``: a hidden file next to it,
+    which all processes that can save the file share, or a file in
+    ``MOBETTA_LOCK_DIRECTORY`` named after the hash of its path.
+
+    Symlinks are resolved, so all paths of a file share its lock.
+    """
+    path = os.path.realpath(path)
+    directory = mobetta_settings.LOCK_DIRECTORY
+    if directory is None:
+        return os.path.join(os.path.dirname(path), '.{}.lock'.format(os.path.basename(path)))
+    digest = hashlib.sha1(path.encode('utf8')).hexdigest()
+    return os.path.join(directory, '{}.lock'.format(digest))
+
+
+class _ThreadLock(object):
+    # plain locks can't be weakly referenced
+
+    def __init__(self):
+        lock = threading.Lock()
+        self.acquire = lock.acquire
+        self.release = lock.release
+
+
+# locks are only kept while a thread holds or waits for them
+_thread_locks = weakref.WeakValueDictionary()
+_thread_locks_lock = threading.Lock()
+
+
+def _get_thread_lock(path):
+    path = os.path.realpath(path)
+    with _thread_locks_lock:
+        lock = _thread_locks.get(path)
+        if lock is None:
+            lock = _thread_locks[path] = _ThreadLock()
+        return lock
+
+
+def _wait_for(acquire, deadline, path):
+    while not acquire():
+        if time.time() >= deadline:
+            raise FileLockTimeout("Could not lock {}".format(path))
+        time.sleep(0.05)
+
+
+@contextlib.contextmanager
+def file_lock(path, timeout=None):
+    """
+    Hold an exclusive lock on ``path`` for the duration of the block.
+
+    The lock is shared between the threads of this process and, through an
+    ``fcntl`` lock on the file ``get_lock_path(path)``, with other
+    processes. Raises ``FileLockTimeout`` if the lock could not be acquired
+    within ``timeout`` seconds (``MOBETTA_FILE_LOCK_TIMEOUT`` by default).
+    """
+    if timeout is None:
+        timeout = mobetta_settings.FILE_LOCK_TIMEOUT
+    deadline = time.time() + timeout
+
+    # fcntl locks are held by the process, so threads need their own lock
+    thread_lock = _get_thread_lock(path)
+    _wait_for(lambda: thread_lock.acquire(False), deadline, path)
+    try:
+        if fcntl is None:
+            yield
+            return
+
+        lock_path = get_lock_path(path)
+        try:
+            os.makedirs(os.path.dirname(lock_path))
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        handle = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            def acquire():
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError) as exc:
+                    if exc.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    return False
+                return True
+
+            _wait_for(acquire, deadline, path)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            os.close(handle)
+    finally:
+        thread_lock.release()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('icu', '0006_auto_20180329_1057'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='editlog',
+            index=models.Index(fields=['file_edited', 'msghash', 'created'], name='icu_editlog_msghash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagecomment',
+            index=models.Index(fields=['translation_file', 'msghash'], name='icu_comment_msghash_idx'),
+        ),
+    ]
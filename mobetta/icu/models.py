@@ -3,46 +3,166 @@ Translation file models, specific to ICU format files.
 """
 from __future__ import absolute_import, unicode_literals
 
+import copy
 import json
 import os
 from collections import OrderedDict
 
 from django.conf import settings
 from django.db import models
+from django.utils import six
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
+from ..cache import (
+    file_saved, get_catalog_cache, get_current_signature, get_file_signature
+)
+from ..conf import settings as mobetta_settings
+from ..files import atomic_write, file_lock
+from ..mapped import MappedJSONFile, is_large_file, load_json_pairs
 from ..models import BaseEditLog, BaseMessageComment
 from ..validators import validate_filepath_exists
 
 
+def load_icu_pairs(path):
+    """
+    Return the top-level ``(key, translation)`` pairs of the ICU file at
+    ``path``. Translations that aren't strings are returned as they were
+    loaded, so they are written back unchanged.
+
+    Large files are parsed one pair at a time from a memory map, so the text
+    of the file and a dict of all messages are never held in memory next to
+    the pairs.
+    """
+    if is_large_file(path):
+        return list(MappedJSONFile(path))
+    return load_json_pairs(path)
+
+
 class IcuFile(object):
+    """
+    The messages of an ICU file, kept as parallel sequences of their keys
+    (``msgids``) and ``translations`` with the position of every key in
+    ``index``.
 
-    def __init__(self, path):
+    Parsed files are shared between requests through the catalog cache, and
+    their translations are a tuple so they can't be changed by accident.
+    Changes are made to a ``copy`` and written with ``save``.
+    """
+
+    def __init__(self, path, pairs=None, signature=None):
         self.path = path
-        with open(self.path) as infile:
-            self.contents = json.load(infile, object_pairs_hook=OrderedDict)
+        if pairs is None:
+            # taken before reading, so it is never newer than the contents
+            signature = get_file_signature(path)
+            pairs = load_icu_pairs(path)
+        self.signature = signature
+
+        msgids = []
+        translations = []
+        self.index = {}
+        for key, translation in pairs:
+            position = self.index.get(key)
+            if position is None:
+                self.index[key] = len(msgids)
+                msgids.append(key)
+                translations.append(translation)
+            else:
+                # like ``json.load``, the last value of a duplicate key wins
+                translations[position] = translation
+        self.msgids = tuple(msgids)
+        self.translations = tuple(translations)
 
     def __iter__(self):
-        return iter(self.contents.items())
+        return zip(self.msgids, self.translations)
 
-    @property
-    def total_messages(self):
-        return len(self.contents)
+    def __len__(self):
+        return len(self.msgids)
 
-    @property
-    def translated_entries(self):
-        # TODO
-        return self
+    def __contains__(self, key):
+        return key in self.index
+
+    def __getitem__(self, key):
+        return self.translations[self.index[key]]
+
+    def __setitem__(self, key, translation):
+        self.translations[self.index[key]] = translation
+
+    def copy(self, read_only=False):
+        """
+        Return a copy of this file, which can be changed unless ``read_only``
+        is set. The keys and their index are shared with the copy.
+        """
+        icu_file = copy.copy(self)
+        icu_file.translations = tuple(self.translations) if read_only else list(self.translations)
+        return icu_file
 
     @property
-    def untranslated_entries(self):
-        # TODO
-        return self
+    def total_messages(self):
+        return len(self)
 
     def save(self):
-        with open(self.path, 'w') as outfile:
-            json.dump(self.contents, outfile)
+        atomic_write(self.path, json.dumps(OrderedDict(self)).encode('utf8'))
+        self.signature = get_file_signature(self.path)
+
+
+class MessageStatus(object):
+    """
+    The keys of the translated, untranslated and identical messages of an ICU
+    catalog, classified in a single pass over its ``(key, translation)``
+    pairs.
+
+    Messages without a translation (an empty string or ``null``) are
+    untranslated. Messages with the same translation as in the ``source``
+    catalog (a dict, if there is one) are identical, they most likely weren't
+    translated yet. The others are translated, including those with other JSON
+    values (numbers, booleans, lists and objects). Only strings count towards
+    the words and characters.
+    """
+
+    def __init__(self, pairs, source=None, source_signature=None):
+        translated = []
+        untranslated = []
+        identical = []
+        self.total_words = self.total_characters = 0
+        for key, translation in pairs:
+            if translation is None or translation == '':
+                untranslated.append(key)
+            elif source is not None and source.get(key) == translation:
+                identical.append(key)
+            else:
+                translated.append(key)
+            if isinstance(translation, six.string_types):
+                self.total_words += len(translation.split())
+                self.total_characters += len(translation)
+        self.translated = frozenset(translated)
+        self.untranslated = frozenset(untranslated)
+        self.identical = frozenset(identical)
+        # the version of the source catalog it was compared with
+        self.source_signature = source_signature
+
+    def __len__(self):
+        return len(self.translated) + len(self.untranslated) + len(self.identical)
+
+    def get_statistics(self):
+        return {
+            'total_messages': len(self),
+            'translated_messages': len(self.translated),
+            'untranslated_messages': len(self.untranslated),
+            'identical_messages': len(self.identical),
+            'total_words': self.total_words,
+            'total_characters': self.total_characters,
+        }
+
+
+def read_icu_file(path):
+    """
+    Return the ``(key, translation)`` pairs of the ICU file at ``path``,
+    memory mapped if it is large or else the cached ``IcuFile``.
+    """
+    if is_large_file(path):
+        return MappedJSONFile(path)
+    return get_catalog_cache().get(path, IcuFile, variant='icu')
 
 
 @python_2_unicode_compatible
@@ -80,16 +200,84 @@ class ICUTranslationFile(models.Model):
     def get_language_name(self):
         return dict(settings.LANGUAGES)[self.language_code]
 
-    def get_icufile_object(self):
-        if not hasattr(self, '_icu_file'):
-            self._icu_file = IcuFile(self.filepath)
-        return self._icu_file
+    def get_icufile_object(self, for_update=False):
+        """
+        Return the parsed file, shared through the catalog cache for as long
+        as the file is unchanged on disk.
+
+        With ``for_update``, return a copy of the current version of the file
+        that can be changed and written with ``save_icufile_object``.
+        """
+        icu_file = get_catalog_cache().get(self.filepath, IcuFile, variant='icu')
+        if not for_update:
+            return icu_file
+        if icu_file.signature != get_file_signature(self.filepath):
+            # the cache trusts the file watcher, which may not have seen the
+            # latest change yet
+            icu_file = IcuFile(self.filepath)
+        return icu_file.copy()
+
+    def save_icufile_object(self, icu_file):
+        """
+        Write ``icu_file`` to disk and share it through the catalog cache.
+        """
+        icu_file.save()
+        file_saved(self.filepath)
+        get_catalog_cache().set(self.filepath, icu_file.copy(read_only=True), variant='icu')
+
+    def get_mapped_file(self):
+        """
+        Return the file as a ``MappedJSONFile`` if it is larger than
+        ``MOBETTA_MMAP_THRESHOLD``, or else ``None``.
+        """
+        if is_large_file(self.filepath):
+            return MappedJSONFile(self.filepath)
+        return None
+
+    def lock(self, timeout=None):
+        """
+        Return a context manager holding the lock for saving this file.
+        """
+        return file_lock(self.filepath, timeout=timeout)
+
+    def get_source_path(self):
+        """
+        Return the path of the file for ``MOBETTA_ICU_SOURCE_LANGUAGE`` next to
+        this file, or ``None`` if there is none or this is that file.
+        """
+        directory, filename = os.path.split(self.filepath)
+        extension = os.path.splitext(filename)[1]
+        language = mobetta_settings.ICU_SOURCE_LANGUAGE.lower()
+        for code in (language, language.split('-')[0]):
+            path = os.path.join(directory, code + extension)
+            if path == self.filepath:
+                return None
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def get_message_status(self):
+        """
+        Return the ``MessageStatus`` of this file compared with its source
+        file. It is cached between requests, and only computed again when this
+        file or the source file changed.
+        """
+        source_path = self.get_source_path()
+        source_signature = get_current_signature(source_path) if source_path else None
+
+        def load_status(path):
+            source = dict(read_icu_file(source_path)) if source_signature else None
+            return MessageStatus(read_icu_file(path), source, source_signature)
+
+        catalog_cache = get_catalog_cache()
+        status = catalog_cache.get(self.filepath, load_status, variant='icu-status')
+        if status.source_signature != source_signature:
+            status = load_status(self.filepath)
+            catalog_cache.set(self.filepath, status, variant='icu-status')
+        return status
 
     def get_statistics(self):
-        icu_file = self.get_icufile_object()
-        return {
-            'total_messages': icu_file.total_messages,
-        }
+        return self.get_message_status().get_statistics()
 
 
 class EditLog(BaseEditLog):
@@ -98,9 +286,20 @@ class EditLog(BaseEditLog):
         related_name='edit_logs', on_delete=models.CASCADE
     )
 
+    class Meta(BaseEditLog.Meta):
+        indexes = [
+            # history of a message in a file, newest first
+            models.Index(fields=['file_edited', 'msghash', 'created'], name='icu_editlog_msghash_idx'),
+        ]
+
 
 class MessageComment(BaseMessageComment):
     translation_file = models.ForeignKey(
         ICUTranslationFile, blank=False, null=False,
         related_name='comments', on_delete=models.CASCADE
     )
+
+    class Meta(BaseMessageComment.Meta):
+        indexes = [
+            models.Index(fields=['translation_file', 'msghash'], name='icu_comment_msghash_idx'),
+        ]
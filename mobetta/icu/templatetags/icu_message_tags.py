@@ -6,20 +6,22 @@ register = template.Library()
 
 
 @register.inclusion_tag('mobetta/include/_last_msg_edit.html')
-def last_edit(transfile, msghash):
+def last_edit(transfile, msghash, last_edits=None):
     """
     Return the last EditLog instance for this msghash for this file.
 
     ``transfile`` - the `TranslationFile` object to get the log for.
     ``msghash`` - the md5 hash of the msgid and msgctxt to find the log for.
+    ``last_edits`` - optional dict of msghash -> last EditLog, as prefetched
+    by the detail view. The log is only queried if it is not given.
     """
-    try:
+    if isinstance(last_edits, dict):
+        logentry = last_edits.get(msghash)
+    else:
         logentry = EditLog.objects.filter(
             file_edited=transfile,
             msghash=msghash
         ).order_by('-created').first()
-    except EditLog.DoesNotExist:
-        logentry = None
 
     return {
         'logentry': logentry
@@ -27,7 +29,13 @@ def last_edit(transfile, msghash):
 
 
 @register.simple_tag
-def comment_count(transfile, msghash):
+def comment_count(transfile, msghash, comment_counts=None):
+    """
+    Return the number of comments on this msghash for this file, taken from
+    the ``comment_counts`` dict prefetched by the detail view if it is given.
+    """
+    if isinstance(comment_counts, dict):
+        return comment_counts.get(msghash, 0)
     return MessageComment.objects.filter(
         translation_file=transfile,
         msghash=msghash
@@ -1,7 +1,7 @@
 def update_translations(icu_file, form_changes):
     """
-    Takes in a ``mobetta.icu.models.IcuFile`` object and a list of changes to
-    apply.
+    Takes in a ``mobetta.icu.models.IcuFile`` object that can be changed (see
+    ``ICUTranslationFile.get_icufile_object``) and a list of changes to apply.
 
     Format of changes:
         [
@@ -23,15 +23,15 @@ def update_translations(icu_file, form_changes):
     for form, changes in form_changes:
         for change in changes:
             key = change['msgid']
-            if key not in icu_file.contents:
+            if key not in icu_file:
                 raise RuntimeError("Entry not found")
 
             if change['field'] == 'translation':
-                if change['from'] == icu_file.contents[key]:
-                    icu_file.contents[key] = change['to']
+                if change['from'] == icu_file[key]:
+                    icu_file[key] = change['to']
                     applied_changes.append((form, change))
                 else:
-                    change['current_value'] = icu_file.contents[key]
+                    change['current_value'] = icu_file[key]
                     rejected_changes.append((form, change))
             else:
                 raise RuntimeError('Unexpected field changed!')
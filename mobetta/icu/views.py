@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 
 from django.contrib import messages
+from django.db import transaction
 from django.forms import formset_factory
 from django.utils.translation import ugettext_lazy as _
 
@@ -8,8 +9,11 @@ from .. import formsets
 from ..base_views import (
     BaseFileDetailView, BaseFileDownloadView, BaseFileListView
 )
+from ..cache import get_file_signature
+from ..paginators import LazyTranslationList
+from ..search_index import icu_message, update_saved_messages
 from .forms import TranslationForm
-from .models import EditLog, ICUTranslationFile
+from .models import EditLog, ICUTranslationFile, MessageComment
 from .utils import update_translations
 
 
@@ -28,9 +32,9 @@ class ICUFileDownloadView(BaseFileDownloadView):
         )
 
 
-def _entry_matches(regex, entry):
+def _entry_matches(matcher, entry):
     key, translation = entry
-    return regex.search(key) or regex.search(translation)
+    return matcher.matches(key, translation)
 
 
 class ICUFileDetailView(BaseFileDetailView):
@@ -43,43 +47,46 @@ class ICUFileDetailView(BaseFileDetailView):
     )
 
     edit_log_model = EditLog
+    comment_model = MessageComment
     success_url_pattern = 'mobetta:icu_file_detail'
 
     entry_matches = staticmethod(_entry_matches)
 
-    # def filter_by_type(self, icu_file, type):
-    #     filters = {
-    #         'translated': 'translated_entries',
-    #         'untranslated': 'untranslated_entries',
-    #     }
-    #     if type not in filters:
-    #         return icu_file
-    #     return getattr(icu_file, filters[type])
+    def filter_by_type(self, entries, type):
+        if type not in ('translated', 'untranslated', 'identical'):
+            return entries
+        keys = getattr(self.translation_file.get_message_status(), type)
+        return [entry for entry in entries if entry[0] in keys]
 
     def get_entries(self):
-        entries = self.translation_file.get_icufile_object()
-
-        # type_filter = self.request.GET.get('type')
-        # if type_filter:
-        #     entries = self.filter_by_type(entries, type_filter)
+        entries = self.translation_file.get_mapped_file() or self.translation_file.get_icufile_object()
 
+        # memory mapped files only decode the entries that can match a search,
+        # so search before filtering by type
         search_filter = self.request.GET.get('search_tags')
         if search_filter:
             entries = self.filter_by_search_tag(entries, search_filter)
 
+        type_filter = self.request.GET.get('type')
+        if type_filter:
+            entries = self.filter_by_type(entries, type_filter)
+
         return entries
 
     def get_formset_initial(self, page):
         return [translation for translation in page]
 
     def get_translations(self):
-        entries = self.get_entries()
-        return [{
+        return LazyTranslationList(list(self.get_entries()), self.get_translation)
+
+    def get_translation(self, entry):
+        msgid, translation = entry
+        return {
             'msgid': msgid,
             'md5hash': msgid,  # unique already
             'translation': translation,
             'old_translation': translation,
-        } for msgid, translation in entries]
+        }
 
     def get_context_data(self, **kwargs):
         context = super(ICUFileDetailView, self).get_context_data(**kwargs)
@@ -89,12 +96,21 @@ class ICUFileDetailView(BaseFileDetailView):
         return context
 
     def save_changes(self, changes):
-        icu_file = self.translation_file.get_icufile_object()
-        applied_changes, rejected_changes = update_translations(icu_file, changes)
+        with self.translation_file.lock():
+            icu_file = self.translation_file.get_icufile_object(for_update=True)
+            applied_changes, rejected_changes = update_translations(icu_file, changes)
+            if len(applied_changes) > 0:
+                previous_signature = get_file_signature(self.translation_file.filepath)
+                with transaction.atomic():
+                    self.translation_file.save_icufile_object(icu_file)
+                    self.log_edits(applied_changes)
+
+                changed_keys = set(change['msgid'] for form, change in applied_changes)
+                update_saved_messages(self.translation_file, [
+                    (icu_file.index[key], icu_message(key, icu_file[key])) for key in sorted(changed_keys)
+                ], previous_signature)
         if len(applied_changes) > 0:
-            icu_file.save()
             messages.success(self.request, _('Changed %d translations') % len(applied_changes))
-            self.log_edits(applied_changes)
         return rejected_changes
 
     def populate_old_data(self, form):
@@ -102,7 +118,7 @@ class ICUFileDetailView(BaseFileDetailView):
         icu_file = self.translation_file.get_icufile_object()
         for f in form:
             form_data = f.cleaned_data
-            form_data['old_translation'] = icu_file.contents[form_data['md5hash']]
+            form_data['old_translation'] = icu_file[form_data['md5hash']]
             new_form_data = {
                 '{}-{}'.format(f.prefix, k): form_data[k]
                 for k in form_data.keys()
@@ -0,0 +1,328 @@
+"""
+Running long tasks outside of the request.
+
+Views enqueue a ``Job``, which is executed by the job runner configured with
+``MOBETTA_JOB_RUNNER``. The state and progress of jobs is kept in the database,
+so it can be polled through the API (and survives restarts of the workers when
+using the ``DatabaseJobRunner``).
+"""
+from __future__ import absolute_import, unicode_literals
+
+import importlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.six.moves import queue
+
+from .autofill import autofill_translation_files
+from .compilation import COMPILED, FAILED, SKIPPED, compile_translation_files
+from .conf import settings as mobetta_settings
+from .discovery import discover_translation_files
+from .models import Job, TranslationFile
+from .search_index import (
+    PO, iter_translation_files, needs_refresh, refresh_catalogs,
+    refresh_search_index
+)
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def register(name):
+    """
+    Register the decorated function as the handler for jobs named ``name``.
+
+    The handler is called with the ``Job`` and its arguments, and returns a
+    text describing the result.
+    """
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, **arguments):
+    """
+    Create a job to call the handler for ``name`` with ``arguments`` and hand
+    it to the job runner.
+    """
+    if name not in _handlers:
+        raise ValueError("Unknown job {!r}".format(name))
+    job = Job.objects.create(name=name, arguments=json.dumps(arguments), created_by=user)
+    get_job_runner().submit(job)
+    return job
+
+
+def get_abandoned_cutoff():
+    """
+    Return the time before which pending and running jobs that made no
+    progress since are considered abandoned, see ``MOBETTA_JOB_TIMEOUT``.
+    """
+    return timezone.now() - timedelta(seconds=mobetta_settings.JOB_TIMEOUT)
+
+
+def fail_abandoned_jobs(cutoff=None):
+    """
+    Mark the pending and running jobs that made no progress since ``cutoff``
+    as failed, so they don't look unfinished forever after their worker died.
+    Returns the number of jobs.
+    """
+    if cutoff is None:
+        cutoff = get_abandoned_cutoff()
+    abandoned = Job.objects.filter(status__in=[Job.PENDING, Job.RUNNING], updated__lt=cutoff)
+    count = abandoned.update(
+        status=Job.FAILED, result="The job was abandoned by its worker.", finished=timezone.now())
+    if count:
+        logger.warning("Marked %s abandoned jobs as failed", count)
+    return count
+
+
+def enqueue_unique(name, user=None, **arguments):
+    """
+    Enqueue the job for ``name`` with ``arguments``, unless the same job is
+    pending already. Returns the job, or ``None``.
+    """
+    pending = Job.objects.filter(
+        name=name, arguments=json.dumps(arguments), status=Job.PENDING, updated__gte=get_abandoned_cutoff())
+    if pending.exists():
+        return None
+    return enqueue(name, user=user, **arguments)
+
+
+def enqueue_search_index_refresh(user=None):
+    """
+    Enqueue a refresh of the search index if it is older than
+    ``MOBETTA_SEARCH_INDEX_REFRESH_INTERVAL`` and no refresh is queued yet.
+    Returns the job, or ``None``.
+    """
+    cutoff = get_abandoned_cutoff()
+    fail_abandoned_jobs(cutoff)
+    pending = Job.objects.filter(
+        name='update_search_index', status__in=[Job.PENDING, Job.RUNNING], updated__gte=cutoff)
+    if pending.exists() or not needs_refresh():
+        return None
+    return enqueue('update_search_index', user=user)
+
+
+_refresh_checked = None
+_refresh_checked_lock = threading.Lock()
+
+
+def request_search_index_refresh(user=None):
+    """
+    Call ``enqueue_search_index_refresh`` for a search, at most once every
+    ``MOBETTA_SEARCH_INDEX_REFRESH_INTERVAL`` seconds per process, so
+    searches don't query and write the database every time. Returns the job,
+    or ``None``.
+    """
+    global _refresh_checked
+    now = time.time()
+    with _refresh_checked_lock:
+        if _refresh_checked is not None and now - _refresh_checked < mobetta_settings.SEARCH_INDEX_REFRESH_INTERVAL:
+            return None
+        _refresh_checked = now
+    return enqueue_search_index_refresh(user=user)
+
+
+def run_job(job_id):
+    """
+    Run the pending job with ``job_id``, unless another worker claimed it.
+    """
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+        status=Job.RUNNING, started=now, updated=now)
+    if not claimed:
+        return
+
+    job = Job.objects.get(pk=job_id)
+    try:
+        result = _handlers[job.name](job, **json.loads(job.arguments))
+    except Exception as exc:
+        # the traceback is only logged, the result is shown to the users
+        logger.exception("Job %s (%s) failed", job.pk, job.name)
+        job.status = Job.FAILED
+        job.result = '{}: {}'.format(type(exc).__name__, exc)
+    else:
+        job.status = Job.DONE
+        job.result = result or ''
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished', 'updated'])
+
+
+def run_pending_jobs():
+    """
+    Run all pending jobs, oldest first. Returns the number of jobs that were
+    picked up.
+    """
+    fail_abandoned_jobs()
+    job_ids = list(Job.objects.filter(status=Job.PENDING).order_by('created').values_list('pk', flat=True))
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
+
+
+class BaseJobRunner(object):
+
+    # whether jobs may start worker processes, which isn't safe in the
+    # (multithreaded) web processes: a forked child can deadlock on a lock
+    # that was held by another thread
+    use_processes = False
+
+    def submit(self, job):
+        raise NotImplementedError
+
+
+class SynchronousJobRunner(BaseJobRunner):
+    """
+    Run jobs immediately, in the request. Mostly useful for tests.
+    """
+
+    def submit(self, job):
+        run_job(job.pk)
+
+
+class ThreadJobRunner(BaseJobRunner):
+    """
+    Run jobs on a pool of background threads in the current process.
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        # the worker threads can only see the job once it is committed
+        transaction.on_commit(lambda: self._put(job.pk))
+
+    def _put(self, job_id):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name='mobetta-jobs')
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        self._queue.put(job_id)
+
+    def join(self):
+        """
+        Block until all submitted jobs are finished.
+        """
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                close_old_connections()
+                run_job(job_id)
+            except Exception:
+                logger.exception("Could not run job %s", job_id)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+class DatabaseJobRunner(BaseJobRunner):
+    """
+    Leave jobs in the database, to be run by the ``run_mobetta_jobs``
+    management command.
+    """
+    use_processes = True
+
+    def submit(self, job):
+        pass
+
+    def run_forever(self, interval=2):
+        while True:
+            if not run_pending_jobs():
+                time.sleep(interval)
+
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """
+    Return the job runner configured with ``MOBETTA_JOB_RUNNER``.
+    """
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                module_path, class_name = mobetta_settings.JOB_RUNNER.rsplit('.', 1)
+                runner = getattr(importlib.import_module(module_path), class_name)
+                _job_runner = runner(**mobetta_settings.JOB_RUNNER_OPTIONS)
+    return _job_runner
+
+
+@register('compile_translation_files')
+def compile_translation_files_job(job, force=False):
+    processes = None if get_job_runner().use_processes else 1
+    results = compile_translation_files(
+        TranslationFile.objects.all(), force=force, processes=processes, progress=job.set_progress)
+    compiled = [result for result in results if result.status == COMPILED]
+    lines = ["Compiled {} translation files in {:.1f} seconds, {} files were unchanged.".format(
+        len(compiled),
+        sum(result.duration for result in compiled),
+        len([result for result in results if result.status == SKIPPED]),
+    )]
+    lines += [
+        "Could not compile {}: {}".format(result.translation_file.filepath, result.error)
+        for result in results if result.status == FAILED
+    ]
+    return '\n'.join(lines)
+
+
+@register('locate_translation_files')
+def locate_translation_files_job(job, include_third_party=False):
+    result = discover_translation_files(
+        [code for code, name in settings.LANGUAGES], third_party_apps=include_third_party,
+        progress=job.set_progress)
+    return "Found {} new translation files.".format(len(result.created))
+
+
+@register('update_search_index')
+def update_search_index_job(job, rebuild=False):
+    indexed, removed, failed = refresh_search_index(rebuild=rebuild, progress=job.set_progress)
+    result = "Indexed {} translation files, removed {} from the search index.".format(indexed, removed)
+    if failed:
+        result += " Could not index {} files, see the log for details.".format(failed)
+    return result
+
+
+@register('refresh_translation_files')
+def refresh_translation_files_job(job, paths):
+    translation_files = list(iter_translation_files(paths))
+    for kind, translation_file in translation_files:
+        if kind == PO:
+            # only recomputed if Mobetta didn't just save the file itself
+            translation_file.get_statistics()
+    refresh_catalogs(translation_files)
+    return "Refreshed {} changed translation files.".format(len(translation_files))
+
+
+@register('autofill_translation_files')
+def autofill_translation_files_job(job, file_ids, min_similarity=None):
+    if job.created_by is None:
+        # the changes are logged as edits by this user
+        raise ValueError("The user who started the job no longer exists.")
+    refresh_search_index()
+    translation_files = TranslationFile.objects.filter(pk__in=file_ids).order_by('filepath')
+    results = autofill_translation_files(
+        translation_files, job.created_by, min_similarity=min_similarity, progress=job.set_progress)
+    return "Filled {} of {} untranslated messages in {} translation files from the translation memory.".format(
+        sum(result.filled for result in results),
+        sum(result.untranslated for result in results),
+        len(results),
+    )
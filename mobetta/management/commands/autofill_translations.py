@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from mobetta.autofill import autofill_translation_files
+from mobetta.models import TranslationFile
+from mobetta.search_index import refresh_search_index
+
+
+class Command(BaseCommand):
+    help = "Fill the untranslated messages of translation files from the translation memory, marked fuzzy."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file_ids', nargs='*', type=int,
+            help='Ids of the translation files to fill (default: all files of the languages)',
+        )
+        parser.add_argument(
+            '--language', action='append', dest='languages', default=[],
+            help='Fill the files of this language, can be repeated',
+        )
+        parser.add_argument(
+            '--user', required=True,
+            help='Username the changes are logged for',
+        )
+        parser.add_argument(
+            '--min-similarity', type=float, default=None,
+            help='Also use the translation of the most similar msgid if it is at least this similar (0 to 1)',
+        )
+
+    def handle(self, **options):
+        if not options['file_ids'] and not options['languages']:
+            raise CommandError("Give the ids of the translation files or a --language")
+
+        UserModel = get_user_model()
+        try:
+            user = UserModel.objects.get(**{UserModel.USERNAME_FIELD: options['user']})
+        except UserModel.DoesNotExist:
+            raise CommandError("Unknown user {!r}".format(options['user']))
+
+        translation_files = TranslationFile.objects.order_by('filepath')
+        if options['file_ids']:
+            translation_files = translation_files.filter(pk__in=options['file_ids'])
+        if options['languages']:
+            translation_files = translation_files.filter(language_code__in=options['languages'])
+
+        started = time.time()
+        # the translation memory is kept in the search index
+        refresh_search_index()
+        results = autofill_translation_files(translation_files, user, min_similarity=options['min_similarity'])
+
+        for result in results:
+            self.stdout.write("{}: filled {} of {} untranslated messages".format(
+                result.translation_file.filepath, result.filled, result.untranslated))
+        self.stdout.write("Filled {} messages in {} files in {:.1f} s".format(
+            sum(result.filled for result in results), len(results), time.time() - started))
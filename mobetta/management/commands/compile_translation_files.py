@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand
+
+from mobetta.compilation import (
+    COMPILED, FAILED, MISSING, compile_translation_files
+)
+from mobetta.models import TranslationFile
+
+
+class Command(BaseCommand):
+    help = "Compile the MO files of the translation files that changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Also compile the translation files that did not change',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of worker processes (default: MOBETTA_COMPILE_PROCESSES)',
+        )
+        parser.add_argument(
+            '--language', action='append', dest='languages', default=[],
+            help='Only compile the files of this language, can be repeated',
+        )
+
+    def handle(self, **options):
+        translation_files = TranslationFile.objects.order_by('filepath')
+        if options['languages']:
+            translation_files = translation_files.filter(language_code__in=options['languages'])
+
+        results = compile_translation_files(
+            translation_files, force=options['force'], processes=options['processes'])
+
+        for result in results:
+            path = result.translation_file.filepath
+            if result.status == COMPILED:
+                self.stdout.write("{}: compiled in {:.1f} ms".format(path, result.duration * 1000))
+            elif result.status == FAILED:
+                self.stderr.write("{}: {}".format(path, result.error))
+            elif result.status == MISSING:
+                self.stderr.write("{}: file not found".format(path))
+            elif options['verbosity'] > 1:
+                self.stdout.write("{}: unchanged".format(path))
+
+        compiled = [result for result in results if result.status == COMPILED]
+        self.stdout.write("Compiled {} of {} files in {:.1f} s".format(
+            len(compiled), len(results), sum(result.duration for result in compiled)))
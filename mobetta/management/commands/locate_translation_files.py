@@ -1,8 +1,7 @@
 from django.conf import settings
 from django.core.management import BaseCommand
 
-from mobetta.models import TranslationFile
-from mobetta.util import app_name_from_filepath, find_pofiles
+from mobetta.discovery import discover_translation_files
 
 
 class Command(BaseCommand):
@@ -13,21 +12,37 @@ class Command(BaseCommand):
             '--include-third-party', action='store_true',
             help='Detect translation files for third-party apps',
         )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='List all locale directories, also the ones that did not change since the last run',
+        )
 
     def handle(self, **options):
         """
         Find all translation files and populate the database with them.
         """
+        result = discover_translation_files(
+            [code for code, name in settings.LANGUAGES],
+            third_party_apps=options['include_third_party'],
+            full=options['full'],
+        )
+
+        found = {}
+        for lang_code, fp in result.found:
+            found.setdefault(lang_code, []).append(fp)
+        created = set(result.created)
 
         for lang_code, lang_name in settings.LANGUAGES:
-            filepaths = find_pofiles(lang_code, third_party_apps=options['include_third_party'])
+            filepaths = found.get(lang_code, [])
             if len(filepaths) > 0:
-                print("{} filepaths found for language {}".format(len(filepaths), lang_name))
+                self.stdout.write("{} filepaths found for language {}".format(len(filepaths), lang_name))
 
             for fp in filepaths:
-                obj, created = TranslationFile.objects.get_or_create(
-                    name=app_name_from_filepath(fp),
-                    filepath=fp,
-                    language_code=lang_code
-                )
-                self.stdout.write("{} Created: {}".format(fp, created))
+                self.stdout.write("{} Created: {}".format(fp, (lang_code, fp) in created))
+
+        for fp in result.invalidated:
+            self.stdout.write("{} is missing, marked invalid".format(fp))
+        for fp in result.restored:
+            self.stdout.write("{} was found again, marked valid".format(fp))
+
+        self.stdout.write("Listed {} directories, {} were unchanged".format(result.listed, result.reused))
@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from mobetta.jobs import DatabaseJobRunner, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run the jobs enqueued for the DatabaseJobRunner."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run the pending jobs and exit, instead of waiting for new jobs',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Number of seconds to wait between checks for new jobs',
+        )
+
+    def handle(self, **options):
+        if options['once']:
+            count = run_pending_jobs()
+            self.stdout.write("Ran {} jobs".format(count))
+        else:
+            DatabaseJobRunner().run_forever(interval=options['interval'])
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management import BaseCommand
+
+from mobetta.search_index import get_search_index, refresh_search_index
+
+
+class Command(BaseCommand):
+    help = "Index the translation files that changed for searching across files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Index all translation files again',
+        )
+
+    def handle(self, **options):
+        started = time.time()
+        indexed, removed, failed = refresh_search_index(rebuild=options['rebuild'])
+        self.stdout.write("Indexed {} files and removed {} files in {:.1f} s ({})".format(
+            indexed, removed, time.time() - started, get_search_index().path))
+        if failed:
+            self.stderr.write("Could not index {} files, see the log for details".format(failed))
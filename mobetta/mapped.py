@@ -0,0 +1,587 @@
+"""
+Reading large catalogs through a memory map.
+
+``reader.Catalog`` keeps the decoded text of a PO file in the memory of every
+worker process. For large files, ``MappedCatalog`` maps the file instead and
+keeps only the byte offsets and a few state flags per entry, so all workers
+share the one copy of the file in the page cache. Entries are decoded when they
+are accessed.
+
+Searches for plain text look for the encoded text in the mapped file first (in
+any case that ``search.LiteralMatcher`` matches, escaped or not and across
+string continuation lines), so only the entries that can match are decoded.
+The same is done for flat ICU JSON files.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import array
+import bisect
+import codecs
+import json
+import mmap
+import os
+import re
+import struct
+from collections import OrderedDict
+
+from .cache import get_stat_signature
+from .conf import settings as mobetta_settings
+from .reader import (
+    Catalog, detect_encoding, iter_entries, iter_lines, parse_metadata,
+    read_catalog
+)
+from .search import fold, get_fold_sources, is_literal
+
+# state flags of the entries of a ``MappedCatalog``
+OBSOLETE = 1
+FUZZY = 2
+TRANSLATED = 4
+
+# longer queries are checked against every entry instead
+MAX_PREFILTER_LENGTH = 100
+
+# or when the regex gets larger than this, which happens when many parts of
+# the query can also be written as a single character (like 'ss' as '\xdf')
+MAX_PREFILTER_SIZE = 1 << 16
+
+# what may separate two characters of a string in a PO file: the end of a
+# line and the start of a continuation line
+PO_CONTINUATION = br'(?:"\s*(?:#~\s*)?")?'
+
+PO_ESCAPES = {
+    '\\': [b'\\\\', b'\\'],
+    '"': [b'\\"'],
+    '\n': [b'\\n'],
+    '\t': [b'\\t', b'\t'],
+    '\r': [b'\\r', b'\r'],
+    '\v': [b'\\v', b'\v'],
+    '\b': [b'\\b', b'\b'],
+    '\f': [b'\\f', b'\f'],
+}
+
+JSON_ESCAPES = {
+    '\\': [b'\\\\'],
+    '"': [b'\\"'],
+    '/': [b'\\/', b'/'],
+    '\n': [b'\\n'],
+    '\t': [b'\\t'],
+    '\r': [b'\\r'],
+    '\b': [b'\\b'],
+    '\f': [b'\\f'],
+}
+
+# a key/value pair of a JSON object with string values, capturing the
+# (escaped) key and value; the strings are matched with an unrolled loop,
+# which is a lot faster than an alternation per character
+JSON_PAIR_RE = re.compile(br'\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*', re.DOTALL)
+WHITESPACE_RE = re.compile(br'\s*')
+
+
+class FileChanged(IOError):
+    """
+    A memory mapped file was changed in place since it was mapped.
+    """
+
+
+def map_file(path):
+    """
+    Return a read-only memory map of the file at ``path`` (``b''`` if it is
+    empty, those can't be mapped).
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _encode(char, encoding):
+    try:
+        return char.encode(encoding)
+    except UnicodeError:
+        return None
+
+
+def po_patterns(char, encoding):
+    """
+    Return regexes for the ways ``char`` can be written in a PO file in
+    ``encoding``.
+    """
+    forms = list(PO_ESCAPES.get(char, ()))
+    if char not in ('\\', '"', '\n'):
+        encoded = _encode(char, encoding)
+        if encoded is not None:
+            forms.append(encoded)
+    return {re.escape(form) for form in forms}
+
+
+def json_patterns(char, encoding='utf-8'):
+    """
+    Return regexes for the ways ``char`` can be written in a JSON string in
+    ``encoding``.
+    """
+    forms = list(JSON_ESCAPES.get(char, ()))
+    if char not in ('\\', '"') and char >= ' ':
+        encoded = _encode(char, encoding)
+        if encoded is not None:
+            forms.append(encoded)
+    patterns = {re.escape(form) for form in forms}
+
+    # \uXXXX escapes in either case, with a surrogate pair for characters
+    # outside of the BMP
+    units = char.encode('utf-16-be')
+    codes = struct.unpack(str('>{}H'.format(len(units) // 2)), units)
+    patterns.add(b''.join(
+        br'\\u' + b''.join(
+            '[{}{}]'.format(digit, digit.upper()).encode('ascii') if digit.isalpha() else digit.encode('ascii')
+            for digit in '{:04x}'.format(code)
+        )
+        for code in codes
+    ))
+    return patterns
+
+
+def build_prefilter(query, patterns, separator=b''):
+    """
+    Return a bytes regex that finds the text ``query`` in any case, with each
+    character written as one of its ``patterns(char)`` and separated by
+    ``separator``.
+
+    It matches all text that contains ``query`` when case folded, like
+    ``search.LiteralMatcher`` does, so also ``'STRASSE'`` for ``'Stra\xdfe'``.
+    Returns ``None`` if the query isn't plain text or is too long.
+    """
+    if not query or not is_literal(query) or len(query) > MAX_PREFILTER_LENGTH:
+        return None
+
+    folded = fold(query)
+    length = len(folded)
+    sources = get_fold_sources()
+    # foldings of single characters into several, like 'ss' for '\xdf'
+    expansions = [text for text in sources if len(text) > 1]
+    longest = max(len(text) for text in expansions)
+
+    def forms(text):
+        # the patterns of the characters that fold to ``text``
+        alternatives = set()
+        for char in sources.get(text, ()):
+            alternatives.update(patterns(char))
+        if len(text) == 1:
+            alternatives.update(patterns(text))
+        return alternatives
+
+    def options_at(position):
+        # ``(patterns, rest)`` for the text from ``position`` on: the folding
+        # of the next one or more characters and the rest after them, or a
+        # single character whose folding starts with all of the rest
+        options = [
+            (forms(folded[position:position + size]), rests[position + size])
+            for size in range(1, min(longest, length - position) + 1)
+        ]
+        options.extend(
+            (forms(text), b'') for text in expansions
+            if len(text) > length - position and text.startswith(folded[position:])
+        )
+        return [(alternatives, rest) for alternatives, rest in options if alternatives and rest is not None]
+
+    rests = [None] * length + [b'']
+    for position in reversed(range(1, length)):
+        rests[position] = _group(
+            _alternation(alternatives) + separator + rest if rest else _alternation(alternatives)
+            for alternatives, rest in options_at(position)
+        )
+        if rests[position] is not None and len(rests[position]) > MAX_PREFILTER_SIZE:
+            return None
+
+    # the text can also start inside the folding of a character
+    options = options_at(0)
+    for text in expansions:
+        for size in range(1, min(len(text) - 1, length) + 1):
+            if text.endswith(folded[:size]) and rests[size] is not None:
+                options.append((forms(text), rests[size]))
+        if folded in text[1:-1]:
+            options.append((forms(text), b''))
+
+    # every alternative starts with a literal, so ``re`` can skip ahead to
+    # the bytes a match can start with
+    pattern = _group(
+        pattern + separator + rest if rest else pattern
+        for alternatives, rest in options for pattern in alternatives
+    )
+    if pattern is None:
+        # the text can't be in the file at all
+        return re.compile(b'(?!)')
+    if len(pattern) > MAX_PREFILTER_SIZE:
+        return None
+    return re.compile(pattern)
+
+
+def _group(options):
+    options = sorted(set(option for option in options if option is not None))
+    if not options:
+        return None
+    if len(options) == 1:
+        return options[0]
+    return b'(?:' + b'|'.join(options) + b')'
+
+
+def _alternation(patterns):
+    # single bytes go into a character class, which is a lot faster to match
+    single = sorted(pattern for pattern in patterns if len(re.sub(br'\\(.)', br'\1', pattern)) == 1)
+    longer = sorted((pattern for pattern in patterns if pattern not in single), key=lambda p: (-len(p), p))
+    if single:
+        longer.append(single[0] if len(single) == 1 else b'[' + b''.join(single) + b']')
+    if len(longer) == 1:
+        return longer[0]
+    # longest first, so escapes are matched as a whole
+    return b'(?:' + b'|'.join(longer) + b')'
+
+
+class EntrySubset(object):
+    """
+    The entries at ``indices`` of a ``MappedCatalog``, decoded on access.
+    """
+
+    def __init__(self, catalog, indices):
+        self.catalog = catalog
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        return (self.catalog[index] for index in self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.catalog[i] for i in self.indices[index]]
+        return self.catalog[self.indices[index]]
+
+    def search(self, matches, query=None):
+        return self.catalog.search(matches, query, indices=self.indices)
+
+
+class MappedCatalog(Catalog):
+    """
+    A ``reader.Catalog`` for a memory mapped PO file.
+
+    The encoding of the file must write newlines as ``\\n`` bytes, see
+    ``can_map``.
+
+    The map is kept open with the catalog. Reading a map of a file that was
+    truncated in place (rather than replaced, like Mobetta writes files)
+    crashes the process with ``SIGBUS``, so the file is checked before the
+    map is used, and ``FileChanged`` is raised if it changed.
+    """
+
+    def __init__(self, path, encoding):
+        # the entries are decoded on access, so the parent isn't initialized
+        self.path = path
+        self.encoding = encoding
+        self.metadata = {}
+        self.signature = None
+        self._file = None
+        self._data = None
+
+        self._starts = array.array(str('l'))
+        self._ends = array.array(str('l'))
+        self._states = array.array(str('B'))
+        candidates = []
+        for entry, start, end in iter_entries(iter_lines(self.data), path, encoding=encoding):
+            if entry.msgid == '' and not entry.obsolete:
+                candidates.append((len(self._starts), entry.msgctxt, entry.msgstr))
+            self._starts.append(start)
+            self._ends.append(end)
+            self._states.append(
+                (OBSOLETE if entry.obsolete else 0) |
+                (FUZZY if entry.fuzzy else 0) |
+                (TRANSLATED if entry.translated() else 0)
+            )
+
+        if candidates:
+            # the same entry ``reader.Catalog`` picks as the metadata
+            without_context = [candidate for candidate in candidates if not candidate[1]]
+            index, msgctxt, msgstr = without_context[-1] if without_context else candidates[0]
+            self.metadata = parse_metadata(msgstr)
+            del self._starts[index]
+            del self._ends[index]
+            del self._states[index]
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._file = open(self.path, 'rb')
+            signature = get_stat_signature(os.fstat(self._file.fileno()))
+            if self.signature is None:
+                self.signature = signature
+            if signature != self.signature:
+                # the offsets of the entries are those of the mapped version
+                self.close()
+                raise FileChanged("{} was replaced since it was read".format(self.path))
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if signature[1] else b''
+        elif get_stat_signature(os.fstat(self._file.fileno())) != self.signature:
+            self.close()
+            raise FileChanged("{} was changed in place since it was mapped".format(self.path))
+        return self._data
+
+    def close(self):
+        """
+        Close the map, it is opened again on access.
+        """
+        if hasattr(self._data, 'close'):
+            self._data.close()
+        if self._file is not None:
+            self._file.close()
+        self._data = self._file = None
+
+    def __getstate__(self):
+        # the map can't be pickled, it's opened again on access
+        state = self.__dict__.copy()
+        state['_data'] = state['_file'] = None
+        return state
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return (self._decode(index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._decode(index)
+
+    def get_text(self, index):
+        text = self.data[self._starts[index]:self._ends[index]].decode(self.encoding)
+        if text.startswith(codecs.BOM_UTF8.decode('utf-8')):
+            text = text[1:]
+        return text.replace('\r\n', '\n')
+
+    def _decode(self, index):
+        for entry, start, end in iter_entries(iter_lines(self.get_text(index)), self.path):
+            entry._catalog = self
+            entry._index = index
+            return entry
+
+    def _select(self, include, exclude=0):
+        return EntrySubset(self, array.array(str('l'), (
+            index for index, state in enumerate(self._states)
+            if state & include == include and not state & exclude
+        )))
+
+    def translated_entries(self):
+        return self._select(TRANSLATED)
+
+    def untranslated_entries(self):
+        return self._select(0, TRANSLATED | OBSOLETE | FUZZY)
+
+    def fuzzy_entries(self):
+        return self._select(FUZZY, OBSOLETE)
+
+    def obsolete_entries(self):
+        return self._select(OBSOLETE)
+
+    def get_prefilter(self, query):
+        return build_prefilter(query, lambda char: po_patterns(char, self.encoding), PO_CONTINUATION)
+
+    def find_candidates(self, prefilter):
+        """
+        Return the indices of the entries whose text ``prefilter`` matches.
+        """
+        data = self.data
+        found = array.array(str('l'))
+        match = prefilter.search(data)
+        while match is not None:
+            index = bisect.bisect_right(self._starts, match.start()) - 1
+            if index >= 0 and match.start() < self._ends[index]:
+                found.append(index)
+                # continue after the entry
+                match = prefilter.search(data, self._ends[index])
+            else:
+                match = prefilter.search(data, match.start() + 1)
+        return found
+
+    def search(self, matches, query=None, indices=None):
+        """
+        Return the entries (of those at ``indices``) for which
+        ``matches(entry)`` is true.
+
+        ``query`` is the text that is searched for. If it is plain text, only
+        the entries that contain it are decoded.
+        """
+        prefilter = self.get_prefilter(query) if query else None
+        if prefilter is not None:
+            candidates = self.find_candidates(prefilter)
+            if indices is not None:
+                subset = set(indices)
+                candidates = [index for index in candidates if index in subset]
+        elif indices is not None:
+            candidates = indices
+        else:
+            candidates = range(len(self))
+        return EntrySubset(self, array.array(str('l'), (
+            index for index in candidates if matches(self._decode(index))
+        )))
+
+
+def is_large_file(path):
+    """
+    Return whether the file at ``path`` is larger than
+    ``MOBETTA_MMAP_THRESHOLD``.
+    """
+    threshold = mobetta_settings.MMAP_THRESHOLD
+    return threshold is not None and os.path.getsize(path) >= threshold
+
+
+def can_map(encoding):
+    """
+    Return whether PO files in ``encoding`` can be read with
+    ``MappedCatalog``.
+    """
+    return '\n"#'.encode(encoding) == b'\n"#'
+
+
+def load_catalog(path):
+    """
+    Read the PO file at ``path`` into a ``MappedCatalog`` if it is larger than
+    ``MOBETTA_MMAP_THRESHOLD``, or else with ``reader.read_catalog``.
+    """
+    if is_large_file(path):
+        encoding = detect_encoding(path)
+        if can_map(encoding):
+            return MappedCatalog(path, encoding)
+    return read_catalog(path)
+
+
+def iter_json_matches(data):
+    """
+    Yield the matches of ``JSON_PAIR_RE`` for the key/value pairs of the JSON
+    object in ``data``, parsing it incrementally.
+
+    Raises ``ValueError`` if ``data`` isn't a (flat) object with string
+    values.
+    """
+    position = WHITESPACE_RE.match(data).end()
+    if data[position:position + 1] != b'{':
+        raise ValueError("Not a JSON object")
+    position += 1
+    match = JSON_PAIR_RE.match(data, position)
+    while match is not None:
+        yield match
+        position = match.end()
+        if data[position:position + 1] != b',':
+            break
+        match = JSON_PAIR_RE.match(data, position + 1)
+        if match is None:
+            raise ValueError("Expected a key/value pair at offset {}".format(position + 1))
+
+    position = WHITESPACE_RE.match(data, position).end()
+    if data[position:position + 1] != b'}' or WHITESPACE_RE.match(data, position + 1).end() != len(data):
+        raise ValueError("Not a flat JSON object with string values (at offset {})".format(position))
+
+
+def decode_json_string(escaped):
+    """
+    Decode the contents of a JSON string (without the quotes).
+    """
+    if b'\\' not in escaped:
+        return escaped.decode('utf-8')
+    return json.loads('"{}"'.format(escaped.decode('utf-8')))
+
+
+def decode_json_match(match):
+    key, value = match.groups()
+    return decode_json_string(key), decode_json_string(value)
+
+
+def unique_json_matches(data):
+    """
+    Return the matches of ``iter_json_matches`` for ``data``, one per key in
+    the order the keys first appear. Like ``json.load`` with an
+    ``OrderedDict``, the last value of a duplicate key wins.
+    """
+    matches = OrderedDict()
+    for match in iter_json_matches(data):
+        matches[decode_json_string(match.group(1))] = match
+    return list(matches.values())
+
+
+def load_json_pairs(path):
+    """
+    Return the top-level ``(key, value)`` pairs of the JSON object in the file
+    at ``path``, with the values as ``json.load`` returns them. Raises
+    ``ValueError`` if the file doesn't hold an object.
+    """
+    with open(path, 'rb') as infile:
+        data = json.loads(infile.read().decode('utf-8'), object_pairs_hook=OrderedDict)
+    if not isinstance(data, OrderedDict):
+        raise ValueError("Not a JSON object")
+    return list(data.items())
+
+
+class MappedJSONFile(object):
+    """
+    An ICU JSON file, read through a memory map one key/value pair at a time
+    if it is a flat object with string values. Other objects are parsed with
+    ``load_json_pairs``. Duplicate keys are handled like ``json.load`` does.
+
+    Iterating raises ``ValueError`` if the file doesn't hold an object.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        data = map_file(self.path)
+        try:
+            try:
+                matches = unique_json_matches(data)
+            except ValueError:
+                matches = None
+            else:
+                for match in matches:
+                    yield decode_json_match(match)
+        finally:
+            if hasattr(data, 'close'):
+                data.close()
+        if matches is None:
+            # not flat, the values are parsed as they are
+            for pair in load_json_pairs(self.path):
+                yield pair
+
+    def search(self, matches, query=None):
+        """
+        Return the ``(key, value)`` pairs for which ``matches(pair)`` is true.
+
+        If ``query`` is plain text, only the pairs that contain it are
+        decoded.
+        """
+        prefilter = build_prefilter(query, json_patterns) if query else None
+        if prefilter is None:
+            return [pair for pair in self if matches(pair)]
+
+        data = map_file(self.path)
+        try:
+            try:
+                json_matches = unique_json_matches(data)
+            except ValueError:
+                pass
+            else:
+                hits = array.array(str('l'), (match.start() for match in prefilter.finditer(data)))
+                found = []
+                for match in json_matches:
+                    # the first match at or after the start of the pair
+                    hit = bisect.bisect_left(hits, match.start())
+                    if hit < len(hits) and hits[hit] < match.end():
+                        pair = decode_json_match(match)
+                        if matches(pair):
+                            found.append(pair)
+                return found
+        finally:
+            if hasattr(data, 'close'):
+                data.close()
+        # not flat, the values are parsed as they are
+        return [pair for pair in self if matches(pair)]
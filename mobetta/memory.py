@@ -0,0 +1,195 @@
+"""
+Translation memory: the translations of msgids in the other PO files.
+
+The translations are stored in the search index database (see
+``search_index``), which is kept up to date by the refresh job and by saves.
+Exact matches are looked up by the msgid with its whitespace normalized. For
+fuzzy matches, every process keeps a trigram index of the msgids per language
+that only has to add the msgids that are new since the last lookup. The
+msgids sharing the most trigrams with the looked up msgid are then ranked by
+their edit distance to it.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import Counter
+
+from .search import fold
+from .search_index import get_search_index, normalize_source
+from .trigrams import TrigramIndex, get_trigrams, normalize
+
+# the number of msgids that share the most trigrams with the looked up msgid
+# that are ranked by edit distance
+MAX_CANDIDATES = 50
+
+# the trigrams of a msgid are counted from the rarest on, until this many
+# positions were counted
+MAX_COUNTED_POSITIONS = 20000
+
+
+def levenshtein(a, b):
+    """
+    Return the edit distance between ``a`` and ``b``: the number of
+    characters that have to be inserted, deleted or replaced to turn one into
+    the other.
+
+    Uses the bit-parallel algorithm of Myers (as extended by Hyyro), with a
+    Python integer as the bit vector for the characters of the shorter text.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+
+    masks = {}
+    for i, char in enumerate(b):
+        masks[char] = masks.get(char, 0) | (1 << i)
+
+    length = len(b)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative = full, 0
+    distance = length
+    for char in a:
+        match = masks.get(char, 0)
+        vertical = match | negative
+        horizontal = (((match & positive) + positive) ^ positive) | match
+        horizontal_positive = negative | ~(horizontal | positive)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1) | 1
+        horizontal_negative <<= 1
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & full
+        negative = horizontal_positive & vertical & full
+    return distance
+
+
+def edit_similarity(a, b):
+    """
+    Return 1 minus the edit distance between ``a`` and ``b`` relative to the
+    length of the longer one.
+    """
+    longest = max(len(a), len(b))
+    return 1.0 - float(levenshtein(a, b)) / longest if longest else 1.0
+
+
+class MemoryIndex(TrigramIndex):
+    """
+    A trigram index of the translation memory sources of a language, that new
+    sources can be added to.
+    """
+
+    def __init__(self):
+        super(MemoryIndex, self).__init__(())
+        self.source_ids = []
+        self.texts = []
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def add(self, source_id, source):
+        text = normalize(source)
+        super(MemoryIndex, self).add(text)
+        self.source_ids.append(source_id)
+        self.texts.append(text)
+        self.last_id = max(self.last_id, source_id)
+
+    def most_shared(self, source, count=MAX_CANDIDATES):
+        """
+        Return ``(source id, text)`` for up to ``count`` sources that share
+        the most trigrams with ``source``.
+
+        Trigrams that are in many sources say little about the similarity, they
+        are only counted as long as few positions were counted.
+        """
+        postings = sorted((self._postings.get(trigram, ()) for trigram in get_trigrams(normalize(source))), key=len)
+        shared = Counter()
+        counted = 0
+        for positions in postings:
+            if shared and counted + len(positions) > MAX_COUNTED_POSITIONS:
+                break
+            shared.update(positions)
+            counted += len(positions)
+        return [(self.source_ids[position], self.texts[position]) for position, n in shared.most_common(count)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_memory_index(search_index, language_code):
+    """
+    Return the ``MemoryIndex`` of the sources of the language in
+    ``search_index``, with the sources that were added since the last call.
+    Hold its ``lock`` while using it.
+    """
+    key = (search_index.path, language_code)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or search_index.get_last_source_id() < index.last_id:
+            # a new database
+            _indexes[key] = index = MemoryIndex()
+
+    with index.lock:
+        for source_id, source in search_index.get_sources(language_code, after=index.last_id):
+            index.add(source_id, source)
+    return index
+
+
+class MemoryMatch(object):
+
+    def __init__(self, msgid, msgstr, similarity, count, kind, file_id, file_name):
+        self.msgid = msgid
+        self.msgstr = msgstr
+        self.similarity = similarity
+        self.count = count
+        self.kind = kind
+        self.file_id = file_id
+        self.file_name = file_name
+
+
+def lookup(msgid, language_code, limit=5, min_similarity=0.6):
+    """
+    Return the exact and the fuzzy ``MemoryMatch``es for ``msgid`` in the
+    translation memory of the language.
+
+    The exact matches are the translations of the same msgid, the most used
+    first. The fuzzy matches are the translations of the (up to ``limit``)
+    other msgids with an edit similarity (see ``edit_similarity``) of at least
+    ``min_similarity``, the most similar first.
+    """
+    search_index = get_search_index()
+    source = normalize_source(msgid)
+    if not source:
+        return [], []
+
+    source_id = search_index.get_source_id(language_code, source)
+    exact = [
+        MemoryMatch(source, msgstr, 1.0, count, kind, file_id, file_name)
+        for __, __, msgstr, count, kind, file_id, file_name in search_index.get_translations(
+            [source_id] if source_id is not None else []
+        )
+    ]
+
+    folded = fold(source)
+    similarities = {}
+    index = get_memory_index(search_index, language_code)
+    with index.lock:
+        candidates = index.most_shared(source)
+    for candidate_id, text in candidates:
+        if candidate_id != source_id:
+            similarity = edit_similarity(folded, text.strip())
+            if similarity >= min_similarity:
+                similarities[candidate_id] = similarity
+
+    fuzzy = {}
+    for row in search_index.get_translations(similarities):
+        # the most used translation of each msgid
+        candidate_id, candidate, msgstr, count, kind, file_id, file_name = row
+        if candidate_id not in fuzzy:
+            fuzzy[candidate_id] = MemoryMatch(
+                candidate, msgstr, similarities[candidate_id], count, kind, file_id, file_name)
+    fuzzy = sorted(fuzzy.values(), key=lambda match: (-match.similarity, -match.count, match.msgid))
+    return exact, fuzzy[:limit]
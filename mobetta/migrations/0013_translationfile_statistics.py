@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobetta', '0012_auto_20180329_1057'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationfile',
+            name='statistics_signature',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='percent_translated',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='total_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='translated_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='fuzzy_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='obsolete_messages',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def reset_statistics(apps, schema_editor):
+    """
+    Force the statistics to be recomputed to include the new counters.
+    """
+    TranslationFile = apps.get_model("mobetta", "TranslationFile")
+    TranslationFile.objects.update(statistics_signature='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobetta', '0013_translationfile_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationfile',
+            name='total_words',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='translated_words',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='total_characters',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='translationfile',
+            name='translated_characters',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(reset_statistics, migrations.RunPython.noop),
+    ]
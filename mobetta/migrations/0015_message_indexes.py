@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobetta', '0014_translationfile_word_statistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='editlog',
+            index=models.Index(fields=['file_edited', 'msghash', 'created'], name='mobetta_editlog_msghash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagecomment',
+            index=models.Index(fields=['translation_file', 'msghash'], name='mobetta_comment_msghash_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobetta', '0015_message_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationfile',
+            name='compiled_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+    ]
@@ -8,9 +8,18 @@ from django.db import models
 from django.utils import timezone
 from six import python_2_unicode_compatible
 
-import polib
-
-from .util import app_name_from_filepath
+from .cache import (
+    file_saved, get_catalog_cache, get_current_signature, get_file_signature
+)
+from .compilation import compile_pofile
+from .files import atomic_write, file_lock
+from .mapped import load_catalog
+from .patching import (
+    copy_pofile, get_changed_entries, load_pofile, write_pofile
+)
+from .search_index import format_occurrences, po_message, update_saved_messages
+from .trigrams import CatalogMsgidIndex, CatalogTextIndex
+from .util import app_name_from_filepath, get_catalog_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +34,34 @@ class TranslationFile(models.Model):
     language_code = models.CharField(max_length=32, choices=settings.LANGUAGES, blank=False)
     created = models.DateTimeField(auto_now_add=True)
     last_compiled = models.DateTimeField(null=True)
+    # content hash of the PO file as of ``last_compiled``
+    compiled_hash = models.CharField(max_length=40, blank=True, editable=False)
     is_valid = models.BooleanField(default=True)
 
+    # statistics of the file, as of the file version in ``statistics_signature``
+    statistics_signature = models.CharField(max_length=64, blank=True, editable=False)
+    percent_translated = models.PositiveSmallIntegerField(default=0, editable=False)
+    total_messages = models.PositiveIntegerField(default=0, editable=False)
+    translated_messages = models.PositiveIntegerField(default=0, editable=False)
+    fuzzy_messages = models.PositiveIntegerField(default=0, editable=False)
+    obsolete_messages = models.PositiveIntegerField(default=0, editable=False)
+    total_words = models.PositiveIntegerField(default=0, editable=False)
+    translated_words = models.PositiveIntegerField(default=0, editable=False)
+    total_characters = models.PositiveIntegerField(default=0, editable=False)
+    translated_characters = models.PositiveIntegerField(default=0, editable=False)
+
+    statistics_fields = [
+        'percent_translated',
+        'total_messages',
+        'translated_messages',
+        'fuzzy_messages',
+        'obsolete_messages',
+        'total_words',
+        'translated_words',
+        'total_characters',
+        'translated_characters',
+    ]
+
     def __str__(self):
         return "{} ({})".format(self.name, self.filepath)
 
@@ -34,14 +69,78 @@ class TranslationFile(models.Model):
     def model_name(self):
         return app_name_from_filepath(self.filepath)
 
-    def get_polib_object(self):
-        return polib.pofile(self.filepath)
+    def get_polib_object(self, for_update=False):
+        """
+        Return the parsed PO file.
+
+        The parsed file is shared through the catalog cache for as long as the
+        file is unchanged on disk, so it must not be changed. With
+        ``for_update``, return a copy of it that can be changed and written
+        with ``save_polib_object``, which only then replaces the cached file.
+        """
+        pofile = get_catalog_cache().get(self.filepath, load_pofile)
+        return copy_pofile(pofile) if for_update else pofile
+
+    def get_catalog(self):
+        """
+        Return the PO file read with ``reader.read_catalog`` (or memory mapped,
+        for large files), which is cheaper to build than the ``polib`` object
+        but can't be changed and saved.
+        """
+        return get_catalog_cache().get(self.filepath, load_catalog, variant='reader')
+
+    def get_text_index(self):
+        """
+        Return the ``trigrams.CatalogTextIndex`` of the entries of
+        ``get_catalog``, for narrowing down plain text searches.
+        """
+        return get_catalog_cache().get(
+            self.filepath, lambda path: CatalogTextIndex(self.get_catalog()), variant='trigrams')
+
+    def get_msgid_index(self):
+        """
+        Return the ``trigrams.CatalogMsgidIndex`` of the entries of
+        ``get_catalog``, for finding similar messages.
+        """
+        return get_catalog_cache().get(
+            self.filepath, lambda path: CatalogMsgidIndex(self.get_catalog()), variant='msgid-trigrams')
+
+    def save_polib_object(self, pofile):
+        """
+        Write ``pofile`` to disk and keep it as the cached version of the file.
+
+        The file is replaced atomically, use ``lock`` to guard the whole
+        read-modify-write cycle against concurrent saves. If only a few entries
+        were changed (see ``patching.mark_changed``), only those entries are
+        rendered again. The changed entries are updated in the search index.
+        """
+        cache = get_catalog_cache()
+        previous_signature = get_file_signature(self.filepath)
+        changed_entries = get_changed_entries(pofile)
+        try:
+            write_pofile(self.filepath, pofile, atomic_write)
+        except Exception:
+            cache.invalidate(self.filepath)
+            raise
+        file_saved(self.filepath)
+        cache.set(self.filepath, pofile)
+        self.refresh_statistics(pofile)
+
+        if changed_entries is not None:
+            update_saved_messages(self, [
+                (index, po_message(entry, format_occurrences(entry.occurrences)))
+                for index, entry in changed_entries
+            ], previous_signature)
+
+    def lock(self, timeout=None):
+        """
+        Return a context manager holding the lock for saving this file.
+        """
+        return file_lock(self.filepath, timeout=timeout)
 
     def save_mofile(self):
         if os.path.isfile(self.filepath):
-            pofile = polib.pofile(self.filepath)
-            mopath = "{}mo".format(self.filepath[:-2])
-            pofile.save_as_mofile(mopath)
+            self.compiled_hash = compile_pofile(self.filepath)
             self.last_compiled = timezone.now()
         else:
             self.is_valid = False
@@ -55,31 +154,46 @@ class TranslationFile(models.Model):
         - messages translated
         - fuzzy messages
         - obsolete messages
+        - total and translated words and characters
+
+        The statistics are stored on the model and only recomputed when the
+        file changed on disk since they were last computed.
         """
-        try:
-            pofile = self.get_polib_object()
-        except Exception as exc:
-            logger.warning("Could not get polib object", exc_info=True)
-            return {
-                'percent_translated': 0,
-                'total_messages': 0,
-                'translated_messages': 0,
-                'fuzzy_messages': 0,
-                'obsolete_messages': 0
-            }
-
-        translated_entries = len(pofile.translated_entries())
-        untranslated_entries = len(pofile.untranslated_entries())
-        fuzzy_entries = len(pofile.fuzzy_entries())
-        obsolete_entries = len(pofile.obsolete_entries())
-
-        return {
-            'percent_translated': pofile.percent_translated(),
-            'total_messages': translated_entries + untranslated_entries,
-            'translated_messages': translated_entries,
-            'fuzzy_messages': fuzzy_entries,
-            'obsolete_messages': obsolete_entries,
-        }
+        signature = get_current_signature(self.filepath)
+        if signature is None:
+            logger.warning("Could not get statistics, %s does not exist", self.filepath)
+            return {field: 0 for field in self.statistics_fields}
+
+        if self.statistics_signature != self._format_signature(signature):
+            self.refresh_statistics()
+
+        return {field: getattr(self, field) for field in self.statistics_fields}
+
+    def refresh_statistics(self, pofile=None):
+        """
+        Recompute and store the statistics for the current version of the
+        file, using the already parsed ``pofile`` if it is given.
+        """
+        signature = get_file_signature(self.filepath)
+        if pofile is None:
+            try:
+                pofile = self.get_catalog()
+            except Exception:
+                # keep the statistics empty until the file changes
+                logger.warning("Could not read catalog", exc_info=True)
+                pofile = []
+
+        statistics = get_catalog_statistics(pofile)
+        for field in self.statistics_fields:
+            setattr(self, field, statistics[field])
+        self.statistics_signature = self._format_signature(signature)
+
+        if self.pk:
+            self.save(update_fields=self.statistics_fields + ['statistics_signature'])
+
+    @staticmethod
+    def _format_signature(signature):
+        return ':'.join(str(part) for part in signature) if signature else ''
 
     def get_language_name(self):
         return dict(settings.LANGUAGES)[self.language_code]
@@ -120,6 +234,12 @@ class EditLog(BaseEditLog):
         related_name='edit_logs', on_delete=models.CASCADE
     )
 
+    class Meta(BaseEditLog.Meta):
+        indexes = [
+            # history of a message in a file, newest first
+            models.Index(fields=['file_edited', 'msghash', 'created'], name='mobetta_editlog_msghash_idx'),
+        ]
+
 
 class BaseMessageComment(models.Model):
     created = models.DateTimeField(auto_now_add=True)
@@ -150,3 +270,64 @@ class MessageComment(BaseMessageComment):
         TranslationFile, blank=False, null=False,
         related_name='comments', on_delete=models.CASCADE
     )
+
+    class Meta(BaseMessageComment.Meta):
+        indexes = [
+            models.Index(fields=['translation_file', 'msghash'], name='mobetta_comment_msghash_idx'),
+        ]
+
+
+@python_2_unicode_compatible
+class Job(models.Model):
+    """
+    A long running task (e.g. compiling all translation files) that is
+    executed by the job runner, see ``mobetta.jobs``.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=127)
+    arguments = models.TextField(default='{}')
+    """
+    ``arguments`` are the JSON encoded keyword arguments for the job.
+    """
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(
+        UserModel, blank=True, null=True,
+        related_name='mobetta_jobs', on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+    """
+    ``updated`` is the last time the job was claimed or made progress.
+    """
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.status)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def set_progress(self, progress, total):
+        self.progress = progress
+        self.total = total
+        Job.objects.filter(pk=self.pk).update(progress=progress, total=total, updated=timezone.now())
@@ -0,0 +1,108 @@
+"""
+Compiling MO files straight from the PO file.
+
+``polib`` builds a ``POEntry`` for every message (with its comments,
+occurrences and flags) before it writes a MO file. The compiler here reads the
+PO file line by line, keeps only the encoded ids and strings of the translated
+messages, and writes the same bytes as ``POFile.to_binary``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import array
+import struct
+
+import polib
+
+from .reader import iter_entries, open_catalog, parse_metadata
+
+
+class UnsupportedCatalog(Exception):
+    """
+    The catalog uses a construct that the streaming compiler does not handle
+    like ``polib`` does.
+    """
+
+
+def compile_mofile(path):
+    """
+    Return the contents of the MO file for the PO file at ``path``.
+
+    Raises ``UnsupportedCatalog`` for catalogs the result would differ from
+    ``polib`` for, use ``polib.pofile(path).to_binary()`` for those.
+    """
+    handle, encoding = open_catalog(path)
+
+    metadata_entries = []
+    messages = []
+    with handle:
+        for entry, start, end in iter_entries(handle, path):
+            if entry.msgid == '' and not entry.obsolete:
+                metadata_entries.append(entry)
+            elif entry.translated():
+                if entry.msgctxt:
+                    key = entry.msgctxt + '\x04' + entry.msgid
+                else:
+                    key = entry.msgid
+                if entry.msgid_plural:
+                    msgid = key + '\0' + entry.msgid_plural
+                    msgstr = '\0'.join(entry.msgstr_plural[index] for index in sorted(entry.msgstr_plural or ()))
+                else:
+                    msgid = key
+                    msgstr = entry.msgstr
+                messages.append((key.encode('utf-8'), msgid.encode(encoding), msgstr.encode(encoding)))
+
+    # polib picks one of several metadata entries by comparing full entries
+    if len(metadata_entries) > 1:
+        raise UnsupportedCatalog("Multiple metadata entries in {}".format(path))
+
+    header = polib.POFile(encoding=encoding)
+    if metadata_entries:
+        header.metadata = parse_metadata(metadata_entries[0].msgstr)
+    messages.sort(key=lambda message: message[0])
+    messages.insert(0, (None, b'', header.metadata_as_entry().msgstr.encode(encoding)))
+
+    return build_mofile(messages)
+
+
+def build_mofile(messages):
+    """
+    Return the MO file for the sorted ``(sort_key, msgid, msgstr)`` tuples of
+    encoded ``messages``, in the layout ``polib`` writes (without a hash
+    table).
+    """
+    count = len(messages)
+    keystart = 7 * 4 + 16 * count
+
+    offsets = array.array(str('i'), [0]) * (4 * count)
+    ids_length = 0
+    for i, (key, msgid, msgstr) in enumerate(messages):
+        offsets[2 * i] = len(msgid)
+        offsets[2 * i + 1] = ids_length + keystart
+        ids_length += len(msgid) + 1
+
+    valuestart = keystart + ids_length
+    strs_length = 0
+    for i, (key, msgid, msgstr) in enumerate(messages):
+        offsets[2 * count + 2 * i] = len(msgstr)
+        offsets[2 * count + 2 * i + 1] = strs_length + valuestart
+        strs_length += len(msgstr) + 1
+
+    output = [
+        struct.pack(
+            str('Iiiiiii'),
+            polib.MOFile.MAGIC,
+            0,  # version
+            count,
+            7 * 4,  # start of the key index
+            7 * 4 + count * 8,  # start of the value index
+            0, keystart,  # size and offset of the hash table
+        ),
+        offsets.tobytes() if hasattr(offsets, 'tobytes') else offsets.tostring(),
+    ]
+    for key, msgid, msgstr in messages:
+        output.append(msgid)
+        output.append(b'\0')
+    for key, msgid, msgstr in messages:
+        output.append(msgstr)
+        output.append(b'\0')
+    return b''.join(output)
@@ -16,3 +16,28 @@ class MovingRangePaginator(Paginator):
             max(high_bound - 10, 1),
             high_bound
         )
+
+
+class LazyTranslationList(object):
+    """
+    Sequence of translations that only converts the entries that are
+    accessed.
+
+    ``transform`` is applied to the items of ``entries`` on access, so a
+    paginator only builds the translations on the requested page.
+    """
+
+    def __init__(self, entries, transform):
+        self.entries = entries
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.transform(entry) for entry in self.entries[index]]
+        return self.transform(self.entries[index])
+
+    def __iter__(self):
+        return (self.transform(entry) for entry in self.entries)
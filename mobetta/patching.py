@@ -0,0 +1,267 @@
+"""
+Writing PO files by patching only the entries that changed.
+
+When a PO file is parsed, the byte span of every entry in the file is recorded
+along with the parsed file. Saving a few changed translations then only
+renders those entries (and the header, which holds the revision metadata) and
+splices them into the original contents, instead of rendering every entry of
+the catalog again.
+
+The spans are only trusted while the file is unchanged on disk. Whenever they
+can't be used the whole file is serialized, which records fresh spans.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import bisect
+import pickle
+import re
+
+from django.utils import six
+
+import polib
+
+from .cache import get_file_signature
+
+# a run of lines that are not blank, which is how entries are separated
+BLOCK_RE = re.compile(br'^(?:[^\S\n]*\S[^\n]*(?:\n|\Z))+', re.MULTILINE)
+
+
+class CatalogLayout(object):
+    """
+    Byte spans of the header and the entries of a PO file.
+
+    ``entry_spans`` is indexed like the entries of the parsed file, the spans
+    are only valid for the version of the file identified by ``signature``.
+    """
+
+    def __init__(self, signature, header_span, entry_spans):
+        self.signature = signature
+        self.header_span = header_span
+        self.entry_spans = entry_spans
+
+
+def load_pofile(path):
+    """
+    Parse the PO file at ``path`` and record the layout of its entries.
+    """
+    signature = get_file_signature(path)
+    pofile = polib.pofile(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # the file may have been replaced while it was parsed
+    if signature is not None and get_file_signature(path) == signature:
+        set_layout(pofile, index_layout(pofile, data, signature))
+    return pofile
+
+
+def copy_pofile(pofile):
+    """
+    Return a copy of ``pofile`` that can be changed without affecting the
+    original, along with its recorded layout and message index.
+
+    A pickle round trip keeps the attributes set on the file and its entries,
+    and the entries referenced by them, and is faster than parsing the file
+    again or ``copy.deepcopy``.
+    """
+    return pickle.loads(pickle.dumps(pofile, pickle.HIGHEST_PROTOCOL))
+
+
+def index_layout(pofile, data, signature):
+    """
+    Return the layout of ``pofile`` as found in ``data``, or ``None`` if the
+    blocks of the file can't be matched with its entries.
+    """
+    if not _can_patch(pofile):
+        return None
+
+    blocks = [match.span() for match in BLOCK_RE.finditer(data)]
+    # the header must be the first block, followed by one block per entry
+    if len(blocks) != len(pofile) + 1:
+        return None
+    header_span = blocks[0]
+    if not _is_header(data[header_span[0]:header_span[1]]):
+        return None
+    return CatalogLayout(signature, header_span, blocks[1:])
+
+
+def set_layout(pofile, layout):
+    pofile._catalog_layout = layout
+    pofile._changed_entries = []
+    if layout is not None:
+        for index, entry in enumerate(pofile):
+            entry._layout_index = index
+
+
+def mark_changed(pofile, entry):
+    """
+    Register that ``entry`` of ``pofile`` has been modified and needs to be
+    written on the next save.
+    """
+    changed = getattr(pofile, '_changed_entries', None)
+    if changed is not None:
+        changed.append(entry)
+
+
+def get_changed_entries(pofile):
+    """
+    Return the ``(index, entry)`` pairs of the entries of ``pofile`` passed to
+    ``mark_changed`` since it was last written, or ``None`` if their position
+    in the file isn't known.
+    """
+    changed = getattr(pofile, '_changed_entries', None)
+    if changed is None:
+        return None
+    entries = {}
+    for entry in changed:
+        index = getattr(entry, '_layout_index', None)
+        if index is None or index >= len(pofile) or pofile[index] is not entry:
+            return None
+        entries[index] = entry
+    return sorted(entries.items(), key=lambda item: item[0])
+
+
+def write_pofile(path, pofile, write):
+    """
+    Write ``pofile`` to ``path`` by calling ``write(path, data)``.
+
+    Only the header and the entries passed to ``mark_changed`` are rendered if
+    the recorded layout still matches the file, otherwise the file is
+    serialized completely.
+    """
+    patched = patch_pofile(path, pofile)
+    if patched is None:
+        data, layout = serialize_pofile(pofile)
+    else:
+        data, layout = patched
+
+    write(path, data)
+
+    if layout is not None:
+        layout.signature = get_file_signature(path)
+    set_layout(pofile, layout)
+
+
+def serialize_pofile(pofile):
+    """
+    Return the contents of ``pofile`` like ``polib`` renders them, along with
+    its layout (without a file signature).
+    """
+    if not _can_patch(pofile):
+        return six.text_type(pofile).encode(pofile.encoding), None
+
+    header = render_header(pofile).encode(pofile.encoding)
+    chunks = [header]
+    spans = [None] * len(pofile)
+    position = len(header)
+
+    # like polib, obsolete entries go at the end of the file
+    order = [i for i, entry in enumerate(pofile) if not entry.obsolete]
+    order += [i for i, entry in enumerate(pofile) if entry.obsolete]
+    for index in order:
+        chunk = render_entry(pofile, pofile[index])
+        position += 1  # the blank line between entries
+        spans[index] = (position, position + len(chunk))
+        position += len(chunk)
+        chunks.append(chunk)
+
+    return b'\n'.join(chunks), CatalogLayout(None, (0, len(header)), spans)
+
+
+def patch_pofile(path, pofile):
+    """
+    Return the contents of the file with the header and changed entries of
+    ``pofile`` rendered in place and the updated layout, or ``None`` if the
+    file can't be patched.
+    """
+    layout = getattr(pofile, '_catalog_layout', None)
+    if layout is None or len(layout.entry_spans) != len(pofile):
+        return None
+    if get_file_signature(path) != layout.signature:
+        return None
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    header_start, header_end = layout.header_span
+    if not _is_header(data[header_start:header_end]):
+        return None
+    replacements = {None: (layout.header_span, render_header(pofile).encode(pofile.encoding))}
+
+    for entry in pofile._changed_entries:
+        index = getattr(entry, '_layout_index', None)
+        if index is None or index >= len(pofile) or pofile[index] is not entry:
+            return None
+        start, end = layout.entry_spans[index]
+        if not _is_entry(pofile, data[start:end], entry):
+            return None
+        replacements[index] = ((start, end), render_entry(pofile, entry))
+
+    chunks = []
+    position = 0
+    ends = []
+    offsets = [0]
+    for index, ((start, end), chunk) in sorted(replacements.items(), key=lambda item: item[1][0]):
+        chunks.append(data[position:start])
+        chunks.append(chunk)
+        position = end
+        ends.append(end)
+        offsets.append(offsets[-1] + len(chunk) - (end - start))
+    chunks.append(data[position:])
+
+    def shift(span):
+        # move by the size changes of all replacements before the span
+        offset = offsets[bisect.bisect_right(ends, span[0])]
+        return (span[0] + offset, span[1] + offset)
+
+    entry_spans = [shift(span) for span in layout.entry_spans]
+    for index, (span, chunk) in replacements.items():
+        if index is not None:
+            start = shift(span)[0]
+            entry_spans[index] = (start, start + len(chunk))
+    header_span = (header_start, header_start + len(replacements[None][1]))
+
+    return b''.join(chunks), CatalogLayout(None, header_span, entry_spans)
+
+
+def render_header(pofile):
+    """
+    Return the header comments and metadata of ``pofile`` as ``polib``
+    renders them.
+    """
+    header = polib.POFile(wrapwidth=pofile.wrapwidth, encoding=pofile.encoding)
+    header.header = pofile.header
+    header.metadata = pofile.metadata
+    header.metadata_is_fuzzy = pofile.metadata_is_fuzzy
+    return six.text_type(header)
+
+
+def render_entry(pofile, entry):
+    return entry.__unicode__(pofile.wrapwidth).encode(pofile.encoding)
+
+
+def _can_patch(pofile):
+    # spans are computed on the encoded chunks, which doesn't work for
+    # encodings that add a byte order mark
+    try:
+        return '\n'.encode(pofile.encoding) == b'\n'
+    except LookupError:
+        return False
+
+
+def _is_header(block):
+    return re.search(br'^msgid ""', block, re.MULTILINE) is not None
+
+
+def _is_entry(pofile, block, entry):
+    # the message id of an entry is never changed, so the block must still
+    # contain the same message
+    try:
+        parsed = polib.pofile(block.decode(pofile.encoding))
+    except (IOError, UnicodeDecodeError, ValueError):
+        return False
+    return (
+        len(parsed) == 1 and
+        parsed[0].msgid == entry.msgid and
+        parsed[0].obsolete == entry.obsolete
+    )
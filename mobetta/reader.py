@@ -0,0 +1,430 @@
+"""
+Reading PO files without building a ``polib.POEntry`` for every message.
+
+``polib.pofile`` parses the comments, occurrences, flags and previous msgids
+of every entry, while listing a catalog and computing its statistics only
+needs the ids, strings and flags. The reader here tokenizes the file once,
+keeps the decoded text of the file together with the offsets of every entry in
+it, and a small ``Entry`` record with the fields that are used most. The full
+``POEntry`` is only parsed from the entry's text when another attribute is
+accessed.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import array
+import codecs
+import io
+import re
+
+from django.utils import six
+
+import polib
+
+UNESCAPED_QUOTE_RE = re.compile(r'([^\\]|^)"')
+
+# characters ``str.splitlines`` breaks lines on, besides newlines
+LINE_BOUNDARY_RE = re.compile('[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+KEYWORDS = {
+    'msgctxt': 'ct',
+    'msgid': 'mi',
+    'msgstr': 'ms',
+    'msgid_plural': 'mp',
+}
+PREVIOUS_KEYWORDS = {
+    'msgid_plural': 'pp',
+    'msgid': 'pm',
+    'msgctxt': 'pc',
+}
+
+# the states each symbol can follow, as in polib's parser
+_ALL_STATES = {'st', 'he', 'gc', 'oc', 'fl', 'ct', 'pc', 'pm', 'pp', 'tc', 'ms', 'mp', 'mx', 'mi'}
+TRANSITIONS = {
+    'tc': {'gc', 'oc', 'fl', 'tc', 'pc', 'pm', 'pp', 'ms', 'mp', 'mx', 'mi'},
+    'gc': _ALL_STATES,
+    'oc': _ALL_STATES,
+    'fl': _ALL_STATES,
+    'pc': _ALL_STATES,
+    'pm': _ALL_STATES,
+    'pp': _ALL_STATES,
+    'ct': {'st', 'he', 'gc', 'oc', 'fl', 'tc', 'pc', 'pm', 'pp', 'ms', 'mx'},
+    'mi': {'st', 'he', 'gc', 'oc', 'fl', 'ct', 'tc', 'pc', 'pm', 'pp', 'ms', 'mx'},
+    'mp': {'tc', 'gc', 'pc', 'pm', 'pp', 'mi'},
+    'ms': {'mi', 'mp', 'tc'},
+    'mx': {'mi', 'mx', 'mp', 'tc'},
+    'mc': {'ct', 'mi', 'mp', 'ms', 'mx', 'pm', 'pp', 'pc'},
+}
+# symbols that start a new entry when they follow a translation
+ENTRY_START = {'tc', 'gc', 'oc', 'fl', 'pc', 'pm', 'pp', 'ct', 'mi'}
+
+# parsed in front of a single entry, so its comments aren't taken for the
+# header comments of the file
+_EMPTY_HEADER = 'msgid ""\nmsgstr ""\n\n'
+
+
+def unescape(value):
+    if '\\' not in value:
+        return value
+    return polib.unescape(value)
+
+
+class Entry(object):
+    """
+    The msgid, strings, flags and obsolete state of an entry.
+
+    Any other ``polib.POEntry`` attribute (``occurrences``, ``comment``,
+    ``previous_msgid``, ...) is read from the entry parsed with ``polib`` on
+    first access, see ``Catalog.materialize``.
+    """
+    __slots__ = ('msgctxt', 'msgid', 'msgid_plural', 'msgstr', 'msgstr_plural', 'flags', 'obsolete',
+                 '_catalog', '_index', '_poentry')
+
+    def __init__(self):
+        self.msgctxt = None
+        self.msgid = ''
+        self.msgid_plural = ''
+        self.msgstr = ''
+        # only plural entries get a dict
+        self.msgstr_plural = None
+        self.flags = ()
+        self.obsolete = False
+        self._catalog = None
+        self._index = None
+        self._poentry = None
+
+    @property
+    def fuzzy(self):
+        return 'fuzzy' in self.flags
+
+    def translated(self):
+        if self.obsolete or self.fuzzy:
+            return False
+        if self.msgstr != '':
+            return True
+        if self.msgstr_plural:
+            for value in self.msgstr_plural.values():
+                if value == '':
+                    return False
+            return True
+        return False
+
+    def materialize(self):
+        """
+        Return the ``polib.POEntry`` for this entry.
+        """
+        if self._poentry is None:
+            self._poentry = self._catalog.materialize(self._index)
+        return self._poentry
+
+    def __getattr__(self, name):
+        # only called for attributes that aren't one of the slots
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __repr__(self):
+        return '<Entry {!r}>'.format(self.msgid)
+
+
+def iter_entries(lines, path='', encoding=None):
+    """
+    Yield ``(entry, start, end)`` for the entries parsed from the ``lines`` of
+    a PO file, with the offsets of the text of each entry (from its first
+    comment to its last string).
+
+    The lines are decoded text, or bytes in ``encoding`` (the offsets are then
+    byte offsets). Syntax errors raise an ``IOError`` like ``polib`` does.
+    """
+    fpath = '{} '.format(path) if path else ''
+    entry = Entry()
+    state = 'st'
+    tokens = []
+    lineno = 0
+    plural_index = 0
+    position = 0
+    start = None
+    end = 0
+
+    def syntax_error(message=''):
+        return IOError('Syntax error in po file {}(line {}){}'.format(fpath, lineno, message))
+
+    for line in lines:
+        lineno += 1
+        line_start = position
+        position += len(line)
+        if encoding is not None:
+            line = line.decode(encoding)
+        if lineno == 1 and line.startswith(codecs.BOM_UTF8.decode('utf-8')):
+            line = line[1:]
+        line = line.strip()
+        if not line:
+            continue
+
+        tokens = line.split(None, 2)
+        first = tokens[0]
+        if first == '#~|':
+            continue
+
+        obsolete = False
+        if first == '#~' and len(tokens) > 1:
+            line = line[3:].strip()
+            tokens = tokens[1:]
+            first = tokens[0]
+            obsolete = True
+
+        if first in KEYWORDS and len(tokens) > 1:
+            symbol = KEYWORDS[first]
+            line = line[len(first):].lstrip()
+            if '"' in line[1:-1] and UNESCAPED_QUOTE_RE.search(line[1:-1]):
+                raise syntax_error(': unescaped double quote found')
+        elif first == '#:':
+            if len(tokens) <= 1:
+                continue
+            symbol = 'oc'
+        elif line[:1] == '"':
+            if '"' in line[1:-1] and UNESCAPED_QUOTE_RE.search(line[1:-1]):
+                raise syntax_error(': unescaped double quote found')
+            symbol = 'mc'
+        elif line[:7] == 'msgstr[':
+            symbol = 'mx'
+        elif first == '#,':
+            if len(tokens) <= 1:
+                continue
+            symbol = 'fl'
+        elif first == '#' or first.startswith('##'):
+            symbol = 'tc'
+        elif first == '#.':
+            if len(tokens) <= 1:
+                continue
+            symbol = 'gc'
+        elif first == '#|':
+            if len(tokens) <= 1:
+                raise syntax_error()
+            line = line[2:].lstrip()
+            if tokens[1].startswith('"'):
+                symbol = 'mc'
+            elif len(tokens) == 2:
+                raise syntax_error(': invalid continuation line')
+            elif tokens[1] not in PREVIOUS_KEYWORDS:
+                raise syntax_error(': unknown keyword {}'.format(tokens[1]))
+            else:
+                symbol = PREVIOUS_KEYWORDS[tokens[1]]
+                line = line[len(tokens[1]):].lstrip()
+        else:
+            raise syntax_error()
+
+        if symbol == 'tc' and state in ('st', 'he'):
+            # header comments
+            state = 'he'
+            continue
+        if state not in TRANSITIONS[symbol]:
+            raise syntax_error()
+
+        if symbol in ENTRY_START and state in ('ms', 'mx'):
+            yield entry, start, end
+            entry = Entry()
+            start = None
+
+        if start is None:
+            start = line_start
+        end = position
+
+        if symbol == 'mc':
+            token = unescape(line[1:-1])
+            if state == 'ct':
+                entry.msgctxt += token
+            elif state == 'mi':
+                entry.msgid += token
+            elif state == 'mp':
+                entry.msgid_plural += token
+            elif state == 'ms':
+                entry.msgstr += token
+            elif state == 'mx':
+                entry.msgstr_plural[plural_index] += token
+            # continuation lines don't change the state
+            continue
+        elif symbol == 'fl':
+            entry.flags = list(entry.flags) + [flag.strip() for flag in line[3:].split(',')]
+        elif symbol == 'ct':
+            entry.msgctxt = unescape(line[1:-1])
+        elif symbol == 'mi':
+            entry.obsolete = obsolete
+            entry.msgid = unescape(line[1:-1])
+        elif symbol == 'mp':
+            entry.msgid_plural = unescape(line[1:-1])
+        elif symbol == 'ms':
+            entry.msgstr = unescape(line[1:-1])
+        elif symbol == 'mx':
+            try:
+                plural_index = int(line[7])
+            except (IndexError, ValueError):
+                raise syntax_error()
+            if entry.msgstr_plural is None:
+                entry.msgstr_plural = {}
+            entry.msgstr_plural[plural_index] = unescape(line[line.find('"') + 1:-1])
+        state = symbol
+
+    # the last entry, unless the file ends with comments
+    if tokens and not tokens[0].startswith('#'):
+        yield entry, start, end
+
+
+def iter_lines(text):
+    """
+    Yield the lines of ``text`` (or bytes) with their newlines, splitting on
+    ``\\n`` only (like iterating over a file does).
+    """
+    newline = '\n' if isinstance(text, six.text_type) else b'\n'
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find(newline, start) + 1 or length
+        yield text[start:end]
+        start = end
+
+
+def parse_metadata(msgstr):
+    metadata = {}
+    key = None
+    for line in msgstr.splitlines():
+        try:
+            key, value = line.split(':', 1)
+            metadata[key] = value.strip()
+        except (ValueError, KeyError):
+            if key is not None:
+                metadata[key] += '\n' + line.strip()
+    return metadata
+
+
+def detect_encoding(path):
+    """
+    Return the encoding of the PO file at ``path``, detected like ``polib``
+    does.
+    """
+    encoding = polib.detect_encoding(path)
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = polib.default_encoding
+    return encoding
+
+
+def open_catalog(path):
+    """
+    Return a text file handle for the PO file at ``path`` and its encoding.
+    """
+    encoding = detect_encoding(path)
+    return io.open(path, 'rt', encoding=encoding), encoding
+
+
+class Catalog(object):
+    """
+    The entries of a PO file, in the order ``polib.pofile`` returns them.
+
+    Supports the read-only part of the ``polib.POFile`` interface that the
+    detail view and the statistics use: iterating, indexing, ``metadata`` and
+    the ``*_entries`` methods.
+    """
+
+    def __init__(self, text, path='', encoding=polib.default_encoding):
+        if text.startswith(codecs.BOM_UTF8.decode('utf-8')):
+            text = text[1:]
+        self.text = text
+        self.path = path
+        self.encoding = encoding
+        self.metadata = {}
+
+        self.entries = []
+        self._starts = array.array(str('l'))
+        self._ends = array.array(str('l'))
+        candidates = []
+        for entry, start, end in iter_entries(iter_lines(text), path):
+            if entry.msgid == '' and not entry.obsolete:
+                candidates.append(len(self.entries))
+            self.entries.append(entry)
+            self._starts.append(start)
+            self._ends.append(end)
+
+        if candidates:
+            # the same entry ``POFile.find('')`` picks as the metadata: the
+            # last one without a context, or else the first one
+            without_context = [index for index in candidates if not self.entries[index].msgctxt]
+            index = without_context[-1] if without_context else candidates[0]
+            self.metadata = parse_metadata(self.entries[index].msgstr)
+            del self.entries[index]
+            del self._starts[index]
+            del self._ends[index]
+
+        for index, entry in enumerate(self.entries):
+            entry._catalog = self
+            entry._index = index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def get_text(self, index):
+        """
+        Return the text of the entry at ``index`` as it is in the file.
+        """
+        return self.text[self._starts[index]:self._ends[index]]
+
+    def materialize(self, index):
+        """
+        Return the ``polib.POEntry`` for the entry at ``index``, parsed from
+        its text.
+        """
+        entry = self[index]
+        text = self.get_text(index)
+        # polib splits text on more than newlines, which would break the
+        # entry up differently than when it reads the file
+        if not LINE_BOUNDARY_RE.search(text):
+            parsed = polib.pofile(_EMPTY_HEADER + text, encoding=self.encoding)
+            if len(parsed) == 1 and _is_same_entry(parsed[0], entry):
+                return parsed[0]
+
+        # keep the fields that were read
+        return polib.POEntry(
+            msgctxt=entry.msgctxt,
+            msgid=entry.msgid,
+            msgid_plural=entry.msgid_plural,
+            msgstr=entry.msgstr,
+            msgstr_plural=dict(entry.msgstr_plural or {}),
+            flags=list(entry.flags),
+            obsolete=entry.obsolete,
+            encoding=self.encoding,
+        )
+
+    def translated_entries(self):
+        return [entry for entry in self.entries if entry.translated()]
+
+    def untranslated_entries(self):
+        return [entry for entry in self.entries if not entry.translated() and not entry.obsolete and not entry.fuzzy]
+
+    def fuzzy_entries(self):
+        return [entry for entry in self.entries if entry.fuzzy and not entry.obsolete]
+
+    def obsolete_entries(self):
+        return [entry for entry in self.entries if entry.obsolete]
+
+
+def _is_same_entry(poentry, entry):
+    return (poentry.msgid == entry.msgid and
+            poentry.msgctxt == entry.msgctxt and
+            poentry.msgstr == entry.msgstr and
+            poentry.obsolete == entry.obsolete)
+
+
+def read_catalog(path):
+    """
+    Read the PO file at ``path`` into a ``Catalog``.
+    """
+    handle, encoding = open_catalog(path)
+    with handle:
+        text = handle.read()
+    return Catalog(text, path, encoding)
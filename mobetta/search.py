@@ -0,0 +1,333 @@
+"""
+Matching the search query of the detail views against entries.
+
+Queries without regex metacharacters are matched as case folded substrings,
+which is cheaper than running a regex over every entry. Other queries are
+compiled as case insensitive regexes, after checking that they can't take
+exponential time to match (e.g. ``(a+)+$``). Matchers are kept in a small LRU
+cache, since paging through search results repeats the same query.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from django.utils import six
+from django.utils.translation import ugettext as _
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+# longer patterns and larger repeat counts are refused
+MAX_PATTERN_LENGTH = 250
+MAX_REPEAT_COUNT = 1000
+
+# number of matchers kept by ``get_matcher``
+MAX_CACHED_MATCHERS = 128
+
+REPEAT_OPCODES = frozenset(['MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'])
+
+
+class InvalidSearch(ValueError):
+    """
+    The search query is not a valid regex, or is too expensive to match.
+    """
+
+
+def is_literal(query):
+    """
+    Return whether the regular expression ``query`` only matches itself.
+    """
+    return not REGEX_METACHARACTERS.intersection(query)
+
+
+if hasattr(six.text_type, 'casefold'):
+    def fold(text):
+        return text.casefold()
+else:
+    def fold(text):
+        return text.lower()
+
+
+class LiteralMatcher(object):
+    """
+    Find ``query`` as a substring of the texts, ignoring case.
+    """
+    literal = True
+
+    def __init__(self, query):
+        self.query = query
+        self.folded = fold(query)
+
+    def search(self, text):
+        return self.folded in fold(text)
+
+    def matches(self, *texts):
+        # a single fold for all the texts, the query can't contain the separator
+        return self.folded in fold('\0'.join(text for text in texts if text))
+
+
+class RegexMatcher(object):
+    """
+    Search the texts for the case insensitive regex ``query``.
+    """
+    literal = False
+
+    def __init__(self, query):
+        self.query = query
+        try:
+            check_pattern(query)
+            self.regex = re.compile(query, re.IGNORECASE)
+        except (re.error, OverflowError) as e:
+            raise InvalidSearch(_("Invalid search pattern: {}").format(e))
+
+    def search(self, text):
+        return self.regex.search(text) is not None
+
+    def matches(self, *texts):
+        return any(self.regex.search(text) for text in texts if text)
+
+
+_matchers = OrderedDict()
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(query):
+    """
+    Return the matcher for the search ``query``.
+
+    Raises ``InvalidSearch`` if the query is not a valid regex or is too
+    expensive to match.
+    """
+    with _matchers_lock:
+        matcher = _matchers.pop(query, None)
+        if matcher is not None:
+            _matchers[query] = matcher
+            return matcher
+
+    if is_literal(query) and '\0' not in query:
+        matcher = LiteralMatcher(query)
+    else:
+        matcher = RegexMatcher(query)
+
+    with _matchers_lock:
+        _matchers[query] = matcher
+        while len(_matchers) > MAX_CACHED_MATCHERS:
+            _matchers.popitem(last=False)
+    return matcher
+
+
+def check_pattern(pattern):
+    """
+    Raise ``InvalidSearch`` if matching the regex ``pattern`` can backtrack
+    catastrophically.
+
+    This refuses nested repeats of variable length (``(a+)+``, ``(a|ab)*``),
+    repeated alternatives that can start with the same character, repeats of
+    variable length that can match the same characters with only optional
+    parts between them (``.*.*x``, ``\\w+\\s*\\w+x``), back references and very
+    large repeat counts. Some harmless patterns are refused as well, these can
+    usually be written without the nesting.
+    """
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise InvalidSearch(_("The search pattern is too long."))
+    _check_items(sre_parse.parse(pattern, re.IGNORECASE), False)
+
+
+def _opname(op):
+    return getattr(op, 'name', op).upper()
+
+
+def _check_items(items, in_repeat):
+    _check_adjacent_repeats(items)
+    for op, av in items:
+        name = _opname(op)
+        if name in REPEAT_OPCODES:
+            low, high, body = av
+            if low > MAX_REPEAT_COUNT or (high != sre_parse.MAXREPEAT and high > MAX_REPEAT_COUNT):
+                raise InvalidSearch(_("The repeat count of the search pattern is too large."))
+            if in_repeat and low != high:
+                raise InvalidSearch(_("The search pattern is too complex, it repeats a repeated part."))
+            repeated = high > 1
+            if repeated:
+                _check_branches(body)
+            _check_items(body, in_repeat or repeated)
+        elif name == 'SUBPATTERN':
+            _check_items(av[-1], in_repeat)
+        elif name == 'ATOMIC_GROUP':
+            _check_items(av, in_repeat)
+        elif name in ('ASSERT', 'ASSERT_NOT'):
+            _check_items(av[1], in_repeat)
+        elif name == 'BRANCH':
+            for branch in av[1]:
+                _check_items(branch, in_repeat)
+        elif name == 'GROUPREF_EXISTS':
+            for branch in av[1:]:
+                if branch is not None:
+                    _check_items(branch, in_repeat)
+        elif name == 'GROUPREF':
+            raise InvalidSearch(_("Back references can't be used in the search pattern."))
+
+
+def _check_branches(items):
+    # alternatives in a repeat must start with distinct literal characters
+    for op, av in items:
+        name = _opname(op)
+        if name == 'SUBPATTERN':
+            _check_branches(av[-1])
+        elif name == 'BRANCH':
+            first = set()
+            for branch in av[1]:
+                if not branch or _opname(branch[0][0]) != 'LITERAL':
+                    raise InvalidSearch(_("The search pattern is too complex, it repeats overlapping alternatives."))
+                char = fold(six.unichr(branch[0][1]))
+                if char in first:
+                    raise InvalidSearch(_("The search pattern is too complex, it repeats overlapping alternatives."))
+                first.add(char)
+
+
+# characters to find out whether two character sets overlap, besides the
+# literal characters of the sets themselves
+PROBE_CHARACTERS = ''.join(six.unichr(code) for code in range(32, 127)) + '\t\n\xa0\xdf\xe9\u0430\u4e2d'
+
+CATEGORIES = {
+    'CATEGORY_DIGIT': lambda char: char.isdigit(),
+    'CATEGORY_SPACE': lambda char: char.isspace(),
+    'CATEGORY_WORD': lambda char: char.isalnum() or char == '_',
+}
+
+
+def _iter_sequence(items):
+    # the items of a sequence, with the contents of groups in their place
+    for op, av in items:
+        if _opname(op) == 'SUBPATTERN':
+            for item in _iter_sequence(av[-1]):
+                yield item
+        else:
+            yield op, av
+
+
+def _check_adjacent_repeats(items):
+    # two repeats of variable length that can match the same characters,
+    # with only optional parts between them, can split a text between them
+    # in many ways: ``(.*)(.*)(.*)x`` takes polynomial time of a high degree
+    open_repeats = []
+    for op, av in _iter_sequence(items):
+        name = _opname(op)
+        if name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        if name not in ('MAX_REPEAT', 'MIN_REPEAT'):
+            open_repeats = []
+            continue
+        low, high, body = av
+        if high - low <= 1:
+            # optional (``?``) or repeated a fixed number of times
+            if low:
+                open_repeats = []
+            continue
+        chars = _get_chars(body)
+        for other in open_repeats:
+            if _overlap(chars, other):
+                raise InvalidSearch(_("The search pattern is too complex, it repeats the same characters twice."))
+        if low:
+            open_repeats = [chars]
+        else:
+            open_repeats.append(chars)
+
+
+def _get_chars(items):
+    # a ``(literals, matches)`` pair for the characters that ``items`` can
+    # match, ``matches`` is ``None`` for anything
+    literals = set()
+    tests = []
+    for op, av in _iter_sequence(items):
+        name = _opname(op)
+        if name == 'LITERAL':
+            literals.add(fold(six.unichr(av)))
+        elif name == 'IN':
+            members = _get_set_members(av)
+            if members is None:
+                return literals, None
+            literals.update(members[0])
+            tests.append(members[1])
+        elif name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        else:
+            return literals, None
+
+    def matches(char):
+        return fold(char) in literals or any(test(char) for test in tests)
+    return literals, matches
+
+
+def _get_set_members(items):
+    # the literal characters and the test of a character set (``[...]``)
+    literals = set()
+    negated = False
+    tests = []
+    for op, av in items:
+        name = _opname(op)
+        if name == 'NEGATE':
+            negated = True
+        elif name == 'LITERAL':
+            literals.add(fold(six.unichr(av)))
+        elif name == 'RANGE':
+            low, high = av
+            tests.append(lambda char, low=low, high=high: any(
+                low <= ord(c) <= high for c in (char, char.lower(), char.upper())))
+        elif name == 'CATEGORY':
+            category = _opname(av)
+            positive = category.replace('_NOT_', '_')
+            if positive not in CATEGORIES:
+                return None
+            test = CATEGORIES[positive]
+            tests.append((lambda char, test=test: not test(char)) if category != positive else test)
+        else:
+            return None
+
+    def test(char):
+        return (fold(char) in literals or any(test(char) for test in tests)) != negated
+    if negated:
+        # a negated set matches about everything
+        return set(), test
+    return literals, test
+
+
+def _overlap(chars, other):
+    literals, matches = chars
+    other_literals, other_matches = other
+    if matches is None or other_matches is None:
+        return True
+    return any(matches(char) and other_matches(char) for char in literals | other_literals | set(PROBE_CHARACTERS))
+
+
+_fold_sources = None
+_fold_sources_lock = threading.Lock()
+
+
+def get_fold_sources():
+    """
+    Return a dict mapping case folded text to the characters (other than the
+    text itself) that fold to it, e.g. ``'ss'`` to ``'\\xdf'`` and
+    ``'\\u1e9e'``.
+    """
+    global _fold_sources
+    if _fold_sources is None:
+        with _fold_sources_lock:
+            if _fold_sources is None:
+                sources = {}
+                for code in range(sys.maxunicode + 1):
+                    if 0xd800 <= code < 0xe000:
+                        continue
+                    char = six.unichr(code)
+                    folded = fold(char)
+                    if folded != char:
+                        sources.setdefault(folded, set()).add(char)
+                _fold_sources = {folded: frozenset(chars) for folded, chars in sources.items()}
+    return _fold_sources
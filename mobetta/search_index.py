@@ -0,0 +1,656 @@
+"""
+A full-text index of the messages of all translation files.
+
+The index is a SQLite database of its own (``MOBETTA_SEARCH_INDEX_PATH``), so it
+works the same whichever database the project uses. Messages are stored in an
+FTS5 table, or in a plain table that is searched with ``LIKE`` if the SQLite
+library was built without FTS5. The rows of a catalog are numbered after the
+catalog and the position of the message in the file, so a catalog or a single
+message can be replaced without scanning the table.
+
+Catalogs are indexed again when their file changed on disk (see
+``refresh_search_index``), saves through Mobetta only replace the messages
+that were changed.
+
+The same database holds the translation memory: the translations of the PO
+files, by their msgid with its whitespace normalized (see ``memory``).
+"""
+from __future__ import absolute_import, unicode_literals
+
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .cache import get_file_signature
+from .conf import settings as mobetta_settings
+from .mapped import load_catalog
+from .search import is_literal
+from .util import get_message_hash
+
+logger = logging.getLogger(__name__)
+
+# kinds of translation files
+PO = 'po'
+ICU = 'icu'
+
+# the rows of a catalog are numbered ``catalog id << POSITION_BITS | position``
+POSITION_BITS = 32
+
+# a message is a ``(msghash, msgctxt, msgid, msgstr, occurrences, source)``
+# tuple, ``source`` is the normalized msgid for messages that go into the
+# translation memory and empty for the others
+MSGID = 2
+MSGSTR = 3
+SOURCE = 5
+
+# the number of values looked up with a single ``IN (...)``, old SQLite
+# versions allow at most 999 variables in a query
+MAX_VARIABLES = 500
+
+CATALOGS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS catalogs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        file_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        language_code TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        UNIQUE (kind, file_id)
+    )
+'''
+
+PROPERTIES_TABLE = 'CREATE TABLE IF NOT EXISTS properties (name TEXT PRIMARY KEY, value TEXT)'
+
+# the msgids of the translation memory, numbered in the order they were first
+# seen so they can be indexed incrementally (see ``memory.MemoryIndex``)
+SOURCES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS sources (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        language_code TEXT NOT NULL,
+        source TEXT NOT NULL,
+        UNIQUE (language_code, source)
+    )
+'''
+
+# the translations of the translation memory, with the rowid of the message
+MEMORY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS memory (
+        id INTEGER PRIMARY KEY,
+        source INTEGER NOT NULL,
+        msgstr TEXT NOT NULL,
+        catalog INTEGER NOT NULL
+    )
+'''
+
+MEMORY_INDEX = 'CREATE INDEX IF NOT EXISTS memory_source ON memory (source)'
+
+FTS_MESSAGES_TABLE = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(
+        msgid, msgstr, msgctxt, occurrences, msghash UNINDEXED, catalog UNINDEXED
+    )
+'''
+
+PLAIN_MESSAGES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        msgid TEXT, msgstr TEXT, msgctxt TEXT, occurrences TEXT, msghash TEXT, catalog INTEGER
+    )
+'''
+
+INSERT_MESSAGE = '''
+    INSERT INTO messages (rowid, msghash, msgctxt, msgid, msgstr, occurrences, catalog)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_RESULTS = '''
+    SELECT c.kind, c.file_id, c.name, c.language_code, m.msghash, m.msgctxt, m.msgid, m.msgstr, m.occurrences
+    FROM messages AS m JOIN catalogs AS c ON c.id = m.catalog
+'''
+
+SEARCHED_COLUMNS = ('msgid', 'msgstr', 'msgctxt', 'occurrences')
+
+# the translations of sources, the most used first, with the first catalog
+# (by id) that has each
+SELECT_TRANSLATIONS = '''
+    SELECT t.source, s.source, t.msgstr, t.count, c.kind, c.file_id, c.name
+    FROM (
+        SELECT source, msgstr, COUNT(*) AS count, MIN(catalog) AS catalog
+        FROM memory WHERE source IN ({}) GROUP BY source, msgstr
+    ) AS t
+    JOIN sources AS s ON s.id = t.source
+    JOIN catalogs AS c ON c.id = t.catalog
+    ORDER BY t.count DESC, t.msgstr
+'''
+
+
+class SearchResult(object):
+
+    def __init__(self, kind, file_id, file_name, language_code, msghash, msgctxt, msgid, msgstr, occurrences):
+        self.kind = kind
+        self.file_id = file_id
+        self.file_name = file_name
+        self.language_code = language_code
+        self.msghash = msghash
+        self.msgctxt = msgctxt
+        self.msgid = msgid
+        self.msgstr = msgstr
+        self.occurrences = occurrences
+
+    def get_file_url(self):
+        """
+        Return the URL of the detail view of the file, searching for the
+        message.
+        """
+        name = 'mobetta:icu_file_detail' if self.kind == ICU else 'mobetta:file_detail'
+        text = self.msgid.split('\n')[0][:100]
+        return '{}?{}'.format(
+            reverse(name, kwargs={'pk': self.file_id}),
+            urlencode({'search_tags': text if is_literal(text) else re.escape(text)}),
+        )
+
+
+class SearchIndex(object):
+    """
+    The full-text index in the SQLite database at ``path``.
+
+    FTS5 is used if the SQLite library has it, ``use_fts`` can force or
+    disable it for a new index.
+    """
+
+    def __init__(self, path, timeout=10, use_fts=None):
+        self.path = path
+        self.timeout = timeout
+        self.use_fts = use_fts
+        self.fts = None
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._create_tables(connection)
+            self._local.connection = connection
+        return connection
+
+    def _create_tables(self, connection):
+        connection.execute(CATALOGS_TABLE)
+        connection.execute(PROPERTIES_TABLE)
+        connection.execute(SOURCES_TABLE)
+        connection.execute(MEMORY_TABLE)
+        connection.execute(MEMORY_INDEX)
+        existing = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'messages'").fetchone()
+        if existing is not None:
+            self.fts = 'fts5' in existing[0].lower()
+            return
+
+        self.fts = False
+        if self.use_fts is not False:
+            try:
+                connection.execute(FTS_MESSAGES_TABLE)
+                self.fts = True
+            except sqlite3.OperationalError:
+                if self.use_fts:
+                    raise
+                logger.info("SQLite has no FTS5, the search index is searched with LIKE")
+        if not self.fts:
+            connection.execute(PLAIN_MESSAGES_TABLE)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def get_signatures(self):
+        """
+        Return a dict mapping ``(kind, file_id)`` to the signature of the file
+        as it was indexed, for all indexed catalogs.
+        """
+        rows = self.connection.execute('SELECT kind, file_id, signature FROM catalogs')
+        return {(kind, file_id): signature for kind, file_id, signature in rows}
+
+    def index_catalog(self, kind, translation_file, messages, signature):
+        """
+        Replace the indexed messages of ``translation_file`` with the
+        ``(position, message)`` pairs of ``messages``, for the version of the
+        file with ``signature``.
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT id FROM catalogs WHERE kind = ? AND file_id = ?', (kind, translation_file.pk)
+            ).fetchone()
+            if row is None:
+                catalog_id = connection.execute(
+                    'INSERT INTO catalogs (kind, file_id, name, language_code, signature) VALUES (?, ?, ?, ?, ?)',
+                    (kind, translation_file.pk, translation_file.name, translation_file.language_code, signature)
+                ).lastrowid
+            else:
+                catalog_id = row[0]
+                connection.execute(
+                    'UPDATE catalogs SET name = ?, language_code = ?, signature = ? WHERE id = ?',
+                    (translation_file.name, translation_file.language_code, signature, catalog_id)
+                )
+                self._delete_messages(connection, catalog_id)
+
+            messages = [((catalog_id << POSITION_BITS) | position, message) for position, message in messages]
+            connection.executemany(INSERT_MESSAGE, (
+                (rowid,) + tuple(message[:SOURCE]) + (catalog_id,) for rowid, message in messages
+            ))
+            for rowid, message in messages:
+                self._insert_translation(connection, translation_file.language_code, catalog_id, rowid, message)
+
+    def update_messages(self, kind, file_id, messages, previous_signature, signature):
+        """
+        Replace the ``(position, message)`` pairs of ``messages`` of a catalog
+        that was saved, changing the file from ``previous_signature`` to
+        ``signature``.
+
+        Returns ``False`` if the catalog wasn't indexed in its version from
+        before the save, or if the messages moved. The catalog is then left for
+        the next refresh.
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT id, signature, language_code FROM catalogs WHERE kind = ? AND file_id = ?', (kind, file_id)
+            ).fetchone()
+            if row is None or row[1] != previous_signature:
+                return False
+
+            catalog_id, language_code = row[0], row[2]
+            for position, message in messages:
+                rowid = (catalog_id << POSITION_BITS) | position
+                indexed = connection.execute('SELECT msgid FROM messages WHERE rowid = ?', (rowid,)).fetchone()
+                if indexed is None or indexed[0] != message[MSGID]:
+                    connection.execute("UPDATE catalogs SET signature = '' WHERE id = ?", (catalog_id,))
+                    return False
+                connection.execute('DELETE FROM messages WHERE rowid = ?', (rowid,))
+                connection.execute('DELETE FROM memory WHERE id = ?', (rowid,))
+                connection.execute(INSERT_MESSAGE, (rowid,) + tuple(message[:SOURCE]) + (catalog_id,))
+                self._insert_translation(connection, language_code, catalog_id, rowid, message)
+
+            connection.execute('UPDATE catalogs SET signature = ? WHERE id = ?', (signature, catalog_id))
+            return True
+
+    def remove_catalog(self, kind, file_id):
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT id FROM catalogs WHERE kind = ? AND file_id = ?', (kind, file_id)
+            ).fetchone()
+            if row is not None:
+                self._delete_messages(connection, row[0])
+                connection.execute('DELETE FROM catalogs WHERE id = ?', (row[0],))
+
+    def _delete_messages(self, connection, catalog_id):
+        rowids = (catalog_id << POSITION_BITS, ((catalog_id + 1) << POSITION_BITS) - 1)
+        connection.execute('DELETE FROM messages WHERE rowid BETWEEN ? AND ?', rowids)
+        connection.execute('DELETE FROM memory WHERE id BETWEEN ? AND ?', rowids)
+
+    def _insert_translation(self, connection, language_code, catalog_id, rowid, message):
+        if not message[SOURCE]:
+            return
+        parameters = (language_code, message[SOURCE])
+        connection.execute('INSERT OR IGNORE INTO sources (language_code, source) VALUES (?, ?)', parameters)
+        source_id = connection.execute(
+            'SELECT id FROM sources WHERE language_code = ? AND source = ?', parameters
+        ).fetchone()[0]
+        connection.execute(
+            'INSERT INTO memory (id, source, msgstr, catalog) VALUES (?, ?, ?, ?)',
+            (rowid, source_id, message[MSGSTR], catalog_id)
+        )
+
+    def get_source_id(self, language_code, source):
+        """
+        Return the id of the translation memory ``source`` in the language, or
+        ``None``.
+        """
+        row = self.connection.execute(
+            'SELECT id FROM sources WHERE language_code = ? AND source = ?', (language_code, source)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_source_ids(self, language_code, sources):
+        """
+        Return a dict mapping the translation memory ``sources`` in the
+        language that are known to their ids.
+        """
+        sources = list(sources)
+        found = {}
+        for start in range(0, len(sources), MAX_VARIABLES):
+            chunk = sources[start:start + MAX_VARIABLES]
+            found.update(self.connection.execute(
+                'SELECT source, id FROM sources WHERE language_code = ? AND source IN ({})'.format(
+                    ', '.join('?' * len(chunk))),
+                [language_code] + chunk,
+            ))
+        return found
+
+    def get_sources(self, language_code, after=0):
+        """
+        Return ``(id, source)`` for the translation memory sources in the
+        language that were added after the one with id ``after``.
+        """
+        return self.connection.execute(
+            'SELECT id, source FROM sources WHERE language_code = ? AND id > ? ORDER BY id',
+            (language_code, after)
+        ).fetchall()
+
+    def get_last_source_id(self):
+        """
+        Return the id of the last source ever added to the translation memory
+        of this database.
+        """
+        row = self.connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sources'").fetchone()
+        return row[0] if row else 0
+
+    def get_translations(self, source_ids):
+        """
+        Return ``(source id, source, msgstr, count, kind, file_id,
+        file_name)`` for the translations in the translation memory of the
+        sources with ``source_ids``, the most used first.
+
+        ``count`` is the number of messages with the translation, the file is
+        the first that was indexed.
+        """
+        source_ids = list(source_ids)
+        if len(source_ids) > MAX_VARIABLES:
+            rows = []
+            for start in range(0, len(source_ids), MAX_VARIABLES):
+                rows += self.get_translations(source_ids[start:start + MAX_VARIABLES])
+            return sorted(rows, key=lambda row: (-row[3], row[2]))
+        if not source_ids:
+            return []
+        sql = SELECT_TRANSLATIONS.format(', '.join('?' * len(source_ids)))
+        return self.connection.execute(sql, source_ids).fetchall()
+
+    def search(self, query, languages=None, kind=None, limit=50, offset=0):
+        """
+        Return the ``SearchResult`` for the messages that contain all words of
+        ``query``, best matches first (or in file order without FTS5).
+
+        Words match at the start of a word, e.g. ``trans`` finds
+        ``translation``. Only catalogs in ``languages`` (if given) and of
+        ``kind`` (if given) are searched.
+        """
+        connection = self.connection
+        if self.fts:
+            terms = [term for term in query.split() if any(char.isalnum() for char in term)]
+            conditions = ['messages MATCH ?']
+            parameters = [' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)]
+            order = 'm.rank'
+        else:
+            terms = query.split()
+            conditions = []
+            parameters = []
+            for term in terms:
+                pattern = '%{}%'.format(re.sub(r'([\\%_])', r'\\\1', term))
+                conditions.append('({})'.format(' OR '.join(
+                    "m.{} LIKE ? ESCAPE '\\'".format(column) for column in SEARCHED_COLUMNS
+                )))
+                parameters.extend([pattern] * len(SEARCHED_COLUMNS))
+            order = 'm.rowid'
+
+        if not terms or (languages is not None and not languages):
+            return []
+        if languages is not None:
+            conditions.append('c.language_code IN ({})'.format(', '.join('?' * len(languages))))
+            parameters.extend(languages)
+        if kind is not None:
+            conditions.append('c.kind = ?')
+            parameters.append(kind)
+
+        sql = '{} WHERE {} ORDER BY {} LIMIT ? OFFSET ?'.format(SELECT_RESULTS, ' AND '.join(conditions), order)
+        rows = connection.execute(sql, parameters + [limit, offset])
+        return [SearchResult(*row) for row in rows]
+
+    def get_refreshed(self):
+        """
+        Return the time (in seconds since the epoch) of the last refresh, or
+        ``None``.
+        """
+        row = self.connection.execute("SELECT value FROM properties WHERE name = 'refreshed'").fetchone()
+        return float(row[0]) if row else None
+
+    def set_refreshed(self, timestamp):
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO properties (name, value) VALUES ('refreshed', ?)", (repr(timestamp),)
+            )
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM messages')
+            connection.execute('DELETE FROM memory')
+            connection.execute('DELETE FROM sources')
+            connection.execute('DELETE FROM catalogs')
+            connection.execute('DELETE FROM properties')
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index_path():
+    """
+    Return ``MOBETTA_SEARCH_INDEX_PATH``, or a file in the temporary directory
+    for the project database.
+    """
+    path = mobetta_settings.SEARCH_INDEX_PATH
+    if path is None:
+        database = settings.DATABASES.get('default', {}).get('NAME', '')
+        digest = hashlib.md5(str(database).encode('utf8')).hexdigest()[:12]
+        path = os.path.join(tempfile.gettempdir(), 'mobetta-search-{}.sqlite3'.format(digest))
+    return path
+
+
+def get_search_index():
+    """
+    Return the ``SearchIndex`` at ``MOBETTA_SEARCH_INDEX_PATH``.
+    """
+    global _search_index
+    path = get_search_index_path()
+    with _search_index_lock:
+        if _search_index is None or _search_index.path != path:
+            _search_index = SearchIndex(path)
+        return _search_index
+
+
+def get_file_kind(translation_file):
+    return ICU if translation_file._meta.label_lower == 'icu.icutranslationfile' else PO
+
+
+def iter_translation_files(paths=None):
+    """
+    Yield ``(kind, translation_file)`` for all valid translation files, or
+    the ones with a path in ``paths``.
+    """
+    models = [(PO, apps.get_model('mobetta', 'TranslationFile'))]
+    if apps.is_installed('mobetta.icu'):
+        models.append((ICU, apps.get_model('icu', 'ICUTranslationFile')))
+    for kind, model in models:
+        if paths is None:
+            for translation_file in model.objects.filter(is_valid=True):
+                yield kind, translation_file
+            continue
+        paths = list(paths)
+        for start in range(0, len(paths), MAX_VARIABLES):
+            for translation_file in model.objects.filter(
+                    is_valid=True, filepath__in=paths[start:start + MAX_VARIABLES]):
+                yield kind, translation_file
+
+
+def format_occurrences(occurrences):
+    return ' '.join('{}:{}'.format(path, line) if line else path for path, line in occurrences)
+
+
+def normalize_source(msgid):
+    """
+    Return ``msgid`` as it is looked up in the translation memory, with its
+    whitespace collapsed.
+    """
+    return ' '.join(msgid.split())
+
+
+def po_message(entry, occurrences):
+    """
+    Return the message tuple for the (``polib`` or ``reader``) ``entry``.
+
+    Translated messages without plural forms go into the translation memory,
+    unless they are fuzzy.
+    """
+    msgid = entry.msgid
+    msgstr = entry.msgstr
+    source = ''
+    if entry.msgid_plural:
+        msgid = '{}\n{}'.format(msgid, entry.msgid_plural)
+        msgstr = '\n'.join(entry.msgstr_plural[index] for index in sorted(entry.msgstr_plural or ()))
+    elif msgstr and 'fuzzy' not in entry.flags:
+        source = normalize_source(msgid)
+    return (get_message_hash(entry), entry.msgctxt or '', msgid, msgstr, occurrences, source)
+
+
+def icu_message(key, translation):
+    # the key identifies the message in the ICU views, it isn't a source text
+    # for the translation memory
+    return (key, '', key, translation, '', '')
+
+
+def iter_messages(kind, translation_file):
+    """
+    Yield ``(position, message)`` for the messages of ``translation_file``
+    that are indexed, obsolete messages are left out.
+    """
+    if kind == ICU:
+        pairs = translation_file.get_mapped_file() or translation_file.get_icufile_object()
+        for position, (key, translation) in enumerate(pairs):
+            yield position, icu_message(key, translation)
+        return
+
+    # not through the catalog cache, which would be flushed by a refresh
+    catalog = load_catalog(translation_file.filepath)
+    for position, entry in enumerate(catalog):
+        if not entry.obsolete:
+            # the occurrences are read from the text, without parsing the
+            # whole entry
+            occurrences = ' '.join(
+                ' '.join(line[2:].split())
+                for line in catalog.get_text(position).splitlines() if line.startswith('#:')
+            )
+            yield position, po_message(entry, occurrences)
+
+
+def _format_signature(signature):
+    return ':'.join(str(part) for part in signature) if signature else ''
+
+
+def _index_catalog(index, kind, translation_file, signature):
+    try:
+        # read the file before locking the index
+        messages = list(iter_messages(kind, translation_file))
+        index.index_catalog(kind, translation_file, messages, signature)
+    except Exception:
+        logger.warning("Could not index %s", translation_file.filepath, exc_info=True)
+        return False
+    return True
+
+
+def refresh_catalogs(translation_files):
+    """
+    Index the ``(kind, translation_file)``s that changed since they were last
+    indexed and remove the ones that no longer exist, e.g. when the file
+    watcher saw them change.
+    """
+    index = get_search_index()
+    indexed_signatures = index.get_signatures()
+    for kind, translation_file in translation_files:
+        key = (kind, translation_file.pk)
+        signature = _format_signature(get_file_signature(translation_file.filepath))
+        if not signature:
+            if key in indexed_signatures:
+                index.remove_catalog(kind, translation_file.pk)
+        elif indexed_signatures.get(key) != signature:
+            _index_catalog(index, kind, translation_file, signature)
+
+
+def refresh_search_index(rebuild=False, progress=None):
+    """
+    Index the translation files that changed since they were last indexed and
+    remove the ones that no longer exist. ``rebuild`` indexes all files again.
+
+    Returns the number of indexed, removed and failed catalogs.
+    """
+    index = get_search_index()
+    if rebuild:
+        index.clear()
+    refreshed = time.time()
+    indexed_signatures = index.get_signatures()
+    translation_files = list(iter_translation_files())
+
+    seen = set()
+    indexed = failed = 0
+    for done, (kind, translation_file) in enumerate(translation_files, 1):
+        key = (kind, translation_file.pk)
+        signature = _format_signature(get_file_signature(translation_file.filepath))
+        if signature and indexed_signatures.get(key) != signature:
+            if _index_catalog(index, kind, translation_file, signature):
+                indexed += 1
+            else:
+                failed += 1
+        if signature:
+            seen.add(key)
+        if progress is not None:
+            progress(done, len(translation_files))
+
+    removed = set(indexed_signatures) - seen
+    for kind, file_id in removed:
+        index.remove_catalog(kind, file_id)
+    index.set_refreshed(refreshed)
+    return indexed, len(removed), failed
+
+
+def needs_refresh():
+    """
+    Return whether the index was last refreshed longer than
+    ``MOBETTA_SEARCH_INDEX_REFRESH_INTERVAL`` seconds ago.
+    """
+    refreshed = get_search_index().get_refreshed()
+    return refreshed is None or refreshed < time.time() - mobetta_settings.SEARCH_INDEX_REFRESH_INTERVAL
+
+
+def update_saved_messages(translation_file, messages, previous_signature):
+    """
+    Update the ``(position, message)`` pairs of ``messages`` of
+    ``translation_file`` after Mobetta saved it, changing the file from
+    ``previous_signature``.
+
+    Errors are logged, they are fixed by the next refresh.
+    """
+    index = get_search_index()
+    if not os.path.exists(index.path):
+        return
+    try:
+        index.update_messages(
+            get_file_kind(translation_file), translation_file.pk, messages,
+            _format_signature(previous_signature),
+            _format_signature(get_file_signature(translation_file.filepath)),
+        )
+    except sqlite3.Error:
+        logger.warning("Could not update the search index for %s", translation_file.filepath, exc_info=True)
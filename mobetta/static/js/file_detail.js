@@ -12,6 +12,8 @@ function FileDetailView() {
 
     this.$show_suggestion_buttons = $('.show-suggestion');
 
+    this.$show_similar_buttons = $('.show-similar');
+
     /*
      * Constructor
      */
@@ -23,6 +25,8 @@ function FileDetailView() {
         this.setUpViewCommentsButtons();
 
         this.setUpShowSuggestionButtons();
+
+        this.setUpShowSimilarButtons();
     };
 
     /*
@@ -229,6 +233,53 @@ function FileDetailView() {
     };
 
 
+    /*
+     * Fetch the messages with a similar msgid from the API.
+     */
+    this.fetchSimilar = function(url, formprefix) {
+        var similar_button = $('button.show-similar[data-form-prefix="'+formprefix+'"]');
+        var similar_list = $('#id_'+formprefix+'-similar-messages');
+
+        $.ajax({
+            url: url,
+            type: 'GET',
+            success: $.proxy(function(data) {
+                similar_list.empty();
+                if (data['results'].length == 0) {
+                    similar_list.append($('<li>').text('No similar strings found'));
+                }
+                for (var i=0; i < data['results'].length; i++) {
+                    var result = data['results'][i];
+                    similar_list.append($('<li>').text(result['msgid'] + ' \u2192 ' + result['msgstr']));
+                }
+                similar_button.hide();
+            }, this),
+            error: $.proxy(function(data) {
+                similar_list.empty();
+                similar_list.append($('<li>').text('An error occurred.'));
+                similar_button.hide();
+            }, this),
+        });
+    };
+
+    /*
+     * Set up a 'similar strings' button.
+     */
+    this.setUpOneShowSimilarButton = function(i, btn) {
+        var url = $(btn).data('url');
+        var formprefix = $(btn).data('form-prefix');
+
+        $(btn).on('click', $.proxy(this.fetchSimilar, this, url, formprefix));
+    };
+
+    /*
+     * Set up all 'similar strings' buttons.
+     */
+    this.setUpShowSimilarButtons = function() {
+        this.$show_similar_buttons.each($.proxy(this.setUpOneShowSimilarButton, this));
+    };
+
+
     this.construct();
 }
 
@@ -0,0 +1,168 @@
+"""
+Trigram indexes of the messages of a catalog.
+
+A ``TrigramIndex`` maps every sequence of three characters in a list of texts
+to the positions of the texts that contain it. It narrows a plain text search
+down to the entries that contain all trigrams of the query, so only those have
+to be matched, and finds the messages that share the most trigrams with a
+text for the "similar strings" of the detail view.
+
+The indexes are built once per version of a file and kept in the catalog
+cache, see ``TranslationFile.get_text_index`` and
+``TranslationFile.get_msgid_index``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import array
+import heapq
+from collections import Counter
+
+from .search import fold, is_literal
+
+# the candidates are only narrowed down further while there are more than
+# this many, and while the next set of positions is at most ``MAX_RATIO``
+# times larger: matching a few entries is cheaper than intersecting large sets
+MIN_CANDIDATES = 32
+MAX_RATIO = 16
+
+# the index isn't used when every trigram of a query is in more than this
+# part of the texts, matching all of them is cheaper
+MAX_SELECTIVITY = 0.5
+
+
+def get_trigrams(text):
+    """
+    Return the set of the substrings of three characters of ``text``.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def entry_text(entry):
+    """
+    Return the case folded text that ``search.LiteralMatcher`` searches for
+    ``entry`` in the PO file detail view.
+    """
+    return fold('\0'.join(text for text in (entry.msgid, entry.msgstr, entry.msgctxt) if text))
+
+
+def normalize(text):
+    """
+    Return ``text`` case folded, with its whitespace collapsed and padded with
+    spaces, so the start and end of words count as trigrams too.
+    """
+    return ' {} '.format(' '.join(fold(text).split()))
+
+
+class TrigramIndex(object):
+    """
+    Map the trigrams of ``texts`` to the positions of the texts containing
+    them.
+    """
+
+    def __init__(self, texts):
+        postings = {}
+        self._sizes = array.array(str('I'))
+        for position, text in enumerate(texts):
+            trigrams = get_trigrams(text)
+            self._sizes.append(len(trigrams))
+            for trigram in trigrams:
+                found = postings.get(trigram)
+                if found is None:
+                    postings[trigram] = found = []
+                found.append(position)
+        self._postings = {trigram: array.array(str('I'), found) for trigram, found in postings.items()}
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, text):
+        """
+        Add ``text`` at the next position, and return the position.
+        """
+        position = len(self._sizes)
+        trigrams = get_trigrams(text)
+        self._sizes.append(len(trigrams))
+        for trigram in trigrams:
+            found = self._postings.get(trigram)
+            if found is None:
+                self._postings[trigram] = found = array.array(str('I'))
+            found.append(position)
+        return position
+
+    def candidates(self, text):
+        """
+        Return the sorted positions of the texts that can contain ``text``,
+        or ``None`` if it is too short or too common to use the index.
+        """
+        trigrams = get_trigrams(text)
+        if not trigrams:
+            return None
+        postings = sorted((self._postings.get(trigram, ()) for trigram in trigrams), key=len)
+        if len(postings[0]) > len(self) * MAX_SELECTIVITY:
+            return None
+        found = set(postings[0])
+        for positions in postings[1:]:
+            if len(found) <= MIN_CANDIDATES or len(positions) > len(found) * MAX_RATIO:
+                break
+            found.intersection_update(positions)
+        return sorted(found)
+
+    def similar(self, text, limit=5, min_similarity=0.3):
+        """
+        Return ``(similarity, position)`` for the ``limit`` texts most similar
+        to ``text``, best first.
+
+        The similarity is the number of trigrams the texts share, relative to
+        the number of distinct trigrams of both (1 for the same set of
+        trigrams).
+        """
+        trigrams = get_trigrams(text)
+        if not trigrams:
+            return []
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._postings.get(trigram, ()))
+
+        size = len(trigrams)
+        scored = (
+            (float(count) / (size + self._sizes[position] - count), position)
+            for position, count in shared.items()
+        )
+        return heapq.nlargest(
+            limit,
+            (result for result in scored if result[0] >= min_similarity),
+            key=lambda result: (result[0], -result[1]),
+        )
+
+
+class CatalogTextIndex(TrigramIndex):
+    """
+    Index the searched text of the entries of a ``reader.Catalog``.
+    """
+
+    def __init__(self, catalog):
+        super(CatalogTextIndex, self).__init__(entry_text(entry) for entry in catalog)
+
+    def candidates(self, query):
+        """
+        Return the sorted positions of the entries that can match the plain
+        text search ``query``, or ``None`` if the index can't be used for it.
+        """
+        if not is_literal(query) or '\0' in query:
+            return None
+        return super(CatalogTextIndex, self).candidates(fold(query))
+
+
+class CatalogMsgidIndex(TrigramIndex):
+    """
+    Index the msgids of the entries of a catalog, to find similar messages.
+    Obsolete entries are left out.
+    """
+
+    def __init__(self, catalog):
+        super(CatalogMsgidIndex, self).__init__(
+            '' if entry.obsolete else normalize(entry.msgid) for entry in catalog
+        )
+
+    def similar(self, msgid, limit=5, min_similarity=0.3):
+        return super(CatalogMsgidIndex, self).similar(normalize(msgid), limit, min_similarity)
@@ -34,6 +34,7 @@ from django.utils import six, timezone
 
 from . import __version__
 from .conf.settings import MOBETTA_PO_FILENAMES
+from .patching import mark_changed
 
 
 def fix_newlines(inval, outval):
@@ -80,6 +81,56 @@ def get_occurrences(poentry):
     return '<br />'.join(subset)
 
 
+def get_catalog_statistics(entries):
+    """
+    Classify the (polib) ``entries`` of a catalog in a single pass.
+
+    Returns the number of translated, untranslated, fuzzy and obsolete
+    messages, using the same definitions as ``polib.POFile``, together with
+    the number of words and characters in the source strings of the current
+    (non-obsolete) messages.
+    """
+    translated = untranslated = fuzzy = obsolete = 0
+    total_words = translated_words = 0
+    total_characters = translated_characters = 0
+
+    for entry in entries:
+        if entry.obsolete:
+            obsolete += 1
+            continue
+
+        msgid = entry.msgid
+        words = len(msgid.split())
+        total_words += words
+        total_characters += len(msgid)
+
+        if 'fuzzy' in entry.flags:
+            fuzzy += 1
+        elif entry.msgstr or (entry.msgstr_plural and all(entry.msgstr_plural.values())):
+            # inlined ``POEntry.translated()``
+            translated += 1
+            translated_words += words
+            translated_characters += len(msgid)
+        else:
+            untranslated += 1
+
+    # same as ``polib.POFile.percent_translated``, fuzzy messages are not
+    # translated but do count towards the total
+    total = translated + untranslated + fuzzy
+    return {
+        'percent_translated': int(translated * 100 / float(total)) if total else 100,
+        'total_messages': translated + untranslated,
+        'translated_messages': translated,
+        'untranslated_messages': untranslated,
+        'fuzzy_messages': fuzzy,
+        'obsolete_messages': obsolete,
+        'total_words': total_words,
+        'translated_words': translated_words,
+        'total_characters': total_characters,
+        'translated_characters': translated_characters,
+    }
+
+
 def app_name_from_filepath(path):
     app = path.split("/locale")[0].split("/")[-1]
     return app
@@ -135,20 +186,18 @@ def update_translations(pofile, form_changes):
     applied_changes = []
     rejected_changes = []
 
+    index = get_message_index(pofile)
+
     for form, changes in form_changes:
         for change in changes:
-            entry = None
-
-            for poentry in pofile:
-                if get_message_hash(poentry) == change['md5hash']:
-                    entry = poentry
-                    break
+            entry = index.get(change['md5hash'])
 
             if entry:
                 # Check that the 'from' attr is the same as the current content
                 if change['field'] == 'translation':
                     if entry.msgstr == change['from'] or entry.msgstr.replace('\n', '') == change['from'].replace('\r',''):
                         entry.msgstr = fix_newlines(entry.msgid, change['to'])
+                        mark_changed(pofile, entry)
                         applied_changes.append((form, change))
                     else:
                         change.update({
@@ -163,11 +212,16 @@ def update_translations(pofile, form_changes):
                         entry.flags.append('fuzzy')
                     elif not change['to'] and 'fuzzy' in entry.flags:
                         entry.flags.remove('fuzzy')
+                    mark_changed(pofile, entry)
                     applied_changes.append((form, change))
 
                 elif change['field'] == 'context':
                     if entry.msgctxt is None or entry.msgctxt == change['from']:
                         entry.msgctxt = change['to']
+                        mark_changed(pofile, entry)
+                        # the context is part of the message hash
+                        del index[change['md5hash']]
+                        index.setdefault(get_message_hash(entry), entry)
                         applied_changes.append((form, change))
                     else:
                         change.update({
@@ -180,11 +234,10 @@ def update_translations(pofile, form_changes):
     return applied_changes, rejected_changes
 
 
-def find_pofiles(lang, project_apps=True, third_party_apps=False):
+def get_locale_paths(project_apps=True, third_party_apps=False):
     """
-    Scans app directories for gettext catalogues for the given language.
-
-    Originally written by Marco Bonetti.
+    Return the normalized paths of the locale directories of the project: the
+    ``LOCALE_PATHS`` and the ``locale`` directories of the apps.
     """
     from django.apps import apps
 
@@ -225,6 +278,15 @@ def find_pofiles(lang, project_apps=True, third_party_apps=False):
         if os.path.isdir(ldir):
             paths.append(ldir)
 
+    # normalize paths and remove duplicates
+    return sorted({os.path.normpath(path) for path in paths})
+
+
+def get_language_dirnames(lang):
+    """
+    Return the names of the locale directories that can hold the catalogues
+    of ``lang``.
+    """
     # ensure all locale combinations are detected, e.g. nl_nl, nl_NL, nl-nl and
     # nl-NL
     langs = [lang]
@@ -240,20 +302,83 @@ def find_pofiles(lang, project_apps=True, third_party_apps=False):
                 "%s%s%s" % (lang_code, splitter, country_code),
                 "%s%s%s" % (lang_code, splitter, country_code.upper())
             ]
+    return langs
 
-    # normalize paths and remove duplicates
-    paths = {os.path.normpath(path) for path in paths}
-    abspaths = set()
-    for path in paths:
-        # TODO: blakclist paths?
-        for lang_ in langs:
-            dirname = os.path.join(path, lang_, 'LC_MESSAGES')
-            for name in MOBETTA_PO_FILENAMES:
-                filename = os.path.join(dirname, name)
-                if os.path.isfile(filename):
-                    abspaths.add((filename))
 
-    return list(sorted(abspaths))
+def list_directory(path):
+    """
+    Return ``(name, is_dir)`` for the entries of the directory at ``path``, or
+    an empty list if it can't be read.
+
+    Uses ``os.scandir`` where available, which gets the type of the entries
+    from the directory listing itself instead of a ``stat`` per entry.
+    """
+    try:
+        if hasattr(os, 'scandir'):
+            return [(entry.name, entry.is_dir()) for entry in os.scandir(path)]
+        return [(name, os.path.isdir(os.path.join(path, name))) for name in os.listdir(path)]
+    except OSError:
+        return []
+
+
+def find_locale_pofiles(path, dirnames, list_directory=list_directory):
+    """
+    Return ``(lang, filename)`` for the catalogues in the locale directory at
+    ``path``, for the languages in ``dirnames`` (mapping the names of language
+    directories to the codes of the languages).
+
+    Directories are listed with ``list_directory``, see
+    ``discovery.DirectoryLister`` for one that reuses earlier listings.
+    """
+    found = []
+    for name, is_dir in list_directory(path):
+        if not is_dir or name not in dirnames:
+            continue
+        messages_dir = os.path.join(path, name, 'LC_MESSAGES')
+        filenames = {filename for filename, is_subdir in list_directory(messages_dir) if not is_subdir}
+        for po_filename in MOBETTA_PO_FILENAMES:
+            if po_filename in filenames:
+                for lang in dirnames[name]:
+                    found.append((lang, os.path.join(messages_dir, po_filename)))
+    return found
+
+
+def find_all_pofiles(languages, project_apps=True, third_party_apps=False, locale_paths=None,
+                     list_directory=list_directory, progress=None):
+    """
+    Scans app directories (or ``locale_paths``) for gettext catalogues for all
+    ``languages`` (a list of language codes) at once. Returns a sorted list of
+    ``(lang, filename)``.
+
+    Every locale directory is listed once, whatever the number of languages.
+    ``progress`` is called with the number of searched and all ``locale_paths``
+    after each of them.
+    """
+    dirnames = {}
+    for lang in languages:
+        for dirname in get_language_dirnames(lang):
+            dirnames.setdefault(dirname, [])
+            if lang not in dirnames[dirname]:
+                dirnames[dirname].append(lang)
+
+    if locale_paths is None:
+        locale_paths = get_locale_paths(project_apps, third_party_apps)
+
+    found = set()
+    for done, path in enumerate(locale_paths, 1):
+        found.update(find_locale_pofiles(path, dirnames, list_directory))
+        if progress is not None:
+            progress(done, len(locale_paths))
+    return sorted(found)
+
+
+def find_pofiles(lang, project_apps=True, third_party_apps=False):
+    """
+    Scans app directories for gettext catalogues for the given language.
+
+    Originally written by Marco Bonetti.
+    """
+    return [filename for lang_, filename in find_all_pofiles([lang], project_apps, third_party_apps)]
 
 
 def get_translator():
@@ -279,3 +404,22 @@ def get_hash_from_msgid_context(msgid, msgctxt):
 
 def get_message_hash(entry):
     return get_hash_from_msgid_context(entry.msgid, entry.msgctxt)
+
+
+def get_message_index(pofile):
+    """
+    Return a dict mapping the message hash of the entries in ``pofile`` to
+    the entries.
+
+    The index is kept on the ``pofile`` itself, so it is built once per parsed
+    file and reused along with the file from the catalog cache. It is rebuilt
+    when entries were added or removed.
+    """
+    size, index = getattr(pofile, '_msghash_index', (None, None))
+    if size != len(pofile):
+        index = {}
+        for entry in pofile:
+            # like a scan of the file, the first entry with a hash wins
+            index.setdefault(get_message_hash(entry), entry)
+        pofile._msghash_index = (len(pofile), index)
+    return index
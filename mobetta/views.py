@@ -4,19 +4,23 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.exceptions import PermissionDenied
-from django.core.management import call_command
+from django.db import transaction
 from django.forms import formset_factory
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
 from django.views.generic import FormView, ListView, RedirectView, TemplateView
 
-from mobetta import formsets, util
-from mobetta.access import can_translate, can_translate_language
+from mobetta import formsets, jobs, util
+from mobetta.access import (
+    can_translate, can_translate_language, get_translatable_languages
+)
 from mobetta.forms import AddTranslatorForm, TranslationForm
-from mobetta.models import EditLog, TranslationFile
-from mobetta.paginators import MovingRangePaginator
+from mobetta.models import EditLog, Job, MessageComment, TranslationFile
+from mobetta.paginators import LazyTranslationList, MovingRangePaginator
+from mobetta.reader import Catalog
+from mobetta.search_index import get_search_index
 
 from .base_views import (
     BaseFileDetailView, BaseFileDownloadView, BaseFileListView
@@ -43,6 +47,7 @@ class LanguageListView(ICULanguageListMixin, TemplateView):
 
     def get_context_data(self, *args, **kwargs):
         kwargs['languages'] = self.get_languages()
+        kwargs['jobs'] = Job.objects.all()[:5]
         return super(LanguageListView, self).get_context_data(*args, **kwargs)
 
 
@@ -61,6 +66,17 @@ class FileListView(BaseFileListView):
     template_name = 'mobetta/file_list.html'
 
 
+def add_job_message(request, job, started_message):
+    # the job may have finished already, e.g. with the synchronous runner
+    job.refresh_from_db()
+    if job.status == Job.DONE:
+        messages.success(request, job.result)
+    elif job.status == Job.FAILED:
+        messages.error(request, _('The job failed: %s') % job.result)
+    else:
+        messages.info(request, started_message)
+
+
 class CompilePoFilesView(RedirectView):
     url = reverse_lazy('mobetta:language_list')
     permanent = False
@@ -70,11 +86,8 @@ class CompilePoFilesView(RedirectView):
         return super(CompilePoFilesView, self).dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
-        translation_files = TranslationFile.objects.all()
-        for translation_file in translation_files:
-            translation_file.save_mofile()
-
-        messages.success(request, _('Compiled the translations. Checkout the new files.'))
+        job = jobs.enqueue('compile_translation_files', user=request.user)
+        add_job_message(request, job, _('The translation files are being compiled.'))
         return super(CompilePoFilesView, self).get(request, *args, **kwargs)
 
 
@@ -87,14 +100,88 @@ class FindPoFilesView(RedirectView):
         return super(FindPoFilesView, self).dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
-        call_command('locate_translation_files')
+        job = jobs.enqueue('locate_translation_files', user=request.user)
+        add_job_message(request, job, _('Looking for translation files.'))
         return super(FindPoFilesView, self).get(request, *args, **kwargs)
 
 
-def _entry_matches(regex, entry):
-    return (regex.search(entry.msgid) or
-            regex.search(entry.msgstr) or
-            (regex.search(entry.msgctxt) if entry.msgctxt else ''))
+class AutofillView(RedirectView):
+    """
+    Fill the untranslated messages of a translation file, or of all files of
+    a language, from the translation memory.
+    """
+    permanent = False
+    http_method_names = ['post']
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        return super(AutofillView, self).dispatch(request, *args, **kwargs)
+
+    def post(self, request, pk=None, lang_code=None):
+        if pk is not None:
+            translation_file = get_object_or_404(TranslationFile, pk=pk)
+            lang_code = translation_file.language_code
+            file_ids = [translation_file.pk]
+            self.url = reverse('mobetta:file_detail', kwargs={'pk': pk})
+        else:
+            file_ids = list(TranslationFile.objects.filter(
+                language_code=lang_code, is_valid=True).values_list('pk', flat=True))
+            self.url = reverse('mobetta:file_list', kwargs={'lang_code': lang_code})
+
+        if not can_translate_language(request.user, lang_code):
+            raise PermissionDenied
+
+        job = jobs.enqueue('autofill_translation_files', user=request.user, file_ids=file_ids)
+        add_job_message(request, job, _('The untranslated messages are being filled from the translation memory.'))
+        return super(AutofillView, self).get(request)
+
+
+class SearchView(TemplateView):
+    """
+    Search the messages of all translation files in the languages the user
+    can translate, through the search index.
+    """
+    template_name = 'mobetta/search.html'
+    paginate_by = 50
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        return super(SearchView, self).dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super(SearchView, self).get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        language_code = self.request.GET.get('language', '')
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        languages = get_translatable_languages(self.request.user)
+        results = []
+        if query:
+            jobs.request_search_index_refresh(user=self.request.user)
+            results = get_search_index().search(
+                query,
+                languages=[code for code in languages if code == language_code] if language_code else languages,
+                limit=self.paginate_by + 1,
+                offset=(page - 1) * self.paginate_by,
+            )
+
+        names = dict(settings.LANGUAGES)
+        context.update({
+            'query': query,
+            'language_code': language_code,
+            'languages': [(code, names[code]) for code in languages],
+            'results': results[:self.paginate_by],
+            'page': page,
+            'has_next': len(results) > self.paginate_by,
+        })
+        return context
+
+
+def _entry_matches(matcher, entry):
+    return matcher.matches(entry.msgid, entry.msgstr, entry.msgctxt)
 
 
 class FileDetailView(BaseFileDetailView):
@@ -110,6 +197,7 @@ class FileDetailView(BaseFileDetailView):
     translations_per_page = 20
 
     edit_log_model = EditLog
+    comment_model = MessageComment
     success_url_pattern = 'mobetta:file_detail'
 
     # callback to test if an entry matches
@@ -123,29 +211,29 @@ class FileDetailView(BaseFileDetailView):
         }
         return getattr(pofile, filters[type])() if type in filters else pofile
 
+    def get_search_candidates(self, entries, query):
+        if hasattr(entries, 'search'):
+            # memory mapped files are searched with their own prefilter,
+            # without keeping an index of the whole file in memory
+            return None
+        positions = self.translation_file.get_text_index().candidates(query)
+        if positions is None:
+            return None
+        if isinstance(entries, Catalog):
+            return [entries[position] for position in positions if position < len(entries)]
+        positions = set(positions)
+        return [entry for entry in entries if entry._index in positions]
+
     def populate_old_data(self, form):
         # Populate the old_<fieldname> values with the file's current translation/context
         pofile = self.translation_file.get_polib_object()
 
-        form_hashes = [
-            f.cleaned_data['md5hash']
-            for f in form
-        ]
-
-        file_translations = {
-            util.get_message_hash(poentry): {
-                'translation': poentry.msgstr,
-            }
-
-            for poentry in [
-                e for e in pofile if util.get_message_hash(e) in form_hashes
-            ]
-        }
+        index = util.get_message_index(pofile)
 
         for f in form:
             form_data = f.cleaned_data
             form_data.update({
-                'old_translation': file_translations[form_data['md5hash']]['translation'],
+                'old_translation': index[form_data['md5hash']].msgstr,
             })
             new_form_data = {
                 '{}-{}'.format(f.prefix, k): form_data[k]
@@ -155,22 +243,27 @@ class FileDetailView(BaseFileDetailView):
         return form
 
     def save_changes(self, changes):
-        pofile = self.translation_file.get_polib_object()
+        # Hold the lock from reading the file until it is written, so
+        # concurrent saves can't overwrite each other's changes.
+        with self.translation_file.lock():
+            pofile = self.translation_file.get_polib_object(for_update=True)
 
-        applied_changes, rejected_changes = util.update_translations(pofile, changes)
+            applied_changes, rejected_changes = util.update_translations(pofile, changes)
 
-        # Only update the metadata if we've actually made some changes
-        if len(applied_changes) > 0:
-            first_name = getattr(self.request.user, 'first_name', None)
-            last_name = getattr(self.request.user, 'last_name', None)
-            util.update_metadata(pofile, first_name, last_name, self.request.user.email)
+            # Only update the metadata if we've actually made some changes
+            if len(applied_changes) > 0:
+                first_name = getattr(self.request.user, 'first_name', None)
+                last_name = getattr(self.request.user, 'last_name', None)
+                util.update_metadata(pofile, first_name, last_name, self.request.user.email)
 
-            pofile.save()
+                with transaction.atomic():
+                    self.translation_file.save_polib_object(pofile)
 
-            messages.success(self.request, _('Changed %d translations') % len(applied_changes))
+                    # Update edit logs with the applied_changes
+                    self.log_edits(applied_changes)
 
-            # Update edit logs with the applied_changes
-            self.log_edits(applied_changes)
+        if len(applied_changes) > 0:
+            messages.success(self.request, _('Changed %d translations') % len(applied_changes))
 
         return rejected_changes
 
@@ -199,7 +292,7 @@ class FileDetailView(BaseFileDetailView):
         } for translation in page]
 
     def get_entries(self):
-        entries = self.translation_file.get_polib_object()
+        entries = self.translation_file.get_catalog()
 
         type_filter = self.request.GET.get('type')
         if type_filter:
@@ -212,22 +305,18 @@ class FileDetailView(BaseFileDetailView):
         return entries
 
     def get_translations(self):
-        entries = self.get_entries()
-
-        translations = [
-            {
-                'original': entry.msgid,
-                'translated': entry.msgstr,
-                'obsolete': entry.obsolete,
-                'fuzzy': util.message_is_fuzzy(entry),
-                'context': entry.msgctxt,
-                'occurrences': util.get_occurrences(entry),
-                'md5hash': util.get_message_hash(entry),
-            }
-            for entry in entries
-        ]
-
-        return translations
+        return LazyTranslationList(self.get_entries(), self.get_translation)
+
+    def get_translation(self, entry):
+        return {
+            'original': entry.msgid,
+            'translated': entry.msgstr,
+            'obsolete': entry.obsolete,
+            'fuzzy': util.message_is_fuzzy(entry),
+            'context': entry.msgctxt,
+            'occurrences': util.get_occurrences(entry),
+            'md5hash': util.get_message_hash(entry),
+        }
 
 
 class EditHistoryView(ListView):
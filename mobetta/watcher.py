@@ -0,0 +1,412 @@
+"""
+Watching the translation files for changes made outside of Mobetta.
+
+Deploys and ``makemessages`` rewrite translation files behind Mobetta's back,
+so without a watcher every request has to ``stat`` the files it reads from the
+catalog cache. A watcher keeps the signatures (see ``cache.get_file_signature``)
+of all translation files on a background thread, which the catalog cache and
+the statistics use instead (see ``cache.get_current_signature``). When a file
+changes, every process drops its stale cached catalogs, and a single job
+brings the statistics and search index entries of the file up to date.
+
+The ``InotifyWatcher`` gets notified of changes by the Linux kernel; where
+inotify isn't available the ``PollingWatcher`` checks all files every second.
+Enable one with ``MOBETTA_FILE_WATCHER``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import ctypes
+import ctypes.util
+import errno
+import importlib
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from django.db import close_old_connections
+
+from . import cache, jobs
+from .conf import settings as mobetta_settings
+from .search_index import iter_translation_files
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# the events in a directory that can change the signature of a file in it,
+# files are watched through their directory so atomic replaces are seen too
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+# ``struct inotify_event`` without the name that follows it
+EVENT_HEADER = struct.Struct(str('iIII'))
+
+_fsencode = getattr(os, 'fsencode', lambda path: path.encode(sys.getfilesystemencoding()))
+_fsdecode = getattr(os, 'fsdecode', lambda name: name.decode(sys.getfilesystemencoding()))
+
+
+# no signature was recorded for a file yet
+MISSING = object()
+
+
+class WatcherUnavailable(Exception):
+    pass
+
+
+def refresh_changed_files(paths):
+    """
+    Bring the data derived from the translation files at ``paths`` up to date
+    after they changed on disk: drop their stale cached catalogs in this
+    process, and enqueue a job to update their statistics and search index
+    entries. The watchers of all processes see the change, so the job is only
+    enqueued if the same job isn't pending already.
+    """
+    catalog_cache = cache.get_catalog_cache()
+    for path in paths:
+        catalog_cache.discard_stale(path, cache.get_current_signature(path))
+    jobs.enqueue_unique('refresh_translation_files', paths=sorted(paths))
+
+
+class BaseWatcher(object):
+    """
+    Keep the signatures of the files of all valid translation files on a
+    background thread, and call ``callback`` with the paths of the files that
+    changed (``refresh_changed_files`` by default).
+
+    The list of translation files is read from the database again every
+    ``rescan_interval`` seconds, to pick up new files.
+
+    Subclasses implement ``wait``, and ``update_watches`` if they need to.
+    """
+
+    def __init__(self, rescan_interval=60, callback=None):
+        self.rescan_interval = rescan_interval
+        self.callback = callback or refresh_changed_files
+        self.watched = set()
+        self.signatures = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        # the process the watcher thread runs in
+        self.pid = None
+
+    def get_signature(self, path):
+        """
+        Return the last seen signature of the file at ``path``, raises
+        ``KeyError`` if it isn't watched.
+        """
+        return self.signatures[path]
+
+    def update_signature(self, path, signature):
+        """
+        Record the new ``signature`` of the file at ``path`` if it is
+        watched, e.g. after Mobetta itself wrote it.
+        """
+        if path in self.watched:
+            self.signatures[path] = signature
+
+    def start(self):
+        self.pid = os.getpid()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='mobetta-watcher')
+        self._thread.daemon = True
+        self._thread.start()
+        cache.set_file_watcher(self)
+
+    def stop(self):
+        cache.set_file_watcher(None)
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_rescan = 0
+        while not self._stopped.is_set():
+            try:
+                if time.time() >= next_rescan:
+                    self.update_paths()
+                    next_rescan = time.time() + self.rescan_interval
+                paths = self.wait(max(0, min(1, next_rescan - time.time())))
+                if paths:
+                    self.check(paths)
+            except Exception:
+                # e.g. the database isn't migrated yet, try again later
+                logger.warning("The file watcher failed", exc_info=True)
+                self.watched = set()
+                self.signatures.clear()
+                self._stopped.wait(self.rescan_interval)
+            finally:
+                close_old_connections()
+
+    def update_paths(self):
+        """
+        Watch the files of the current translation files, and stop watching
+        the others.
+        """
+        paths = {translation_file.filepath for kind, translation_file in iter_translation_files()}
+        # watch before getting the signatures, so no change is missed
+        self.watched = self.update_watches(paths)
+        for path in set(self.signatures) - self.watched:
+            del self.signatures[path]
+        # also catches changes that were missed
+        self.check(self.watched)
+
+    def update_watches(self, paths):
+        """
+        Start watching the files at ``paths`` and stop watching the others.
+        Returns the paths that are watched.
+        """
+        return paths
+
+    def wait(self, timeout):
+        """
+        Wait up to ``timeout`` seconds for changes, and return the paths of
+        the files that may have changed.
+        """
+        raise NotImplementedError
+
+    def check(self, paths):
+        """
+        Get the signatures of the files at ``paths`` again, and call the
+        callback with the ones that changed. Files that weren't seen before
+        only get their signature recorded.
+        """
+        changed = []
+        for path in paths:
+            signature = cache.get_file_signature(path)
+            previous = self.signatures.get(path, MISSING)
+            if path in self.watched:
+                self.signatures[path] = signature
+            else:
+                self.signatures.pop(path, None)
+            if previous is not MISSING and previous != signature:
+                changed.append(path)
+        if changed:
+            try:
+                self.callback(changed)
+            except Exception:
+                logger.warning("Could not refresh the changed files %s", changed, exc_info=True)
+        return changed
+
+
+class PollingWatcher(BaseWatcher):
+    """
+    Check the signatures of all watched files every ``interval`` seconds.
+    """
+
+    def __init__(self, interval=1, **kwargs):
+        super(PollingWatcher, self).__init__(**kwargs)
+        self.interval = interval
+
+    def wait(self, timeout):
+        self._stopped.wait(min(timeout, self.interval))
+        return list(self.watched)
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        for name in ('inotify_init1', 'inotify_add_watch', 'inotify_rm_watch'):
+            getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher(BaseWatcher):
+    """
+    Watch the directories of the translation files with inotify, and check
+    the files in a directory when something in it changed.
+
+    Changes are picked up ``delay`` seconds after the first event, so a file
+    that is being written is checked once. Raises ``WatcherUnavailable`` if
+    inotify isn't available.
+    """
+
+    def __init__(self, delay=0.1, **kwargs):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise WatcherUnavailable("inotify is not available on this system")
+        super(InotifyWatcher, self).__init__(**kwargs)
+        self.delay = delay
+        self._fd = None
+        self._poll = None
+        # directory -> watch descriptor, and the other way around
+        self._watches = {}
+        self._directories = {}
+        # directory -> the watched paths in it
+        self._paths = {}
+
+    def start(self):
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._poll = select.poll()
+        self._poll.register(self._fd, select.POLLIN)
+        super(InotifyWatcher, self).start()
+
+    def stop(self):
+        super(InotifyWatcher, self).stop()
+        os.close(self._fd)
+        self._fd = None
+        self._poll = None
+        self._watches = {}
+        self._directories = {}
+        self._paths = {}
+
+    def update_watches(self, paths):
+        directories = {}
+        for path in paths:
+            directories.setdefault(os.path.dirname(path), set()).add(path)
+
+        for directory in set(self._watches) - set(directories):
+            descriptor = self._watches.pop(directory)
+            del self._directories[descriptor]
+            self._libc.inotify_rm_watch(self._fd, descriptor)
+        for directory in set(directories) - set(self._watches):
+            descriptor = self._libc.inotify_add_watch(self._fd, _fsencode(directory), WATCH_MASK)
+            if descriptor < 0:
+                # e.g. the directory doesn't exist (yet), its files are
+                # checked on every request until the next rescan
+                logger.debug("Could not watch %s: %s", directory, os.strerror(ctypes.get_errno()))
+                continue
+            self._watches[directory] = descriptor
+            self._directories[descriptor] = directory
+
+        self._paths = {directory: directories[directory] for directory in self._watches}
+        return {path for watched in self._paths.values() for path in watched}
+
+    def wait(self, timeout):
+        if not self._poll.poll(timeout * 1000):
+            return []
+        # let the writer finish, and read all events at once
+        time.sleep(self.delay)
+        paths = set()
+        for descriptor, mask, name in self._read_events():
+            if mask & IN_Q_OVERFLOW:
+                # events were lost
+                paths.update(self.watched)
+                continue
+            directory = self._directories.get(descriptor)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # the directory was removed, its files are checked on every
+                # request until it is watched again on the next rescan
+                del self._directories[descriptor]
+                del self._watches[directory]
+                unwatched = self._paths.pop(directory, set())
+                self.watched -= unwatched
+                paths.update(unwatched)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                paths.update(self._paths.get(directory, ()))
+            else:
+                path = os.path.join(directory, name)
+                if path in self._paths.get(directory, ()):
+                    paths.add(path)
+        return paths
+
+    def _read_events(self):
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return events
+                raise
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((descriptor, mask, _fsdecode(name)))
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """
+    Return the running file watcher, or ``None``.
+    """
+    return _watcher
+
+
+def _reset_after_fork():
+    global _watcher_lock
+    # the lock may have been held by another thread of the parent
+    _watcher_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def start_watcher():
+    """
+    Start the file watcher configured with ``MOBETTA_FILE_WATCHER`` in the
+    current process, falling back to the ``PollingWatcher`` if it is
+    unavailable. Returns the watcher, or ``None`` if none is configured or it
+    couldn't be started.
+
+    Called on first use by ``cache.get_file_watcher``. A watcher inherited from
+    the parent process is replaced, its thread doesn't run in this process.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None and _watcher.pid != os.getpid():
+            # release the inotify file descriptor of the parent
+            _watcher.stop()
+            _watcher = None
+        if _watcher is None and mobetta_settings.FILE_WATCHER:
+            module_path, class_name = mobetta_settings.FILE_WATCHER.rsplit('.', 1)
+            watcher_class = getattr(importlib.import_module(module_path), class_name)
+            options = dict(mobetta_settings.FILE_WATCHER_OPTIONS)
+            try:
+                watcher = watcher_class(**options)
+            except WatcherUnavailable as e:
+                logger.info("%s, polling the translation files instead", e)
+                options.pop('delay', None)
+                watcher = PollingWatcher(**options)
+            try:
+                watcher.start()
+            except (IOError, OSError):
+                # e.g. the limit of inotify instances was reached, don't try
+                # again in this process
+                logger.warning("Could not start the file watcher", exc_info=True)
+                cache.set_file_watcher(None)
+                return None
+            _watcher = watcher
+    return _watcher
+
+
+def stop_watcher():
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the performance sensitive parts of Mobetta.
+
+These are not part of the test suite, run them as modules from the
+repository root, e.g.::
+
+    python -m tests.benchmarks.statistics
+"""
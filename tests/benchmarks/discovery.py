@@ -0,0 +1,68 @@
+"""
+Compare finding the PO files of all languages one language at a time with
+finding them in a single pass, and with reusing the listings of the
+directories that didn't change, for a project with many locale directories.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+import time
+
+from .utils import report, setup
+
+APPS = 200
+TRANSLATED_LANGUAGES = ('nl', 'de', 'fr', 'es', 'pt-br')
+
+
+def build_locale_paths(directory):
+    paths = []
+    for i in range(APPS):
+        path = os.path.join(directory, 'app_{}'.format(i), 'locale')
+        for language_code in TRANSLATED_LANGUAGES:
+            messages_dir = os.path.join(path, language_code.replace('-br', '_BR'), 'LC_MESSAGES')
+            os.makedirs(messages_dir)
+            open(os.path.join(messages_dir, 'django.po'), 'w').close()
+        paths.append(path)
+
+    # listings of directories that were just modified aren't reused
+    past = time.time() - 60
+    for path, dirnames, filenames in os.walk(directory):
+        os.utime(path, (past, past))
+    return paths
+
+
+def main():
+    setup()
+
+    from django.conf import settings
+    from django.test import override_settings
+
+    from mobetta.discovery import DirectoryLister
+    from mobetta.util import find_all_pofiles, find_pofiles
+
+    directory = tempfile.mkdtemp()
+    try:
+        languages = [code for code, name in settings.LANGUAGES]
+        with override_settings(LOCALE_PATHS=build_locale_paths(directory)):
+            print('{} apps, {} languages'.format(APPS, len(languages)))
+            before = report('  per language', lambda: [find_pofiles(code) for code in languages], number=3)
+            after = report('  single pass', lambda: find_all_pofiles(languages), number=3)
+            print('  speedup: {:.1f}x'.format(before / after))
+
+            lister = DirectoryLister()
+            find_all_pofiles(languages, list_directory=lister)
+            snapshot = lister.directories
+            unchanged = report(
+                '  unchanged since the last pass',
+                lambda: find_all_pofiles(languages, list_directory=DirectoryLister(snapshot)),
+                number=3,
+            )
+            print('  speedup: {:.1f}x'.format(after / unchanged))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
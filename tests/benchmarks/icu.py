@@ -0,0 +1,69 @@
+"""
+Compare parsing an ICU file on every request with getting it from the catalog
+cache, and the peak memory of parsing a large file with ``json.load`` and one
+pair at a time from a memory map.
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+from .utils import peak_memory, report, setup
+
+
+def build_icu_file(size):
+    """
+    Return the path to a temporary ICU file with ``size`` messages.
+    """
+    messages = OrderedDict(
+        ('app.page_{}.message_{}'.format(i % 50, i), 'Bericht nummer {} met {{count}} woorden'.format(i) if i % 3 else '')
+        for i in range(size)
+    )
+    handle, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(handle, 'w') as outfile:
+        json.dump(messages, outfile)
+    return path
+
+
+def json_load(path):
+    with open(path) as infile:
+        return json.load(infile, object_pairs_hook=OrderedDict)
+
+
+def main():
+    setup()
+
+    try:
+        from unittest.mock import patch
+    except ImportError:
+        from mock import patch
+
+    from mobetta.cache import get_catalog_cache
+    from mobetta.conf import settings as mobetta_settings
+    from mobetta.icu.models import IcuFile
+
+    for size in (10000, 100000):
+        path = build_icu_file(size)
+        try:
+            print('{} messages ({:.1f} MB)'.format(size, os.path.getsize(path) / 1e6))
+            with patch.object(mobetta_settings, 'MMAP_THRESHOLD', None):
+                before = report('  parse per request', lambda: IcuFile(path), number=3)
+                catalog_cache = get_catalog_cache()
+                catalog_cache.get(path, IcuFile, variant='icu')
+                after = report('  catalog cache', lambda: catalog_cache.get(path, IcuFile, variant='icu'), number=3)
+                print('  speedup: {:.0f}x'.format(before / after))
+
+            with patch.object(mobetta_settings, 'MMAP_THRESHOLD', 0):
+                report('  parse from memory map', lambda: IcuFile(path), number=3)
+                print('  peak memory: {:.1f} MB (json.load) -> {:.1f} MB (memory map)'.format(
+                    peak_memory(lambda: json_load(path)) / 1e6,
+                    peak_memory(lambda: IcuFile(path)) / 1e6,
+                ))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
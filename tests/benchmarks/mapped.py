@@ -0,0 +1,66 @@
+"""
+Compare the memory mapped catalog with the catalog read into memory: the
+memory each process keeps for a cached catalog, and searching it.
+"""
+from __future__ import print_function, unicode_literals
+
+import gc
+import os
+import tracemalloc
+
+from .utils import build_catalog, report, setup
+
+
+def retained_memory(func):
+    """
+    Return the memory still allocated by the result of ``func``, in bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()  # noqa
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def search(catalog, query):
+    from mobetta.search import get_matcher
+    from mobetta.views import _entry_matches
+
+    matcher = get_matcher(query)
+    if hasattr(catalog, 'search'):
+        return len(catalog.search(lambda entry: _entry_matches(matcher, entry), query if matcher.literal else None))
+    return len([entry for entry in catalog if _entry_matches(matcher, entry)])
+
+
+def main():
+    setup()
+
+    from mobetta.mapped import MappedCatalog
+    from mobetta.reader import read_catalog
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            print('{} messages ({:.1f} MB)'.format(size, os.path.getsize(path) / 1e6))
+            report('  read_catalog', lambda: read_catalog(path), number=3)
+            report('  MappedCatalog', lambda: MappedCatalog(path, 'utf-8'), number=3)
+            print('  memory per process: {:.1f} MB -> {:.1f} MB'.format(
+                retained_memory(lambda: read_catalog(path)) / 1e6,
+                retained_memory(lambda: MappedCatalog(path, 'utf-8')) / 1e6,
+            ))
+
+            catalog = read_catalog(path)
+            mapped = MappedCatalog(path, 'utf-8')
+            for query in ('number 4242 with', 'bericht nummer 1', 'numb.r 4242'):
+                assert search(catalog, query) == search(mapped, query)
+                before = report('  search {!r} in memory'.format(query), lambda: search(catalog, query))
+                after = report('  search {!r} mapped'.format(query), lambda: search(mapped, query))
+                print('  speedup: {:.1f}x'.format(before / after))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Time looking up exact and fuzzy matches in a translation memory with many
+msgids, after the trigram index of the msgids was built.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from .utils import report, setup
+
+WORDS = (
+    'open save close delete file files folder page user users account message messages '
+    'the a of your this new old all no more with to from could not be found'
+).split()
+
+
+def build_memory(index, size, catalogs=5):
+    import random
+
+    from mobetta.models import TranslationFile
+    from mobetta.search_index import PO, normalize_source
+
+    generator = random.Random(0)
+    msgids = [
+        ' '.join(generator.choice(WORDS) for __ in range(generator.randint(2, 8))) + ' {}'.format(i)
+        for i in range(size)
+    ]
+    for catalog in range(catalogs):
+        messages = []
+        for position, msgid in enumerate(msgids[catalog::catalogs]):
+            msgstr = msgid.upper()
+            messages.append((position, ('', '', msgid, msgstr, '', normalize_source(msgid))))
+        translation_file = TranslationFile(pk=catalog + 1, name='app{}'.format(catalog), language_code='nl')
+        index.index_catalog(PO, translation_file, messages, 'signature')
+    return msgids
+
+
+def main():
+    setup()
+
+    from mobetta.conf import settings as mobetta_settings
+    from mobetta.memory import get_memory_index, lookup
+    from mobetta.search_index import get_search_index
+
+    directory = tempfile.mkdtemp()
+    try:
+        for size in (10000, 50000):
+            mobetta_settings.SEARCH_INDEX_PATH = os.path.join(directory, '{}.sqlite3'.format(size))
+            index = get_search_index()
+            msgids = build_memory(index, size)
+            print('{} msgids'.format(size))
+            report('  build the trigram index', lambda: get_memory_index(index, 'nl'), number=1)
+
+            msgid = msgids[size // 2]
+            report('  exact', lambda: lookup(msgid, 'nl'))
+            report('  fuzzy (one word changed)', lambda: lookup(msgid.replace(msgid.split()[0], 'remove'), 'nl'))
+            report('  fuzzy (no similar msgids)', lambda: lookup('Something else entirely', 'nl'))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Compare compiling a MO file with the streaming compiler and with polib.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+
+from .utils import build_catalog, peak_memory, report, setup
+
+
+def main():
+    setup()
+
+    import polib
+    from mobetta.mofile import compile_mofile
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            assert compile_mofile(path) == polib.pofile(path).to_binary()
+
+            print('{} messages'.format(size))
+            before = report('  polib', lambda: polib.pofile(path).to_binary(), number=3)
+            after = report('  compile_mofile', lambda: compile_mofile(path), number=3)
+            print('  speedup: {:.1f}x'.format(before / after))
+            print('  peak memory: {:.1f} MB -> {:.1f} MB'.format(
+                peak_memory(lambda: polib.pofile(path).to_binary()) / 1e6,
+                peak_memory(lambda: compile_mofile(path)) / 1e6,
+            ))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare reading a catalog with the lazy reader and with polib, for what the
+file detail view does on a request: reading the file, filtering it and
+building the translations on one page.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+
+from .utils import build_catalog, peak_memory, report, setup
+
+
+def first_page(catalog):
+    from mobetta import util
+
+    entries = catalog.untranslated_entries()
+    return [(util.get_message_hash(entry), util.get_occurrences(entry)) for entry in entries[:20]]
+
+
+def main():
+    setup()
+
+    import polib
+    from mobetta.reader import read_catalog
+    from mobetta.util import get_catalog_statistics
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            assert first_page(read_catalog(path)) == first_page(polib.pofile(path))
+
+            print('{} messages'.format(size))
+            before = report('  polib', lambda: polib.pofile(path), number=3)
+            after = report('  read_catalog', lambda: read_catalog(path), number=3)
+            print('  speedup: {:.1f}x'.format(before / after))
+
+            before = report('  polib first page', lambda: first_page(polib.pofile(path)), number=3)
+            after = report('  read_catalog first page', lambda: first_page(read_catalog(path)), number=3)
+            print('  speedup: {:.1f}x'.format(before / after))
+
+            before = report('  polib statistics', lambda: get_catalog_statistics(polib.pofile(path)), number=3)
+            after = report('  read_catalog statistics', lambda: get_catalog_statistics(read_catalog(path)), number=3)
+            print('  speedup: {:.1f}x'.format(before / after))
+
+            # what stays in memory while the catalog is cached
+            print('  peak memory: {:.1f} MB -> {:.1f} MB'.format(
+                peak_memory(lambda: polib.pofile(path)) / 1e6,
+                peak_memory(lambda: read_catalog(path)) / 1e6,
+            ))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare saving a single changed translation by patching the file with
+serializing the whole catalog.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+
+from .utils import build_catalog, report, setup
+
+
+def main():
+    setup()
+
+    from django.utils import six
+
+    from mobetta import patching
+    from mobetta.files import atomic_write
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            pofile = patching.load_pofile(path)
+            entry = pofile[size // 2]
+
+            def full():
+                atomic_write(path, six.text_type(pofile).encode('utf-8'))
+
+            def patched():
+                entry.msgstr += 'x'
+                patching.mark_changed(pofile, entry)
+                patching.write_pofile(path, pofile, atomic_write)
+
+            print('{} messages'.format(size))
+            before = report('  full serialization', full)
+            # the full save invalidated the layout, record it again
+            pofile = patching.load_pofile(path)
+            entry = pofile[size // 2]
+            after = report('  patched', patched)
+            print('  speedup: {:.1f}x'.format(before / after))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
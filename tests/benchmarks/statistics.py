@@ -0,0 +1,42 @@
+"""
+Compare the single-pass statistics with the polib filter methods.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+
+from .utils import build_catalog, report, setup
+
+
+def polib_statistics(pofile):
+    translated_entries = len(pofile.translated_entries())
+    untranslated_entries = len(pofile.untranslated_entries())
+    return {
+        'percent_translated': pofile.percent_translated(),
+        'total_messages': translated_entries + untranslated_entries,
+        'translated_messages': translated_entries,
+        'fuzzy_messages': len(pofile.fuzzy_entries()),
+        'obsolete_messages': len(pofile.obsolete_entries()),
+    }
+
+
+def main():
+    setup()
+
+    import polib
+    from mobetta.util import get_catalog_statistics
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            pofile = polib.pofile(path)
+            print('{} messages'.format(size))
+            before = report('  polib filter methods', lambda: polib_statistics(pofile))
+            after = report('  get_catalog_statistics', lambda: get_catalog_statistics(pofile))
+            print('  speedup: {:.1f}x'.format(before / after))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
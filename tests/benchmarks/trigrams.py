@@ -0,0 +1,52 @@
+"""
+Compare searching a catalog read into memory with and without narrowing the
+entries down with the trigram index first, and time finding similar msgids.
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+
+from .utils import build_catalog, report, setup
+
+
+def search(catalog, query, index=None):
+    from mobetta.search import get_matcher
+    from mobetta.views import _entry_matches
+
+    matcher = get_matcher(query)
+    entries = catalog
+    positions = index.candidates(query) if index is not None else None
+    if positions is not None:
+        entries = [catalog[position] for position in positions]
+    return len([entry for entry in entries if _entry_matches(matcher, entry)])
+
+
+def main():
+    setup()
+
+    from mobetta.reader import read_catalog
+    from mobetta.trigrams import CatalogMsgidIndex, CatalogTextIndex
+
+    for size in (1000, 10000, 50000):
+        path = build_catalog(size)
+        try:
+            print('{} messages'.format(size))
+            catalog = read_catalog(path)
+            report('  build text index', lambda: CatalogTextIndex(catalog), number=3)
+            report('  build msgid index', lambda: CatalogMsgidIndex(catalog), number=3)
+            index = CatalogTextIndex(catalog)
+            msgids = CatalogMsgidIndex(catalog)
+
+            for query in ('number 4242 with', 'bericht nummer 1', 'words'):
+                assert search(catalog, query) == search(catalog, query, index)
+                before = report('  search {!r}'.format(query), lambda: search(catalog, query))
+                after = report('  search {!r} with index'.format(query), lambda: search(catalog, query, index))
+                print('  speedup: {:.1f}x'.format(before / after))
+
+            report('  similar msgids', lambda: msgids.similar('Message number 42 with more words'))
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
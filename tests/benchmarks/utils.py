@@ -0,0 +1,61 @@
+from __future__ import print_function, unicode_literals
+
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+
+
+def build_catalog(size):
+    """
+    Return the path to a temporary PO file with ``size`` messages, a mix of
+    translated, untranslated, fuzzy and obsolete entries.
+    """
+    import polib
+
+    pofile = polib.POFile()
+    pofile.metadata = {
+        'Content-Type': 'text/plain; charset=UTF-8',
+        'Language': 'nl',
+    }
+    for i in range(size):
+        entry = polib.POEntry(
+            msgid='Message number {} with a few more words'.format(i),
+            msgstr='Bericht nummer {}'.format(i) if i % 3 else '',
+            occurrences=[('app/templates/page_{}.html'.format(i % 50), str(i))],
+        )
+        if i % 7 == 0:
+            entry.flags.append('fuzzy')
+        if i % 11 == 0:
+            entry.obsolete = True
+        pofile.append(entry)
+
+    handle, path = tempfile.mkstemp(suffix='.po')
+    os.close(handle)
+    pofile.save(path)
+    return path
+
+
+def report(label, func, number=5):
+    duration = min(timeit.repeat(func, number=1, repeat=number))
+    print('{:<40} {:>10.2f} ms'.format(label, duration * 1000))
+    return duration
+
+
+def peak_memory(func):
+    """
+    Return the peak memory allocated while calling ``func``, in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
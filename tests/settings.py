@@ -69,3 +69,5 @@ LOCALE_PATHS = [
 ]
 
 MOBETTA_LANGUAGE_GROUPS = True
+
+MOBETTA_JOB_RUNNER = 'mobetta.jobs.SynchronousJobRunner'
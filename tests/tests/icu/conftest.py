@@ -1,4 +1,5 @@
 import json
+import os
 from collections import OrderedDict
 
 from django.apps import apps
@@ -22,3 +23,25 @@ if apps.is_installed('mobetta.icu'):
         with outfile.open('w') as _outfile:
             json.dump(messages, _outfile)
         return ICUTranslationFileFactory.create(filepath=str(outfile), language_code='en')
+
+    @pytest.fixture
+    def icu_source_file(real_icu_file):
+        """
+        The English file the messages of ``real_icu_file`` are translated from,
+        with an untranslated message added to the latter.
+        """
+        directory = os.path.dirname(real_icu_file.filepath)
+        with open(real_icu_file.filepath, 'w') as _outfile:
+            json.dump(OrderedDict((
+                ('some.key1', 'some.translation1'),
+                ('some.key2', 'some.translation2'),
+                ('some.key3', ''),
+            )), _outfile)
+        source_path = os.path.join(directory, 'en.json')
+        with open(source_path, 'w') as _outfile:
+            json.dump(OrderedDict((
+                ('some.key1', 'some.source1'),
+                ('some.key2', 'some.translation2'),
+                ('some.key3', 'some.source3'),
+            )), _outfile)
+        return source_path
@@ -6,6 +6,8 @@ from django.utils.translation import ugettext as _
 
 import pytest
 
+from mobetta.conf import settings as mobetta_settings
+
 from ..factories import AdminFactory, UserFactory
 
 
@@ -46,7 +48,7 @@ def test_single_edit(django_app, real_icu_file):
 
     # check that the file was effectively updated
     icu_file = real_icu_file.get_icufile_object()
-    assert icu_file.contents['some.key1'] == 'Translatèd string'
+    assert icu_file['some.key1'] == 'Translatèd string'
 
     # Check the edit history
     file_edits = real_icu_file.edit_logs.all()
@@ -114,7 +116,7 @@ def test_simultaneous_edits_blocked(django_app, real_icu_file):
 
     # verify file contents
     icu_file = real_icu_file.get_icufile_object()
-    assert icu_file.contents['some.key1'] == 'First user translation'
+    assert icu_file['some.key1'] == 'First user translation'
 
     # Check the edit history: the rejected edit shouldn't be in there
     file_edits = real_icu_file.edit_logs.all()
@@ -186,6 +188,20 @@ def test_search_regex(django_app, real_icu_file):
     assert form['form-1-translation'].value == 'some.translation2'
 
 
+@pytest.mark.django_db
+def test_search_memory_mapped_file(django_app, real_icu_file, monkeypatch):
+    monkeypatch.setattr(mobetta_settings, 'MMAP_THRESHOLD', 0)
+    user = AdminFactory.create()
+    url = reverse('mobetta:icu_file_detail', kwargs={'pk': real_icu_file.pk})
+    response = django_app.get(url, {'search_tags': 'TRANSLATION2'}, user=user)
+    assert response.status_code == 200
+
+    form = response.forms['translation-edit']
+    assert form['form-0-msgid'].value == 'some.key2'
+    assert form['form-0-translation'].value == 'some.translation2'
+    assert 'form-1-msgid' not in form.fields
+
+
 @pytest.mark.django_db
 def test_search_invalid_regex(django_app, real_icu_file):
     user = AdminFactory.create()
@@ -203,3 +219,34 @@ def test_search_invalid_regex(django_app, real_icu_file):
     assert 'form-0-translation' not in form.fields
     assert 'form-1-msgid' not in form.fields
     assert 'form-1-translation' not in form.fields
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('type_filter,keys', [
+    ('translated', ['some.key1']),
+    ('untranslated', ['some.key3']),
+    ('identical', ['some.key2']),
+    ('unknown', ['some.key1', 'some.key2', 'some.key3']),
+])
+def test_filter_by_type(django_app, real_icu_file, icu_source_file, type_filter, keys):
+    user = AdminFactory.create()
+    url = reverse('mobetta:icu_file_detail', kwargs={'pk': real_icu_file.pk})
+    response = django_app.get(url, {'type': type_filter}, user=user)
+    assert response.status_code == 200
+
+    form = response.forms['translation-edit']
+    assert [form['form-{}-msgid'.format(i)].value for i in range(len(keys))] == keys
+    assert 'form-{}-msgid'.format(len(keys)) not in form.fields
+
+
+@pytest.mark.django_db
+def test_filter_by_type_and_search(django_app, real_icu_file, icu_source_file, monkeypatch):
+    monkeypatch.setattr(mobetta_settings, 'MMAP_THRESHOLD', 0)
+    user = AdminFactory.create()
+    url = reverse('mobetta:icu_file_detail', kwargs={'pk': real_icu_file.pk})
+    response = django_app.get(url, {'type': 'identical', 'search_tags': 'some.key'}, user=user)
+    assert response.status_code == 200
+
+    form = response.forms['translation-edit']
+    assert form['form-0-msgid'].value == 'some.key2'
+    assert 'form-1-msgid' not in form.fields
@@ -32,18 +32,32 @@ def test_file_stats(django_app, real_icu_file):
     response = django_app.get(url, user=user, status=200)
     file_row = response.html.find('tr', id='file_detail_{}'.format(real_icu_file.pk))
 
-    col_titles = ['name', 'total_messages', 'filename',
-                  'created', 'edit_history', 'download']
+    col_titles = ['name', 'total_messages', 'translated_messages', 'untranslated_messages',
+                  'identical_messages', 'filename', 'created', 'edit_history', 'download']
     stats_cells = file_row.find_all('td', recursive=False)
     stats_results = dict(zip(col_titles, [cell.text for cell in list(stats_cells)]))
 
     assert stats_results['name'] == real_icu_file.name
     assert stats_results['total_messages'] == '2'
+    assert stats_results['translated_messages'] == '2'
+    assert stats_results['untranslated_messages'] == '0'
+    assert stats_results['identical_messages'] == '0'
     assert stats_results['filename'] == real_icu_file.filepath
     assert stats_results['edit_history'] == _('View')
     assert stats_results['download'] == _('Download')
 
 
+@pytest.mark.django_db
+def test_file_stats_compared_with_source(django_app, real_icu_file, icu_source_file):
+    user = AdminFactory.create()
+    url = reverse('mobetta:icu_file_list', kwargs={'lang_code': 'nl'})
+    response = django_app.get(url, user=user, status=200)
+    file_row = response.html.find('tr', id='file_detail_{}'.format(real_icu_file.pk))
+
+    stats_cells = [cell.text for cell in file_row.find_all('td', recursive=False)]
+    assert stats_cells[1:5] == ['3', '1', '1', '1']
+
+
 @pytest.mark.django_db
 def test_file_download_link(django_app, real_icu_file):
     """
@@ -61,3 +75,13 @@ def test_file_download_link(django_app, real_icu_file):
     with open(real_icu_file.filepath, 'rb') as json_file:
         expected_content = json_file.read()
     assert download.content == expected_content
+
+
+@pytest.mark.django_db
+def test_statistics(real_icu_file):
+    stats = real_icu_file.get_statistics()
+
+    assert stats['total_messages'] == 2
+    assert stats['translated_messages'] == 2
+    assert stats['untranslated_messages'] == 0
+    assert stats['total_words'] == 2
@@ -0,0 +1,159 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+
+import pytest
+
+from mobetta import cache
+from mobetta.cache import get_file_signature
+from mobetta.conf import settings as mobetta_settings
+from mobetta.files import atomic_write
+from mobetta.icu.models import IcuFile
+
+
+@pytest.mark.django_db
+def test_statistics_without_source(real_icu_file):
+    assert real_icu_file.get_source_path() is None
+    assert real_icu_file.get_statistics() == {
+        'total_messages': 2,
+        'translated_messages': 2,
+        'untranslated_messages': 0,
+        'identical_messages': 0,
+        'total_words': 2,
+        'total_characters': 34,
+    }
+
+
+@pytest.mark.django_db
+def test_message_status(real_icu_file, icu_source_file):
+    assert real_icu_file.get_source_path() == icu_source_file
+
+    status = real_icu_file.get_message_status()
+
+    assert status.translated == {'some.key1'}
+    assert status.untranslated == {'some.key3'}
+    assert status.identical == {'some.key2'}
+    # cached until one of the files changes
+    assert real_icu_file.get_message_status() is status
+
+    atomic_write(icu_source_file, json.dumps({'some.key1': 'some.translation1'}).encode('utf8'))
+    status = real_icu_file.get_message_status()
+
+    assert status.translated == {'some.key2'}
+    assert status.identical == {'some.key1'}
+
+
+@pytest.mark.django_db
+def test_message_status_of_other_values(real_icu_file, icu_source_file):
+    with open(icu_source_file, 'w') as outfile:
+        json.dump({'count': 1, 'flag': True, 'nested': {'a': 'b'}}, outfile)
+    with open(real_icu_file.filepath, 'w') as outfile:
+        json.dump({
+            'text': 'Twee woorden', 'empty': '', 'null': None, 'count': 1, 'zero': 0,
+            'flag': False, 'list': ['a b c'], 'nested': {'a': 'b'},
+        }, outfile)
+
+    status = real_icu_file.get_message_status()
+
+    assert status.translated == {'text', 'zero', 'flag', 'list'}
+    assert status.untranslated == {'empty', 'null'}
+    assert status.identical == {'count', 'nested'}
+    assert (status.total_words, status.total_characters) == (2, 12)
+
+
+@pytest.mark.django_db
+def test_source_language(real_icu_file, icu_source_file, monkeypatch):
+    monkeypatch.setattr(mobetta_settings, 'ICU_SOURCE_LANGUAGE', 'nl')
+    assert real_icu_file.get_source_path() is None
+
+    monkeypatch.setattr(mobetta_settings, 'ICU_SOURCE_LANGUAGE', 'de-at')
+    de_path = os.path.join(os.path.dirname(real_icu_file.filepath), 'de.json')
+    with open(de_path, 'w') as outfile:
+        json.dump({}, outfile)
+    assert real_icu_file.get_source_path() == de_path
+
+
+@pytest.mark.django_db
+def test_memory_mapped_source(real_icu_file, icu_source_file, monkeypatch):
+    monkeypatch.setattr(mobetta_settings, 'MMAP_THRESHOLD', 0)
+    assert real_icu_file.get_statistics()['identical_messages'] == 1
+
+
+@pytest.mark.django_db
+def test_icu_file_is_cached(real_icu_file):
+    icu_file = real_icu_file.get_icufile_object()
+
+    assert real_icu_file.get_icufile_object() is icu_file
+    assert icu_file['some.key2'] == 'some.translation2'
+    assert icu_file.index == {'some.key1': 0, 'some.key2': 1}
+    with pytest.raises(TypeError):
+        icu_file['some.key1'] = 'changed'
+
+
+@pytest.mark.django_db
+def test_icu_file_for_update(real_icu_file):
+    cached = real_icu_file.get_icufile_object()
+    icu_file = real_icu_file.get_icufile_object(for_update=True)
+    icu_file['some.key1'] = 'changed'
+
+    assert cached['some.key1'] == 'some.translation1'
+
+    real_icu_file.save_icufile_object(icu_file)
+
+    with open(real_icu_file.filepath) as infile:
+        assert json.load(infile) == {'some.key1': 'changed', 'some.key2': 'some.translation2'}
+    cached = real_icu_file.get_icufile_object()
+    assert cached['some.key1'] == 'changed'
+    assert isinstance(cached.translations, tuple)
+
+
+class StaleWatcher(object):
+
+    def __init__(self, signatures):
+        self.signatures = signatures
+
+    def get_signature(self, path):
+        return self.signatures[path]
+
+
+@pytest.mark.django_db
+def test_icu_file_for_update_reads_changes(real_icu_file):
+    real_icu_file.get_icufile_object()
+    # a file watcher that didn't see the next change yet
+    cache.set_file_watcher(StaleWatcher({real_icu_file.filepath: get_file_signature(real_icu_file.filepath)}))
+    try:
+        atomic_write(real_icu_file.filepath, json.dumps({'some.key1': 'changed'}).encode('utf8'))
+
+        assert len(real_icu_file.get_icufile_object()) == 2
+        assert list(real_icu_file.get_icufile_object(for_update=True)) == [('some.key1', 'changed')]
+    finally:
+        cache.set_file_watcher(None)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mmap_threshold', [None, 0])
+def test_nested_values_are_saved_unchanged(real_icu_file, monkeypatch, mmap_threshold):
+    monkeypatch.setattr(mobetta_settings, 'MMAP_THRESHOLD', mmap_threshold)
+    content = '{"some.key1": "a", "nested": {"b": ["c", 1]}, "count": 2, "empty": null}'
+    atomic_write(real_icu_file.filepath, content.encode('utf8'))
+
+    icu_file = real_icu_file.get_icufile_object(for_update=True)
+    icu_file['some.key1'] = 'changed'
+    real_icu_file.save_icufile_object(icu_file)
+
+    with open(real_icu_file.filepath) as infile:
+        assert infile.read() == content.replace('"a"', '"changed"')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('mmap_threshold', [None, 0])
+def test_load_icu_file(tmpdir, monkeypatch, mmap_threshold):
+    monkeypatch.setattr(mobetta_settings, 'MMAP_THRESHOLD', mmap_threshold)
+    path = tmpdir.join('nl.json')
+    path.write_binary('{"b": "1", "a": "\\u00e9", "b": "2"}'.encode('utf8'))
+
+    icu_file = IcuFile(str(path))
+
+    assert list(icu_file) == [('b', '2'), ('a', '\xe9')]
+    assert icu_file.signature == get_file_signature(str(path))
@@ -0,0 +1,23 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+import pytest
+
+from mobetta.conf import settings as mobetta_settings
+from mobetta.search_index import ICU, get_search_index, refresh_search_index
+
+from .factories import ICUTranslationFileFactory
+
+
+@pytest.mark.django_db
+def test_icu_files_are_indexed(tmpdir, monkeypatch):
+    monkeypatch.setattr(mobetta_settings, 'SEARCH_INDEX_PATH', str(tmpdir.join('index.sqlite3')))
+    path = tmpdir.join('nl.json')
+    path.write_text(json.dumps({'menu.open': 'Openen', 'menu.close': ''}, ensure_ascii=False), encoding='utf-8')
+    icu_file = ICUTranslationFileFactory.create(name='frontend', filepath=str(path))
+
+    assert refresh_search_index() == (1, 0, 0)
+    results = get_search_index().search('openen')
+    assert [(result.kind, result.file_id, result.msgid) for result in results] == [(ICU, icu_file.pk, 'menu.open')]
+    assert sorted(result.msgid for result in get_search_index().search('menu', kind=ICU)) == ['menu.close', 'menu.open']
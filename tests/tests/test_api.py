@@ -8,6 +8,7 @@ try:
 except ImportError:
     import mock
 
+from django.contrib.auth.models import Group
 from django.urls import reverse
 from django.test import TestCase
 from django.utils.translation import ugettext as _
@@ -17,6 +18,7 @@ from rest_framework.test import APIClient
 from mobetta.util import get_hash_from_msgid_context
 
 from .factories import AdminFactory, MessageCommentFactory, UserFactory
+from .test_search_index import SearchIndexTestMixin
 from .utils import POFileTestCase
 
 
@@ -179,6 +181,130 @@ class MessageCommentAPITests(POFileTestCase):
         self.assertEqual(response.status_code, 403)
 
 
+class TranslationFileAPITests(POFileTestCase):
+
+    def test_file_statistics(self):
+        client = APIClient()
+        client.force_authenticate(user=AdminFactory.create())
+
+        response = client.get(reverse('mobetta:api:translationfile-list'))
+
+        self.assertEqual(response.status_code, 200)
+        statistics = response.data[0]['statistics']
+        self.assertEqual(statistics, self.transfile.get_statistics())
+
+
+class MessageSearchAPITests(SearchIndexTestMixin, POFileTestCase):
+
+    def setUp(self):
+        super(MessageSearchAPITests, self).setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AdminFactory.create())
+        self.url = reverse('mobetta:api:search')
+
+    def test_search(self):
+        response = self.client.get(self.url, {'q': 'translation'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['next_offset'], None)
+        result, = response.data['results']
+        self.assertEqual(result['msgid'], 'String 2')
+        self.assertEqual(result['msgstr'], 'Translation of string 2')
+        self.assertEqual(result['file_id'], self.transfile.pk)
+        self.assertEqual(result['kind'], 'po')
+
+    def test_limit_and_offset(self):
+        response = self.client.get(self.url, {'q': 'string', 'limit': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['next_offset'], 3)
+
+        response = self.client.get(self.url, {'q': 'string', 'limit': 3, 'offset': 3})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['next_offset'], None)
+
+        self.assertEqual(self.client.get(self.url, {'q': 'string', 'limit': 'all'}).status_code, 400)
+
+    def test_language_filter(self):
+        response = self.client.get(self.url, {'q': 'translation', 'language_code': 'de'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_unauthorised(self):
+        client = APIClient()
+        client.force_authenticate(user=UserFactory.create())
+        self.assertEqual(client.get(self.url, {'q': 'translation'}).status_code, 403)
+
+
+class TranslationMemoryAPITests(SearchIndexTestMixin, POFileTestCase):
+
+    def setUp(self):
+        super(TranslationMemoryAPITests, self).setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AdminFactory.create())
+        self.url = reverse('mobetta:api:translation_memory')
+
+    def test_exact_and_fuzzy_matches(self):
+        response = self.client.get(self.url, {'msgid': 'String 2', 'language_code': 'nl'})
+
+        self.assertEqual(response.status_code, 200)
+        exact, = response.data['exact']
+        self.assertEqual(exact['msgstr'], 'Translation of string 2')
+        self.assertEqual(exact['count'], 1)
+        self.assertEqual(exact['file_id'], self.transfile.pk)
+        self.assertEqual(response.data['fuzzy'], [])
+
+        response = self.client.get(self.url, {'msgid': 'String  3', 'language_code': 'nl'})
+        self.assertEqual(response.data['exact'], [])
+        fuzzy, = response.data['fuzzy']
+        self.assertEqual((fuzzy['msgid'], fuzzy['msgstr']), ('String 2', 'Translation of string 2'))
+        self.assertEqual(fuzzy['similarity'], 0.875)
+
+    def test_required_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'msgid': 'String 2'}).status_code, 400)
+
+    def test_language_permission(self):
+        user = UserFactory.create()
+        user.groups.add(Group.objects.create(name='translators'))
+        client = APIClient()
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(self.url, {'msgid': 'String 2', 'language_code': 'nl'}).status_code, 403)
+
+
+class SimilarMessagesAPITests(POFileTestCase):
+
+    def setUp(self):
+        super(SimilarMessagesAPITests, self).setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=AdminFactory.create())
+        self.url = reverse('mobetta:api:similar_messages', kwargs={'pk': self.transfile.pk})
+
+    def test_similar_messages(self):
+        response = self.client.get(self.url, {'msgid': 'string 2'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['msgid'], 'string 2')
+        self.assertEqual(
+            [result['msgid'] for result in response.data['results']],
+            ['String 2', 'String 1', 'String 4'],
+        )
+        self.assertEqual(response.data['results'][0]['msgstr'], 'Translation of string 2')
+        self.assertEqual(response.data['results'][0]['similarity'], 1.0)
+
+    def test_leaves_out_the_message_itself(self):
+        response = self.client.get(self.url, {'msgid': 'String 4', 'msgctxt': 'Context hint', 'limit': 2})
+
+        self.assertEqual([result['msgid'] for result in response.data['results']], ['String 1', 'String 2'])
+
+    def test_msgid_required(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_language_permission(self):
+        user = UserFactory.create()
+        user.groups.add(Group.objects.create(name='translators'))
+        client = APIClient()
+        client.force_authenticate(user=user)
+        self.assertEqual(client.get(self.url, {'msgid': 'String 2'}).status_code, 403)
+
+
 class TranslationSuggestionAPITests(TestCase):
 
     def setUp(self):
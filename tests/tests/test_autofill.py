@@ -0,0 +1,131 @@
+# coding=utf8
+import io
+import os
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.utils.six import StringIO
+
+from mobetta import jobs, util
+from mobetta.autofill import autofill_translation_file
+from mobetta.models import EditLog, Job, TranslationFile
+from mobetta.search_index import refresh_search_index
+
+from .factories import AdminFactory
+from .test_search_index import SearchIndexTestMixin
+from .utils import POFileTestCase
+
+OTHER_CATALOG = u'''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "String 1"
+msgstr "Tekst 1"
+
+msgid "String 3 with comments"
+msgstr "Tekst 3 met opmerkingen"
+'''
+
+
+class AutofillTestMixin(SearchIndexTestMixin):
+
+    def setUp(self):
+        super(AutofillTestMixin, self).setUp()
+        path = os.path.join(self.directory, 'django.po')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(OTHER_CATALOG)
+        TranslationFile.objects.create(name='shop', filepath=path, language_code='nl')
+        self.user = AdminFactory.create()
+
+
+class AutofillTests(AutofillTestMixin, POFileTestCase):
+
+    def test_autofill(self):
+        refresh_search_index()
+
+        result = autofill_translation_file(self.transfile, self.user)
+
+        self.assertEqual((result.filled, result.untranslated), (1, 3))
+        pofile = self.transfile.get_polib_object()
+        entry = pofile.find('String 1')
+        self.assertEqual(entry.msgstr, u'Tekst 1')
+        self.assertIn('fuzzy', entry.flags)
+        self.assertEqual(pofile.find('String 3 with comment').msgstr, u'')
+        # translated entries are left alone
+        self.assertEqual(pofile.find('String 2').msgstr, u'Translation of string 2')
+        self.assertEqual(
+            sorted(EditLog.objects.values_list('msgid', 'fieldname', 'new_value')),
+            [(u'String 1', u'fuzzy', u'True'), (u'String 1', u'translation', u'Tekst 1')],
+        )
+
+    def test_long_translations_are_logged_truncated(self):
+        refresh_search_index()
+
+        with mock.patch('mobetta.autofill.find_translations', return_value={'String 1': u'x' * 300}):
+            autofill_translation_file(self.transfile, self.user)
+
+        self.assertEqual(self.transfile.get_polib_object().find('String 1').msgstr, u'x' * 300)
+        self.assertEqual(EditLog.objects.get(fieldname='translation').new_value, u'x' * 255)
+
+    def test_file_is_unchanged_if_logging_fails(self):
+        refresh_search_index()
+
+        with mock.patch('mobetta.autofill.log_edits', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                autofill_translation_file(self.transfile, self.user)
+
+        self.assertEqual(self.transfile.get_polib_object().find('String 1').msgstr, u'')
+
+    def test_autofill_similar(self):
+        refresh_search_index()
+
+        result = autofill_translation_file(self.transfile, self.user, min_similarity=0.9)
+
+        self.assertEqual(result.filled, 2)
+        entry = self.transfile.get_polib_object().find('String 3 with comment')
+        self.assertEqual(entry.msgstr, u'Tekst 3 met opmerkingen')
+        self.assertIn('fuzzy', entry.flags)
+
+    def test_rejected_changes_are_not_counted(self):
+        refresh_search_index()
+
+        with mock.patch.object(util, 'update_translations', return_value=([], [])):
+            result = autofill_translation_file(self.transfile, self.user)
+
+        self.assertEqual(result.filled, 0)
+
+    def test_job_without_user(self):
+        job = jobs.enqueue('autofill_translation_files', file_ids=[self.transfile.pk])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('The user who started the job no longer exists.', job.result)
+
+    def test_nothing_to_fill(self):
+        result = autofill_translation_file(self.transfile, self.user)
+
+        self.assertEqual(result.filled, 0)
+        self.assertFalse(EditLog.objects.exists())
+
+
+class AutofillCommandTests(AutofillTestMixin, POFileTestCase):
+
+    def test_autofill_language(self):
+        stdout = StringIO()
+        call_command('autofill_translations', '--language', 'nl', user=self.user.username, stdout=stdout)
+
+        self.assertIn('{}: filled 1 of 3 untranslated messages'.format(self.pofile_path), stdout.getvalue())
+        self.assertEqual(self.transfile.get_polib_object().find('String 1').msgstr, u'Tekst 1')
+
+    def test_files_required(self):
+        with self.assertRaises(CommandError):
+            call_command('autofill_translations', user=self.user.username)
+
+    def test_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('autofill_translations', self.transfile.pk, user='nobody')
@@ -0,0 +1,114 @@
+import os
+
+from django.test import TestCase
+
+import polib
+
+from mobetta.cache import (
+    DjangoCatalogCache, LocMemCatalogCache, get_catalog_cache,
+    get_file_signature
+)
+from mobetta.reader import Catalog, read_catalog
+
+from .utils import POFileTestCase
+
+
+class CountingLoader(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return polib.pofile(path)
+
+
+class LocMemCatalogCacheTests(POFileTestCase):
+
+    def setUp(self):
+        super(LocMemCatalogCacheTests, self).setUp()
+        self.cache = LocMemCatalogCache()
+        self.loader = CountingLoader()
+
+    def test_parsed_once_while_unchanged(self):
+        first = self.cache.get(self.pofile_path, self.loader)
+        second = self.cache.get(self.pofile_path, self.loader)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.loader.calls, 1)
+
+    def test_reparsed_when_file_changes(self):
+        first = self.cache.get(self.pofile_path, self.loader)
+        stat = os.stat(self.pofile_path)
+        os.utime(self.pofile_path, (stat.st_atime, stat.st_mtime + 10))
+
+        second = self.cache.get(self.pofile_path, self.loader)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(self.loader.calls, 2)
+
+    def test_set_after_save(self):
+        self.cache.get(self.pofile_path, self.loader)
+        pofile = self.transfile.get_polib_object(for_update=True)
+        pofile[0].msgstr = 'Changed'
+        pofile.save()
+        self.cache.set(self.pofile_path, pofile)
+
+        self.assertIs(self.cache.get(self.pofile_path, self.loader), pofile)
+        self.assertEqual(self.loader.calls, 1)
+
+    def test_evicts_least_recently_used(self):
+        signature = get_file_signature(self.pofile_path)
+        cache = LocMemCatalogCache(max_entries=5)
+        cache.store('a', signature, [1, 2])
+        cache.store('b', signature, [1, 2])
+        cache.lookup('a', signature)
+        cache.store('c', signature, [1, 2])
+
+        self.assertIsNotNone(cache.lookup('a', signature))
+        self.assertIsNone(cache.lookup('b', signature))
+        self.assertIsNotNone(cache.lookup('c', signature))
+
+    def test_translation_file_uses_cache(self):
+        get_catalog_cache().invalidate(self.pofile_path)
+
+        self.assertIs(self.transfile.get_polib_object(), self.transfile.get_polib_object())
+
+    def test_variants_are_cached_apart(self):
+        pofile = self.cache.get(self.pofile_path, self.loader)
+        catalog = self.cache.get(self.pofile_path, read_catalog, variant='reader')
+
+        self.assertIsInstance(catalog, Catalog)
+        self.assertIs(self.cache.get(self.pofile_path, self.loader), pofile)
+        self.assertIs(self.cache.get(self.pofile_path, read_catalog, variant='reader'), catalog)
+
+    def test_variants_are_kept_per_cache(self):
+        self.cache.get(self.pofile_path, read_catalog, variant='reader')
+
+        self.assertIn('reader', self.cache.variants)
+        self.assertEqual(LocMemCatalogCache().variants, set())
+
+
+class DjangoCatalogCacheTests(POFileTestCase, TestCase):
+
+    def test_roundtrip_and_invalidate(self):
+        cache = DjangoCatalogCache()
+        loader = CountingLoader()
+
+        first = cache.get(self.pofile_path, loader)
+        second = cache.get(self.pofile_path, loader)
+        self.assertEqual(loader.calls, 1)
+        self.assertEqual([e.msgid for e in first], [e.msgid for e in second])
+
+        cache.invalidate(self.pofile_path)
+        cache.get(self.pofile_path, loader)
+        self.assertEqual(loader.calls, 2)
+
+    def test_reader_catalog_roundtrip(self):
+        cache = DjangoCatalogCache()
+        cache.get(self.pofile_path, read_catalog, variant='reader')
+
+        catalog = cache.get(self.pofile_path, read_catalog, variant='reader')
+        pofile = polib.pofile(self.pofile_path)
+        self.assertEqual([e.msgid for e in catalog], [e.msgid for e in pofile])
+        self.assertEqual(catalog[0].occurrences, pofile[0].occurrences)
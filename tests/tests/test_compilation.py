@@ -0,0 +1,99 @@
+import os
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+import polib
+
+from mobetta.compilation import (
+    COMPILED, MISSING, SKIPPED, compile_translation_files, get_mofile_path
+)
+from mobetta.models import TranslationFile
+
+from .utils import MultiplePOFilesTestCase, POFileTestCase
+
+
+class CompileTranslationFilesTests(POFileTestCase):
+
+    def setUp(self):
+        super(CompileTranslationFilesTests, self).setUp()
+        self.mofile_path = get_mofile_path(self.pofile_path)
+
+    def tearDown(self):
+        if os.path.exists(self.mofile_path):
+            os.remove(self.mofile_path)
+        super(CompileTranslationFilesTests, self).tearDown()
+
+    def compile(self, **kwargs):
+        results = compile_translation_files(TranslationFile.objects.all(), **kwargs)
+        self.transfile.refresh_from_db()
+        return [result.status for result in results]
+
+    def test_compile(self):
+        self.assertEqual(self.compile(), [COMPILED])
+
+        with open(self.mofile_path, 'rb') as f:
+            self.assertEqual(f.read(), polib.pofile(self.pofile_path).to_binary())
+        self.assertEqual(len(self.transfile.compiled_hash), 40)
+        self.assertIsNotNone(self.transfile.last_compiled)
+
+    def test_unchanged_files_skipped(self):
+        self.compile()
+        last_compiled = self.transfile.last_compiled
+
+        self.assertEqual(self.compile(), [SKIPPED])
+        self.assertEqual(self.transfile.last_compiled, last_compiled)
+
+        self.assertEqual(self.compile(force=True), [COMPILED])
+
+    def test_changed_files_compiled(self):
+        self.compile()
+        self.create_poentry('A new string', 'Een nieuwe string')
+
+        self.assertEqual(self.compile(), [COMPILED])
+
+    def test_missing_mofile_compiled(self):
+        self.compile()
+        os.remove(self.mofile_path)
+
+        self.assertEqual(self.compile(), [COMPILED])
+        self.assertTrue(os.path.exists(self.mofile_path))
+
+    def test_missing_pofile(self):
+        TranslationFile.objects.update(filepath='/does/not/exist.po')
+
+        self.assertEqual(self.compile(), [MISSING])
+        self.assertFalse(self.transfile.is_valid)
+
+    def test_save_mofile_records_hash(self):
+        self.transfile.save_mofile()
+        self.assertEqual(self.compile(), [SKIPPED])
+
+
+class ParallelCompilationTests(MultiplePOFilesTestCase):
+    test_pofiles = [
+        ('django.po.example', 'nl'),
+        ('django.po.example', 'cy'),
+    ]
+
+    def tearDown(self):
+        for translation_file in TranslationFile.objects.all():
+            os.remove(get_mofile_path(translation_file.filepath))
+        super(ParallelCompilationTests, self).tearDown()
+
+    def test_compile_on_pool(self):
+        results = compile_translation_files(TranslationFile.objects.all(), processes=2)
+
+        self.assertEqual([result.status for result in results], [COMPILED, COMPILED])
+        for translation_file in TranslationFile.objects.all():
+            self.assertTrue(os.path.exists(get_mofile_path(translation_file.filepath)))
+            self.assertTrue(translation_file.compiled_hash)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('compile_translation_files', stdout=stdout)
+        self.assertIn('Compiled 2 of 2 files', stdout.getvalue())
+
+        stdout = StringIO()
+        call_command('compile_translation_files', '--language', 'nl', stdout=stdout)
+        self.assertIn('Compiled 0 of 1 files', stdout.getvalue())
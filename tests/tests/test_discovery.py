@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import TestCase, override_settings
+
+from mobetta import discovery
+from mobetta.conf import settings as mobetta_settings
+from mobetta.discovery import discover_translation_files
+from mobetta.models import TranslationFile
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class DiscoveryTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.locale_path = os.path.join(self.directory, 'locale')
+
+        patcher = mock.patch.object(
+            mobetta_settings, 'DISCOVERY_SNAPSHOT_PATH', os.path.join(self.directory, 'snapshot.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        settings_override = override_settings(LOCALE_PATHS=[self.locale_path])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.nl_path = self.create_file('nl', 'django.po')
+        self.de_path = self.create_file('de', 'django.po')
+
+    def create_file(self, dirname, filename):
+        messages_dir = os.path.join(self.locale_path, dirname, 'LC_MESSAGES')
+        if not os.path.isdir(messages_dir):
+            os.makedirs(messages_dir)
+        path = os.path.join(messages_dir, filename)
+        open(path, 'w').close()
+        return path
+
+    def age_directories(self):
+        # listings of directories that were just modified aren't reused
+        past = time.time() - 60
+        for path, dirnames, filenames in os.walk(self.locale_path):
+            os.utime(path, (past, past))
+
+    def discover(self, **kwargs):
+        return discover_translation_files(['nl', 'de', 'fr'], **kwargs)
+
+    def test_discover(self):
+        result = self.discover()
+
+        self.assertEqual(result.found, [('de', self.de_path), ('nl', self.nl_path)])
+        self.assertEqual(result.created, result.found)
+        self.assertEqual(
+            sorted(TranslationFile.objects.values_list('language_code', 'filepath', 'is_valid')),
+            [('de', self.de_path, True), ('nl', self.nl_path, True)],
+        )
+        # the locale directory and the LC_MESSAGES of both languages
+        self.assertEqual((result.listed, result.reused), (3, 0))
+
+        result = self.discover()
+        self.assertEqual(result.created, [])
+        self.assertEqual(TranslationFile.objects.count(), 2)
+
+    def test_unchanged_directories_are_not_listed(self):
+        self.age_directories()
+        self.discover()
+
+        result = self.discover()
+
+        self.assertEqual((result.listed, result.reused), (0, 3))
+        self.assertEqual(result.found, [('de', self.de_path), ('nl', self.nl_path)])
+
+        result = self.discover(full=True)
+        self.assertEqual((result.listed, result.reused), (3, 0))
+
+    def test_new_files(self):
+        self.age_directories()
+        self.discover()
+
+        js_path = self.create_file('nl', 'djangojs.po')
+        fr_path = self.create_file('fr', 'django.po')
+        result = self.discover()
+
+        self.assertEqual(result.created, [('fr', fr_path), ('nl', js_path)])
+        # the locale directory and the LC_MESSAGES of nl and fr
+        self.assertEqual((result.listed, result.reused), (3, 1))
+        self.assertEqual(TranslationFile.objects.count(), 4)
+
+    def test_removed_files(self):
+        self.discover()
+
+        os.remove(self.de_path)
+        result = self.discover()
+
+        self.assertEqual(result.invalidated, [self.de_path])
+        self.assertFalse(TranslationFile.objects.get(filepath=self.de_path).is_valid)
+        self.assertTrue(TranslationFile.objects.get(filepath=self.nl_path).is_valid)
+
+        self.create_file('de', 'django.po')
+        result = self.discover()
+
+        self.assertEqual(result.restored, [self.de_path])
+        self.assertEqual(result.created, [])
+        self.assertTrue(TranslationFile.objects.get(filepath=self.de_path).is_valid)
+
+    def test_files_outside_the_locale_paths(self):
+        other_path = os.path.join(self.directory, 'django.po')
+        open(other_path, 'w').close()
+        TranslationFile.objects.create(name='other', filepath=other_path, language_code='nl')
+        TranslationFile.objects.create(name='gone', filepath='/does/not/exist/django.po', language_code='nl')
+
+        result = self.discover()
+
+        self.assertEqual(result.invalidated, ['/does/not/exist/django.po'])
+        self.assertTrue(TranslationFile.objects.get(filepath=other_path).is_valid)
+
+    def test_unreadable_snapshot(self):
+        with open(discovery.get_snapshot_path(), 'w') as f:
+            f.write('{')
+
+        result = self.discover()
+
+        self.assertEqual(result.found, [('de', self.de_path), ('nl', self.nl_path)])
@@ -0,0 +1,69 @@
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from mobetta.conf import settings as mobetta_settings
+from mobetta.edit_logging import edit_log_queue, log_edits
+from mobetta.models import EditLog
+
+from .factories import AdminFactory, TranslationFileFactory
+
+
+def make_changes(count):
+    return [
+        (None, {
+            'msgid': 'String {}'.format(i),
+            'md5hash': '{:032x}'.format(i),
+            'field': 'translation',
+            'from': '',
+            'to': 'Translation {}'.format(i),
+        })
+        for i in range(count)
+    ]
+
+
+class LogEditsTests(TestCase):
+
+    def setUp(self):
+        self.user = AdminFactory.create()
+        self.translation_file = TranslationFileFactory.create()
+
+    def test_single_insert(self):
+        with self.assertNumQueries(1):
+            log_edits(EditLog, self.user, self.translation_file, make_changes(50))
+
+        self.assertEqual(EditLog.objects.count(), 50)
+        log = EditLog.objects.get(msghash='{:032x}'.format(3))
+        self.assertEqual(log.new_value, 'Translation 3')
+        self.assertEqual(log.file_edited, self.translation_file)
+
+    @mock.patch.object(mobetta_settings, 'USE_EDIT_LOGGING', False)
+    def test_logging_disabled(self):
+        with self.assertNumQueries(0):
+            log_edits(EditLog, self.user, self.translation_file, make_changes(5))
+
+
+class DeferredLogEditsTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = AdminFactory.create()
+        self.translation_file = TranslationFileFactory.create()
+
+    @mock.patch.object(mobetta_settings, 'EDIT_LOG_DEFER_THRESHOLD', 10)
+    def test_large_saves_are_deferred(self):
+        with transaction.atomic():
+            log_edits(EditLog, self.user, self.translation_file, make_changes(20))
+            self.assertEqual(EditLog.objects.count(), 0)
+
+        edit_log_queue.join()
+        self.assertEqual(EditLog.objects.count(), 20)
+
+    @mock.patch.object(mobetta_settings, 'EDIT_LOG_DEFER_THRESHOLD', 10)
+    def test_small_saves_are_not_deferred(self):
+        with transaction.atomic():
+            log_edits(EditLog, self.user, self.translation_file, make_changes(5))
+            self.assertEqual(EditLog.objects.count(), 5)
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from mobetta import files
+from mobetta.conf import settings as mobetta_settings
+from mobetta.files import (
+    FileLockTimeout, atomic_write, fcntl, file_lock, get_lock_path
+)
+
+
+class AtomicWriteTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'django.po')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replaces_contents(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'old contents')
+        os.chmod(self.path, 0o664)
+
+        atomic_write(self.path, b'new contents')
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'new contents')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o664)
+        self.assertEqual(os.listdir(self.directory), ['django.po'])
+
+    def test_symlink_is_kept(self):
+        target = os.path.join(self.directory, 'shared.po')
+        with open(target, 'wb') as f:
+            f.write(b'old contents')
+        os.symlink(target, self.path)
+
+        atomic_write(self.path, b'new contents')
+
+        self.assertTrue(os.path.islink(self.path))
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), b'new contents')
+
+    @unittest.skipUnless(hasattr(os, 'geteuid') and os.geteuid() == 0, "only root can change the owner")
+    def test_owner_is_kept(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'old contents')
+        os.chown(self.path, 1234, 1234)
+
+        atomic_write(self.path, b'new contents')
+
+        self.assertEqual((os.stat(self.path).st_uid, os.stat(self.path).st_gid), (1234, 1234))
+
+    def test_original_kept_on_error(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'old contents')
+
+        with self.assertRaises(TypeError):
+            atomic_write(self.path, u'not bytes')
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'old contents')
+        self.assertEqual(os.listdir(self.directory), ['django.po'])
+
+
+class FileLockTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'django.po')
+        patcher = mock.patch.object(mobetta_settings, 'LOCK_DIRECTORY', os.path.join(self.directory, 'locks'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_files_are_kept_apart(self):
+        with file_lock(self.path):
+            self.assertIn(os.path.realpath(self.path), files._thread_locks)
+
+        self.assertEqual(os.listdir(self.directory), ['locks'])
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'locks')), [os.path.basename(get_lock_path(self.path))])
+        # the lock of this thread is gone with the block
+        self.assertNotIn(os.path.realpath(self.path), files._thread_locks)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lock_file_next_to_file(self):
+        with mock.patch.object(mobetta_settings, 'LOCK_DIRECTORY', None):
+            with file_lock(self.path):
+                pass
+
+            self.assertEqual(get_lock_path(self.path), os.path.join(self.directory, '.django.po.lock'))
+        self.assertEqual(os.listdir(self.directory), ['.django.po.lock'])
+
+    def test_lock_held_by_other_thread(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with file_lock(self.path):
+                locked.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            locked.wait()
+            with self.assertRaises(FileLockTimeout):
+                with file_lock(self.path, timeout=0.1):
+                    pass
+        finally:
+            release.set()
+            thread.join()
+
+        with file_lock(self.path, timeout=0.1):
+            pass
+
+    @unittest.skipIf(fcntl is None, "fcntl is not available")
+    def test_lock_held_by_other_process(self):
+        # flock locks conflict between separately opened files, like they
+        # would between processes
+        os.makedirs(os.path.dirname(get_lock_path(self.path)))
+        handle = os.open(get_lock_path(self.path), os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            with self.assertRaises(FileLockTimeout):
+                with file_lock(self.path, timeout=0.1):
+                    pass
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            os.close(handle)
+
+        with file_lock(self.path, timeout=0.1):
+            pass
@@ -0,0 +1,174 @@
+import os
+from datetime import timedelta
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from rest_framework.test import APIClient
+
+from mobetta import jobs
+from mobetta.compilation import get_mofile_path
+from mobetta.conf import settings as mobetta_settings
+from mobetta.models import Job
+
+from .factories import AdminFactory, UserFactory
+from .utils import POFileTestCase
+
+
+@jobs.register('test_failure')
+def failing_job(job):
+    raise ValueError("Something went wrong")
+
+
+class JobTests(POFileTestCase):
+
+    def tearDown(self):
+        mofile_path = get_mofile_path(self.pofile_path)
+        if os.path.exists(mofile_path):
+            os.remove(mofile_path)
+        super(JobTests, self).tearDown()
+
+    def test_compile_job(self):
+        job = jobs.enqueue('compile_translation_files', force=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual((job.progress, job.total), (1, 1))
+        self.assertIn('Compiled 1 translation files', job.result)
+        self.assertTrue(os.path.exists(get_mofile_path(self.pofile_path)))
+
+    @mock.patch('mobetta.jobs.compile_translation_files', return_value=[])
+    def test_compile_job_processes(self, compile_translation_files):
+        jobs.enqueue('compile_translation_files')
+        self.assertEqual(compile_translation_files.call_args[1]['processes'], 1)
+
+        with mock.patch.object(jobs, '_job_runner', jobs.DatabaseJobRunner()):
+            jobs.enqueue('compile_translation_files')
+            jobs.run_pending_jobs()
+        self.assertIsNone(compile_translation_files.call_args[1]['processes'])
+
+    def test_failed_job(self):
+        job = jobs.enqueue('test_failure')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.result, 'ValueError: Something went wrong')
+        self.assertIsNotNone(job.finished)
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('does_not_exist')
+
+    @mock.patch.object(jobs, '_job_runner', jobs.DatabaseJobRunner())
+    def test_database_runner(self):
+        job = jobs.enqueue('compile_translation_files')
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+
+        stdout = StringIO()
+        call_command('run_mobetta_jobs', '--once', stdout=stdout)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIn('Ran 1 jobs', stdout.getvalue())
+
+    def test_job_runs_once(self):
+        job = jobs.enqueue('compile_translation_files')
+        job.refresh_from_db()
+        finished = job.finished
+
+        jobs.run_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.finished, finished)
+
+    @mock.patch.object(jobs, 'needs_refresh', lambda: True)
+    def test_abandoned_jobs(self):
+        abandoned = Job.objects.create(name='update_search_index', status=Job.RUNNING)
+        Job.objects.filter(pk=abandoned.pk).update(updated=timezone.now() - timedelta(hours=1))
+        running = Job.objects.create(name='update_search_index', status=Job.RUNNING)
+
+        # a refresh is still running
+        self.assertIsNone(jobs.enqueue_search_index_refresh())
+
+        running.delete()
+        job = jobs.enqueue_search_index_refresh()
+
+        self.assertIsNotNone(job)
+        abandoned.refresh_from_db()
+        self.assertEqual(abandoned.status, Job.FAILED)
+        self.assertIsNotNone(abandoned.finished)
+
+    @mock.patch.object(jobs, '_refresh_checked', None)
+    @mock.patch.object(jobs, 'enqueue_search_index_refresh')
+    def test_search_index_refresh_is_checked_once_per_interval(self, enqueue_search_index_refresh):
+        jobs.request_search_index_refresh()
+        jobs.request_search_index_refresh()
+        self.assertEqual(enqueue_search_index_refresh.call_count, 1)
+
+        with mock.patch.object(mobetta_settings, 'SEARCH_INDEX_REFRESH_INTERVAL', 0):
+            jobs.request_search_index_refresh()
+        self.assertEqual(enqueue_search_index_refresh.call_count, 2)
+
+    @mock.patch.object(jobs, '_job_runner', jobs.DatabaseJobRunner())
+    def test_progress_keeps_jobs_alive(self):
+        job = jobs.enqueue('compile_translation_files')
+        Job.objects.filter(pk=job.pk).update(updated=timezone.now() - timedelta(hours=1))
+        job.set_progress(0, 1)
+
+        self.assertEqual(jobs.fail_abandoned_jobs(), 0)
+        self.assertEqual(jobs.run_pending_jobs(), 1)
+
+    def test_status_api(self):
+        job = jobs.enqueue('locate_translation_files')
+        client = APIClient()
+        client.force_authenticate(user=AdminFactory.create())
+
+        response = client.get(reverse('mobetta:api:job-detail', args=(job.pk,)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Job.DONE)
+        self.assertEqual(response.data['progress'], response.data['total'])
+
+    def test_status_api_of_other_users(self):
+        translator = UserFactory.create()
+        translator.groups.add(Group.objects.create(name='translators'))
+        own_job = jobs.enqueue('locate_translation_files', user=translator)
+        other_job = jobs.enqueue('locate_translation_files', user=AdminFactory.create())
+        client = APIClient()
+        client.force_authenticate(user=translator)
+
+        response = client.get(reverse('mobetta:api:job-list'))
+        self.assertEqual([job['id'] for job in response.data], [own_job.pk])
+        self.assertEqual(client.get(reverse('mobetta:api:job-detail', args=(other_job.pk,))).status_code, 404)
+
+    def test_locate_job_reports_progress(self):
+        with mock.patch.object(Job, 'set_progress', autospec=True) as set_progress:
+            jobs.enqueue('locate_translation_files')
+
+        progress = [call[0][1:] for call in set_progress.call_args_list]
+        total = progress[0][1]
+        self.assertGreater(total, 1)
+        self.assertEqual(progress, [(done, total) for done in range(total + 1)])
+
+
+class ThreadJobRunnerTests(TransactionTestCase):
+
+    def test_jobs_run_after_commit(self):
+        runner = jobs.ThreadJobRunner(workers=1)
+        with mock.patch.object(jobs, '_job_runner', runner):
+            job = jobs.enqueue('locate_translation_files')
+        runner.join()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
@@ -0,0 +1,260 @@
+# coding=utf8
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from mobetta.conf import settings as mobetta_settings
+from mobetta.mapped import (
+    FileChanged, MappedCatalog, MappedJSONFile, build_prefilter, can_map,
+    json_patterns, load_catalog
+)
+from mobetta.reader import read_catalog
+from mobetta.search import get_matcher
+
+from .test_mofile import EDGE_CASES
+
+WRAPPED = u'''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+#: views.py:1
+msgid ""
+"A long message that is wrapped "
+"over two lines"
+msgstr ""
+"Een lang bericht dat over twee "
+"regels is AFGEBROKEN"
+
+#~ msgid "Obsolete message"
+#~ msgstr ""
+#~ "Vervallen "
+#~ "bericht"
+'''
+
+
+def entry_matches(matcher):
+    return lambda entry: matcher.matches(entry.msgid, entry.msgstr, entry.msgctxt)
+
+
+class MappedCatalogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content, newline=None, encoding='utf-8', filename='django.po'):
+        path = os.path.join(self.directory, filename)
+        with io.open(path, 'w', encoding=encoding, newline=newline) as f:
+            f.write(content)
+        return path
+
+    def assertSameAsReader(self, path, encoding='utf-8'):
+        catalog = read_catalog(path)
+        mapped = MappedCatalog(path, encoding)
+
+        self.assertEqual(mapped.metadata, catalog.metadata)
+        self.assertEqual(len(mapped), len(catalog))
+        for entry, expected in zip(mapped, catalog):
+            self.assertEqual(
+                (entry.msgctxt, entry.msgid, entry.msgstr, entry.msgstr_plural, list(entry.flags), entry.obsolete),
+                (expected.msgctxt, expected.msgid, expected.msgstr, expected.msgstr_plural, list(expected.flags),
+                 expected.obsolete),
+            )
+            self.assertEqual(entry.materialize(), expected.materialize())
+
+        for method in ('translated_entries', 'untranslated_entries', 'fuzzy_entries', 'obsolete_entries'):
+            self.assertEqual(
+                [entry.msgid for entry in getattr(mapped, method)()],
+                [entry.msgid for entry in getattr(catalog, method)()],
+            )
+
+    def assertSearchesLikeReader(self, path, query):
+        matcher = get_matcher(query)
+        self.assertEqual(
+            [entry.msgid for entry in MappedCatalog(path, 'utf-8').search(entry_matches(matcher), query)],
+            [entry.msgid for entry in read_catalog(path) if entry_matches(matcher)(entry)],
+        )
+
+    def test_edge_cases(self):
+        self.assertSameAsReader(self.write(EDGE_CASES))
+
+    def test_windows_newlines(self):
+        self.assertSameAsReader(self.write(EDGE_CASES, newline='\r\n'))
+
+    def test_byte_order_mark(self):
+        self.assertSameAsReader(self.write(u'﻿' + EDGE_CASES))
+
+    def test_other_encoding(self):
+        content = EDGE_CASES.replace(u'charset=UTF-8', u'charset=ISO-8859-1')
+        self.assertSameAsReader(self.write(content, encoding='iso-8859-1'), encoding='iso-8859-1')
+
+    def test_search_plain_text(self):
+        path = self.write(EDGE_CASES)
+        for query in (u'open', u'OPEN', u'ûnîcôdê', u'ÜNÏCÖDÉ', u'"quoted"', u'\t', u'vaag %s', u'nothing'):
+            self.assertSearchesLikeReader(path, query)
+
+    def test_search_across_lines(self):
+        path = self.write(WRAPPED)
+        for query in (u'wrapped over', u'twee regels is afgebroken', u'vervallen bericht'):
+            self.assertSearchesLikeReader(path, query)
+
+    def test_search_case_folded(self):
+        path = self.write(WRAPPED.replace(u'AFGEBROKEN', u'afgebroken in de Straße'))
+        for query in (u'STRASSE', u'strasse', u'straße', u'sse', u'ẞ'):
+            self.assertSearchesLikeReader(path, query)
+        self.assertEqual(len(MappedCatalog(path, 'utf-8').search(lambda entry: True, u'STRASSE')), 1)
+
+    def test_search_regex(self):
+        path = self.write(EDGE_CASES)
+        for query in (u'op.n', u'^Half', u'apples?$'):
+            self.assertSearchesLikeReader(path, query)
+
+    def test_search_only_decodes_candidates(self):
+        mapped = MappedCatalog(self.write(EDGE_CASES), 'utf-8')
+        checked = []
+
+        def matches(entry):
+            checked.append(entry.msgid)
+            return True
+
+        self.assertEqual([entry.msgctxt for entry in mapped.search(matches, u'open')], [u'menu', u'door'])
+        self.assertEqual(checked, [u'Open', u'Open'])
+
+    def test_search_subset(self):
+        mapped = MappedCatalog(self.write(EDGE_CASES), 'utf-8')
+        matcher = get_matcher(u'obsolete')
+
+        self.assertEqual(len(mapped.search(entry_matches(matcher), u'obsolete')), 2)
+        self.assertEqual(len(mapped.translated_entries().search(entry_matches(matcher), u'obsolete')), 0)
+
+    def test_pickle(self):
+        mapped = MappedCatalog(self.write(EDGE_CASES), 'utf-8')
+        mapped[0]
+
+        unpickled = pickle.loads(pickle.dumps(mapped, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual([entry.msgid for entry in unpickled], [entry.msgid for entry in mapped])
+
+    def test_truncated_in_place(self):
+        path = self.write(EDGE_CASES)
+        mapped = MappedCatalog(path, 'utf-8')
+        mapped[0]
+
+        with open(path, 'r+b') as f:
+            f.truncate(10)
+
+        # instead of reading past the end of the file, which raises SIGBUS
+        with self.assertRaises(FileChanged):
+            mapped[len(mapped) - 1]
+
+    def test_replaced_before_unpickling(self):
+        path = self.write(EDGE_CASES)
+        pickled = pickle.dumps(MappedCatalog(path, 'utf-8'), pickle.HIGHEST_PROTOCOL)
+        self.write(WRAPPED)
+
+        with self.assertRaises(FileChanged):
+            pickle.loads(pickled)[0]
+
+    def test_load_catalog(self):
+        path = self.write(EDGE_CASES)
+
+        self.assertNotIsInstance(load_catalog(path), MappedCatalog)
+        with mock.patch.object(mobetta_settings, 'MMAP_THRESHOLD', 0):
+            self.assertIsInstance(load_catalog(path), MappedCatalog)
+
+    def test_can_map(self):
+        self.assertTrue(can_map('utf-8'))
+        self.assertTrue(can_map('iso-8859-1'))
+        self.assertFalse(can_map('utf-16'))
+
+
+class MappedJSONFileTests(unittest.TestCase):
+
+    messages = OrderedDict((
+        ('menu.open', u'Openen'),
+        ('menu.close', u''),
+        ('page.title', u'Ûnîcôdê "titel" / pagina\n'),
+        ('page.emoji', u'Gefeliciteerd 🎉'),
+    ))
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, content):
+        with io.open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return MappedJSONFile(self.path)
+
+    def test_iterate(self):
+        for ensure_ascii in (True, False):
+            mapped = self.write(json.dumps(self.messages, ensure_ascii=ensure_ascii, indent=2))
+            self.assertEqual(list(mapped), list(self.messages.items()))
+
+    def test_search(self):
+        for ensure_ascii in (True, False):
+            mapped = self.write(json.dumps(self.messages, ensure_ascii=ensure_ascii))
+            for query in (u'OPEN', u'ûnîcôdê', u'"titel" /', u'🎉', u'page', u'nothing', u'pa.e'):
+                matcher = get_matcher(query)
+
+                def matches(pair):
+                    return matcher.matches(*pair)
+
+                self.assertEqual(
+                    mapped.search(matches, query),
+                    [pair for pair in self.messages.items() if matches(pair)],
+                )
+
+    def test_prefilter_matches_unicode_escapes_in_any_case(self):
+        prefilter = build_prefilter(u'é', json_patterns)
+
+        self.assertTrue(prefilter.search(b'"\\u00e9"'))
+        self.assertTrue(prefilter.search(b'"\\u00C9"'))
+        self.assertTrue(prefilter.search(u'"É"'.encode('utf-8')))
+
+    def test_prefilter_matches_case_folded_text(self):
+        prefilter = build_prefilter(u'STRASSE', json_patterns)
+
+        for text in (u'Straße', u'STRAẞE', u'ſtraſſe', u'ﬆrasse'):
+            self.assertTrue(prefilter.search(json.dumps(text).encode('utf-8')), text)
+            self.assertTrue(prefilter.search(json.dumps(text, ensure_ascii=False).encode('utf-8')), text)
+        self.assertFalse(prefilter.search(b'"Strase"'))
+        # the query can start or end inside the folding of a character
+        self.assertTrue(build_prefilter(u'sse', json_patterns).search(u'"Straße"'.encode('utf-8')))
+        self.assertTrue(build_prefilter(u'stras', json_patterns).search(u'"Straße"'.encode('utf-8')))
+
+    def test_not_an_object(self):
+        for content in (u'[]', u'{"a": "b",}', u''):
+            with self.assertRaises(ValueError):
+                list(self.write(content))
+
+    def test_not_flat(self):
+        mapped = self.write(u'{"a": {"b": "c"}, "d": 1, "e": "f"}')
+
+        self.assertEqual(list(mapped), [('a', {'b': 'c'}), ('d', 1), ('e', 'f')])
+        self.assertEqual(mapped.search(lambda pair: pair[0] == 'e', u'f'), [('e', 'f')])
+
+    def test_duplicate_keys(self):
+        # like json.load, the last value wins at the position of the first
+        mapped = self.write(u'{"a": "1", "b": "2", "\\u0061": "3"}')
+
+        self.assertEqual(list(mapped), [('a', '3'), ('b', '2')])
+        self.assertEqual(mapped.search(lambda pair: u'1' in pair[1], u'1'), [])
+        self.assertEqual(mapped.search(lambda pair: u'3' in pair[1], u'3'), [('a', '3')])
+
+    def test_empty_object(self):
+        self.assertEqual(list(self.write(u' { } ')), [])
@@ -0,0 +1,133 @@
+# coding=utf8
+import random
+import unittest
+
+from django.test import TestCase
+
+from mobetta.memory import edit_similarity, levenshtein, lookup
+from mobetta.models import TranslationFile
+from mobetta.patching import mark_changed
+from mobetta.search_index import (
+    PO, get_search_index, normalize_source, po_message, refresh_search_index
+)
+
+from .test_search_index import SearchIndexTestMixin
+from .utils import POFileTestCase
+
+
+def naive_levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+class EditDistanceTests(unittest.TestCase):
+
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein(u'kitten', u'sitting'), 3)
+        self.assertEqual(levenshtein(u'', u'abc'), 3)
+        self.assertEqual(levenshtein(u'straße', u'strasse'), 2)
+        self.assertEqual(levenshtein(u'same', u'same'), 0)
+
+    def test_levenshtein_random(self):
+        generator = random.Random(0)
+        for __ in range(500):
+            a = u''.join(generator.choice(u'abcé') for __ in range(generator.randint(0, 12)))
+            b = u''.join(generator.choice(u'abcé') for __ in range(generator.randint(0, 12)))
+            self.assertEqual(levenshtein(a, b), naive_levenshtein(a, b), (a, b))
+
+    def test_edit_similarity(self):
+        self.assertEqual(edit_similarity(u'', u''), 1.0)
+        self.assertEqual(edit_similarity(u'abcd', u'abce'), 0.75)
+
+
+def message(msgid, msgstr):
+    return ('', '', msgid, msgstr, '', normalize_source(msgid) if msgstr else '')
+
+
+class TranslationMemoryTests(SearchIndexTestMixin, TestCase):
+
+    def setUp(self):
+        super(TranslationMemoryTests, self).setUp()
+        index = get_search_index()
+        index.index_catalog(PO, TranslationFile(pk=1, name='shop', language_code='nl'), enumerate([
+            message(u'Open the file', u'Open het bestand'),
+            message(u'Save the file', u'Bewaar het bestand'),
+            message(u'Delete', u''),
+        ]), 'signature')
+        index.index_catalog(PO, TranslationFile(pk=2, name='blog', language_code='nl'), enumerate([
+            message(u'Open the  file', u'Open het bestand'),
+            message(u'Save the file', u'Sla het bestand op'),
+            message(u'Open the files', u'Open de bestanden'),
+        ]), 'signature')
+        index.index_catalog(PO, TranslationFile(pk=3, name='blog', language_code='de'), enumerate([
+            message(u'Open the file', u'Datei öffnen'),
+        ]), 'signature')
+
+    def test_exact(self):
+        exact, fuzzy = lookup(u'Open the file', 'nl')
+
+        self.assertEqual([(match.msgstr, match.count, match.file_name) for match in exact],
+                         [(u'Open het bestand', 2, 'shop')])
+        self.assertEqual([(match.msgid, match.msgstr) for match in fuzzy], [
+            (u'Open the files', u'Open de bestanden'),
+            (u'Save the file', u'Bewaar het bestand'),
+        ])
+        self.assertEqual(round(fuzzy[0].similarity, 2), 0.93)
+
+    def test_most_used_translation_first(self):
+        exact, fuzzy = lookup(u'Save the file', 'nl')
+
+        self.assertEqual([match.msgstr for match in exact], [u'Bewaar het bestand', u'Sla het bestand op'])
+
+    def test_fuzzy(self):
+        exact, fuzzy = lookup(u'open a file', 'nl', min_similarity=0.4)
+
+        self.assertEqual(exact, [])
+        self.assertEqual([match.msgid for match in fuzzy], [u'Open the file', u'Open the files', u'Save the file'])
+        # the most used translation of each msgid
+        self.assertEqual([match.msgstr for match in fuzzy][2], u'Bewaar het bestand')
+
+        exact, fuzzy = lookup(u'open a file', 'nl', limit=1)
+        self.assertEqual([match.msgid for match in fuzzy], [u'Open the file'])
+
+    def test_untranslated_and_other_languages(self):
+        self.assertEqual(lookup(u'Delete', 'nl'), ([], []))
+        self.assertEqual([match.msgstr for match in lookup(u'Open the file', 'de')[0]], [u'Datei öffnen'])
+        self.assertEqual(lookup(u'Open the file', 'fr'), ([], []))
+
+    def test_new_sources_are_added(self):
+        lookup(u'Close the file', 'nl')
+        get_search_index().index_catalog(PO, TranslationFile(pk=4, name='admin', language_code='nl'), [
+            (0, message(u'Close the file', u'Sluit het bestand')),
+        ], 'signature')
+
+        exact, fuzzy = lookup(u'Close the files', 'nl')
+        self.assertEqual([match.msgstr for match in fuzzy][0], u'Sluit het bestand')
+
+
+class SavedTranslationMemoryTests(SearchIndexTestMixin, POFileTestCase):
+
+    def test_saving_updates_the_translation_memory(self):
+        refresh_search_index()
+        self.assertEqual(lookup('String 1', 'nl')[0], [])
+
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = pofile.find('String 1')
+        entry.msgstr = 'Tekst 1'
+        mark_changed(pofile, entry)
+        self.transfile.save_polib_object(pofile)
+
+        self.assertEqual([match.msgstr for match in lookup('String 1', 'nl')[0]], ['Tekst 1'])
+
+    def test_fuzzy_messages_are_left_out(self):
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = pofile.find('String 2')
+        self.assertEqual(po_message(entry, '')[-1], 'String 2')
+
+        entry.flags.append('fuzzy')
+        self.assertEqual(po_message(entry, '')[-1], '')
@@ -1,8 +1,16 @@
 import os
+from unittest import skipUnless
 
+from django.db import connection
 from django.test import TestCase
 
-from mobetta.models import TranslationFile
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from mobetta.models import EditLog, MessageComment, TranslationFile
+from mobetta.patching import mark_changed
 
 from .factories import (
     EditLogFactory, MessageCommentFactory, TranslationFileFactory
@@ -34,6 +42,82 @@ class TranslationFileTests(POFileTestCase, TestCase):
         self.assertTrue(translation_file.is_valid)
         self.assertTrue(os.path.exists(mopath))
 
+    def test_trigram_indexes_are_cached_until_saved(self):
+        index = self.transfile.get_text_index()
+        self.assertIs(self.transfile.get_text_index(), index)
+        self.assertEqual(index.candidates('translation'), [1])
+
+        pofile = self.transfile.get_polib_object(for_update=True)
+        pofile[0].msgstr = 'Translation of string 1'
+        mark_changed(pofile, pofile[0])
+        self.transfile.save_polib_object(pofile)
+
+        self.assertEqual(self.transfile.get_text_index().candidates('translation'), [0, 1])
+        self.assertEqual(self.transfile.get_msgid_index().similar('String 2', limit=1), [(1.0, 1)])
+
+    def test_changes_for_update_are_private_until_saved(self):
+        cached = self.transfile.get_polib_object()
+        pofile = self.transfile.get_polib_object(for_update=True)
+        self.assertIsNot(pofile, cached)
+
+        entry = pofile.find('String 1')
+        entry.msgstr = 'Tekst 1'
+        mark_changed(pofile, entry)
+        self.assertEqual(self.transfile.get_polib_object().find('String 1').msgstr, '')
+
+        self.transfile.save_polib_object(pofile)
+        self.assertIs(self.transfile.get_polib_object(), pofile)
+        with open(self.pofile_path, 'rb') as f:
+            self.assertIn(b'msgstr "Tekst 1"', f.read())
+
+
+class TranslationFileStatisticsTests(POFileTestCase, TestCase):
+    test_pofile_name = 'statstest.po.example'
+
+    def test_statistics_are_stored(self):
+        stats = self.transfile.get_statistics()
+
+        self.assertEqual(stats['total_messages'], 4)
+        self.assertEqual(stats['translated_messages'], 1)
+        self.assertEqual(stats['percent_translated'], 25)
+
+        transfile = TranslationFile.objects.get(pk=self.transfile.pk)
+        self.assertEqual(transfile.translated_messages, 1)
+        self.assertNotEqual(transfile.statistics_signature, '')
+
+    def test_statistics_not_recomputed_when_unchanged(self):
+        self.transfile.get_statistics()
+
+        transfile = TranslationFile.objects.get(pk=self.transfile.pk)
+        with mock.patch.object(TranslationFile, 'get_polib_object') as get_polib_object:
+            stats = transfile.get_statistics()
+
+        get_polib_object.assert_not_called()
+        self.assertEqual(stats['translated_messages'], 1)
+
+    def test_statistics_recomputed_when_file_changes(self):
+        self.transfile.get_statistics()
+        self.create_poentry('String 5', 'Translated')
+
+        stats = self.transfile.get_statistics()
+
+        self.assertEqual(stats['total_messages'], 5)
+        self.assertEqual(stats['translated_messages'], 2)
+
+    def test_statistics_refreshed_on_save(self):
+        pofile = self.transfile.get_polib_object(for_update=True)
+        pofile.find('String 1').msgstr = 'Translated'
+        self.transfile.save_polib_object(pofile)
+
+        transfile = TranslationFile.objects.get(pk=self.transfile.pk)
+        self.assertEqual(transfile.translated_messages, 2)
+        self.assertEqual(transfile.percent_translated, 50)
+
+    def test_statistics_missing_file(self):
+        translation_file = TranslationFileFactory()
+
+        self.assertEqual(translation_file.get_statistics()['total_messages'], 0)
+
 
 class EditLogTests(TestCase):
     def test_model_name(self):
@@ -46,3 +130,32 @@ class MessageCommentTests(TestCase):
         message_comment = MessageCommentFactory()
         self.assertEqual(message_comment.__unicode__(), 'Comment by admin on "{}" (nl) at {}'.format(
             message_comment.msghash, message_comment.created.strftime('%d-%m-%Y')))
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked with SQLite")
+class MessageIndexQueryPlanTests(TestCase):
+    """
+    The edit logs and comments of a message are looked up by file and
+    msghash (ordered by creation date for the edit logs), for the detail view,
+    the template tags and the comments API. These lookups must be served by
+    the composite indexes instead of scanning the tables.
+    """
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_last_edit_uses_index(self):
+        queryset = EditLog.objects.filter(file_edited_id=1, msghash='a' * 32).order_by('-created')
+
+        plan = self.get_query_plan(queryset)
+
+        self.assertIn('mobetta_editlog_msghash_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_comments_use_index(self):
+        queryset = MessageComment.objects.filter(translation_file_id=1, msghash='a' * 32)
+
+        self.assertIn('mobetta_comment_msghash_idx', self.get_query_plan(queryset))
@@ -0,0 +1,123 @@
+# coding=utf8
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+
+import polib
+
+from mobetta.mofile import UnsupportedCatalog, compile_mofile
+
+EDGE_CASES = u'''# Translator comment
+#, fuzzy
+msgid ""
+msgstr ""
+"Project-Id-Version: Test\\n"
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+"X-Custom: first line\\n"
+"Language: nl\\n"
+
+#: app/views.py:10 app/views.py:20
+#, python-format
+msgid "%(count)s apple"
+msgid_plural "%(count)s apples"
+msgstr[0] "%(count)s appel"
+msgstr[1] "%(count)s appels"
+
+msgid "Half translated plural"
+msgid_plural "Half translated plurals"
+msgstr[0] "Half vertaald"
+msgstr[1] ""
+
+msgctxt "menu"
+msgid "Open"
+msgstr "Openen"
+
+msgctxt "door"
+msgid "Open"
+msgstr "Open"
+
+msgctxt ""
+msgid "Empty context"
+msgstr "Lege context"
+
+#, fuzzy, python-format
+msgid "Fuzzy %s"
+msgstr "Vaag %s"
+
+#| msgid "Old message"
+msgid "Escapes \\"quoted\\"\\ttab\\\\"
+msgstr ""
+"Met \\"aanhalingstekens\\"\\n"
+"en een tweede regel \\u00e9"
+
+msgid "Ünïcödé"
+msgstr "Ûnîcôdê"
+
+msgid "Untranslated"
+msgstr ""
+
+#~ msgid "Obsolete"
+#~ msgstr "Vervallen"
+
+#~ msgid "Obsolete plural"
+#~ msgid_plural "Obsolete plurals"
+#~ msgstr[0] "Vervallen"
+#~ msgstr[1] "Vervallen meervoud"
+'''
+
+
+class CompileMofileTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content, newline=None, encoding='utf-8'):
+        path = os.path.join(self.directory, 'django.po')
+        with io.open(path, 'w', encoding=encoding, newline=newline) as f:
+            f.write(content)
+        return path
+
+    def assertSameAsPolib(self, path):
+        self.assertEqual(compile_mofile(path), polib.pofile(path).to_binary())
+
+    def test_example_files(self):
+        pofiles_dir = os.path.join(settings.PROJECT_DIR, 'pofiles')
+        for filename in os.listdir(pofiles_dir):
+            self.assertSameAsPolib(os.path.join(pofiles_dir, filename))
+
+    def test_edge_cases(self):
+        self.assertSameAsPolib(self.write(EDGE_CASES))
+
+    def test_windows_newlines(self):
+        self.assertSameAsPolib(self.write(EDGE_CASES, newline='\r\n'))
+
+    def test_byte_order_mark(self):
+        self.assertSameAsPolib(self.write(u'﻿' + EDGE_CASES))
+
+    def test_other_encoding(self):
+        content = EDGE_CASES.replace(u'charset=UTF-8', u'charset=ISO-8859-1')
+        self.assertSameAsPolib(self.write(content, encoding='iso-8859-1'))
+
+    def test_without_metadata(self):
+        self.assertSameAsPolib(self.write(u'msgid "One"\nmsgstr "Een"\n'))
+
+    def test_trailing_comment(self):
+        self.assertSameAsPolib(self.write(EDGE_CASES + u'\n# trailing comment\n'))
+
+    def test_syntax_error(self):
+        path = self.write(u'msgid "One"\nmsgstr "Een"\nnonsense\n')
+        with self.assertRaises(IOError):
+            compile_mofile(path)
+
+    def test_multiple_metadata_entries(self):
+        path = self.write(u'msgid ""\nmsgstr "Language: nl\\n"\n\nmsgid ""\nmsgstr "Language: de\\n"\n')
+        with self.assertRaises(UnsupportedCatalog):
+            compile_mofile(path)
@@ -0,0 +1,104 @@
+# coding=utf8
+import os
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.utils import six
+
+import polib
+
+from mobetta import patching
+from mobetta.util import get_message_hash, update_translations
+
+from .utils import POFileTestCase
+
+
+class PatchingTests(POFileTestCase):
+
+    def setUp(self):
+        super(PatchingTests, self).setUp()
+        self.pofile = self.transfile.get_polib_object(for_update=True)
+
+    def read(self):
+        with open(self.pofile_path, 'rb') as f:
+            return f.read()
+
+    def translate(self, msgid, translation):
+        entry = self.pofile.find(msgid)
+        change = {
+            'msgid': msgid,
+            'md5hash': get_message_hash(entry),
+            'field': 'translation',
+            'from': entry.msgstr,
+            'to': translation,
+        }
+        applied, rejected = update_translations(self.pofile, [(None, [change])])
+        self.assertEqual(len(applied), 1)
+
+    def test_layout_recorded_on_parse(self):
+        layout = self.pofile._catalog_layout
+        data = self.read()
+
+        self.assertEqual(len(layout.entry_spans), len(self.pofile))
+        start, end = layout.entry_spans[0]
+        self.assertEqual(data[start:end], b'msgid "String 1"\nmsgstr ""\n')
+
+    def test_only_changed_entries_rendered(self):
+        self.translate('String 1', u'Vertaling één')
+        self.translate('String 4', u'Vertaling vier')
+
+        with mock.patch.object(patching, 'render_entry', wraps=patching.render_entry) as render_entry:
+            self.transfile.save_polib_object(self.pofile)
+
+        self.assertEqual(render_entry.call_count, 2)
+        # the untouched parts of the file are kept as they were
+        data = self.read()
+        self.assertIn(b'"X-Translated-Using: some-inferior-translation-software\\n"\n\n\nmsgid', data)
+
+        parsed = polib.pofile(self.pofile_path)
+        self.assertEqual(parsed.find('String 1').msgstr, u'Vertaling één')
+        self.assertEqual(parsed.find('String 4', msgctxt='Context hint').msgstr, u'Vertaling vier')
+        self.assertEqual(len(parsed), len(self.pofile))
+
+    def test_consecutive_saves(self):
+        self.translate('String 1', u'Een lange vertaling\nover twee regels')
+        self.transfile.save_polib_object(self.pofile)
+        self.translate('String 2', u'Twee')
+        self.transfile.save_polib_object(self.pofile)
+
+        # the file now matches what polib would write, apart from the spacing
+        # of the original file
+        data = self.read()
+        for entry in self.pofile:
+            start, end = self.pofile._catalog_layout.entry_spans[entry._layout_index]
+            self.assertEqual(data[start:end], patching.render_entry(self.pofile, entry))
+        parsed = polib.pofile(self.pofile_path)
+        self.assertEqual(parsed.find('String 1').msgstr, u'Een lange vertaling\nover twee regels')
+        self.assertEqual(parsed.find('String 2').msgstr, u'Twee')
+
+    def test_full_serialization_when_file_changed(self):
+        self.translate('String 1', u'Eén')
+        stat = os.stat(self.pofile_path)
+        os.utime(self.pofile_path, (stat.st_atime, stat.st_mtime + 10))
+
+        self.transfile.save_polib_object(self.pofile)
+
+        self.assertEqual(self.read(), six.text_type(self.pofile).encode('utf-8'))
+
+    def test_full_serialization_when_entries_added(self):
+        self.pofile.append(polib.POEntry(msgid=u'New string', msgstr=u'Nieuw'))
+
+        self.transfile.save_polib_object(self.pofile)
+
+        self.assertEqual(self.read(), six.text_type(self.pofile).encode('utf-8'))
+        self.assertEqual(len(self.pofile._catalog_layout.entry_spans), len(self.pofile))
+
+    def test_serialize_matches_polib(self):
+        data, layout = patching.serialize_pofile(self.pofile)
+
+        self.assertEqual(data, six.text_type(self.pofile).encode('utf-8'))
+        for index, (start, end) in enumerate(layout.entry_spans):
+            self.assertEqual(data[start:end], patching.render_entry(self.pofile, self.pofile[index]))
@@ -0,0 +1,103 @@
+# coding=utf8
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+
+import polib
+
+from mobetta.reader import read_catalog
+
+from .test_mofile import EDGE_CASES
+
+
+class ReadCatalogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content, newline=None, encoding='utf-8'):
+        path = os.path.join(self.directory, 'django.po')
+        with io.open(path, 'w', encoding=encoding, newline=newline) as f:
+            f.write(content)
+        return path
+
+    def assertSameAsPolib(self, path):
+        pofile = polib.pofile(path)
+        catalog = read_catalog(path)
+
+        self.assertEqual(catalog.metadata, pofile.metadata)
+        self.assertEqual(len(catalog), len(pofile))
+        for entry, poentry in zip(catalog, pofile):
+            self.assertEqual(
+                (entry.msgctxt, entry.msgid, entry.msgid_plural, entry.msgstr, entry.msgstr_plural or {},
+                 list(entry.flags), entry.obsolete, entry.translated()),
+                (poentry.msgctxt, poentry.msgid, poentry.msgid_plural, poentry.msgstr, poentry.msgstr_plural,
+                 poentry.flags, poentry.obsolete, poentry.translated()),
+            )
+            self.assertEqual(entry.materialize(), poentry)
+            self.assertEqual(entry.occurrences, poentry.occurrences)
+            self.assertEqual(entry.comment, poentry.comment)
+            self.assertEqual(entry.tcomment, poentry.tcomment)
+            self.assertEqual(entry.previous_msgid, poentry.previous_msgid)
+
+        for method in ('translated_entries', 'untranslated_entries', 'fuzzy_entries', 'obsolete_entries'):
+            self.assertEqual(
+                [entry.msgid for entry in getattr(catalog, method)()],
+                [entry.msgid for entry in getattr(pofile, method)()],
+            )
+
+    def test_example_files(self):
+        pofiles_dir = os.path.join(settings.PROJECT_DIR, 'pofiles')
+        for filename in os.listdir(pofiles_dir):
+            self.assertSameAsPolib(os.path.join(pofiles_dir, filename))
+
+    def test_edge_cases(self):
+        self.assertSameAsPolib(self.write(EDGE_CASES))
+
+    def test_windows_newlines(self):
+        self.assertSameAsPolib(self.write(EDGE_CASES, newline='\r\n'))
+
+    def test_byte_order_mark(self):
+        self.assertSameAsPolib(self.write(u'﻿' + EDGE_CASES))
+
+    def test_other_encoding(self):
+        content = EDGE_CASES.replace(u'charset=UTF-8', u'charset=ISO-8859-1')
+        self.assertSameAsPolib(self.write(content, encoding='iso-8859-1'))
+
+    def test_without_metadata(self):
+        self.assertSameAsPolib(self.write(u'# Translator comment\nmsgid "One"\nmsgstr "Een"\n'))
+
+    def test_multiple_metadata_entries(self):
+        self.assertSameAsPolib(self.write(
+            u'msgid ""\nmsgstr "Language: nl\\n"\n\nmsgctxt "x"\nmsgid ""\nmsgstr "Other"\n\n'
+            u'msgid ""\nmsgstr "Language: de\\n"\n'
+        ))
+
+    def test_line_separator_in_message(self):
+        path = self.write(u'#: views.py:1\nmsgid "One\u2028two"\nmsgstr "Een\u2028twee"\n')
+        entry = read_catalog(path)[0]
+
+        self.assertEqual(entry.msgstr, u'Een\u2028twee')
+        self.assertEqual(entry.materialize().msgstr, u'Een\u2028twee')
+
+    def test_materializes_on_access(self):
+        catalog = read_catalog(self.write(EDGE_CASES))
+        entry = catalog[0]
+
+        self.assertIsNone(entry._poentry)
+        entry.msgid
+        self.assertIsNone(entry._poentry)
+        self.assertEqual(entry.occurrences, [('app/views.py', '10'), ('app/views.py', '20')])
+        self.assertIs(entry.materialize(), entry._poentry)
+
+    def test_syntax_error(self):
+        path = self.write(u'msgid "One"\nmsgstr "Een"\nnonsense\n')
+        with self.assertRaises(IOError):
+            read_catalog(path)
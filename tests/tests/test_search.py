@@ -0,0 +1,49 @@
+# coding=utf8
+import unittest
+
+from mobetta import search
+from mobetta.search import InvalidSearch, LiteralMatcher, RegexMatcher, check_pattern, get_matcher
+
+
+class SearchTests(unittest.TestCase):
+
+    def test_literal_matcher(self):
+        matcher = get_matcher(u'Straße 1')
+
+        self.assertIsInstance(matcher, LiteralMatcher)
+        self.assertTrue(matcher.search(u'In der STRASSE 12'))
+        self.assertTrue(matcher.matches(u'', None, u'straße 1'))
+        self.assertFalse(matcher.matches(u'Straße', u'1'))
+
+    def test_regex_matcher(self):
+        matcher = get_matcher(u'^open.*s$')
+
+        self.assertIsInstance(matcher, RegexMatcher)
+        self.assertTrue(matcher.matches(u'Close', u'Open files'))
+        self.assertFalse(matcher.matches(u'Open', u'files'))
+
+    def test_matchers_are_cached(self):
+        self.assertIs(get_matcher(u'open'), get_matcher(u'open'))
+
+        for i in range(search.MAX_CACHED_MATCHERS + 10):
+            get_matcher(u'query {}'.format(i))
+        self.assertEqual(len(search._matchers), search.MAX_CACHED_MATCHERS)
+        self.assertNotIn(u'query 0', search._matchers)
+
+    def test_invalid_regex(self):
+        with self.assertRaises(InvalidSearch):
+            get_matcher(u'open(')
+
+    def test_refuses_catastrophic_patterns(self):
+        for pattern in (u'(a+)+$', u'(a*)*b', u'(\\w+\\s?)+$', u'(a|ab)*c', u'(a|\\wb)+', u'(x+x+)+y',
+                        u'(a)\\1', u'a{100000}', u'x' * (search.MAX_PATTERN_LENGTH + 1),
+                        u'.*.*.*.*.*x', u'(.*)(.*)(.*)(.*)(.*)x', u'\\w+\\s*\\w+x', u'.*.*x', u'\\d+\\w+x'):
+            with self.assertRaises(InvalidSearch, msg=pattern):
+                check_pattern(pattern)
+
+    def test_allows_common_patterns(self):
+        for pattern in (u'^open', u'files?$', u'some.key\\d+', u'foo.*bar', u'(foo|bar)+', u'(ab){2}',
+                        u'\\d{2,4}-\\d+', u'(?:%s|%d) items', u'[a-z]+ing\\b',
+                        u'foo.*bar.*baz', u'(a.*|b.+)c.*d', u'colou?r\\s?s? \\d+',
+                        u'foo\\s*\\w+', u'\\d+\\s+\\w+', u'[a-z]+\\d+'):
+            check_pattern(pattern)
@@ -0,0 +1,125 @@
+# coding=utf8
+import io
+import os
+import shutil
+import tempfile
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from django.test import TestCase
+
+from mobetta import jobs
+from mobetta.conf import settings as mobetta_settings
+from mobetta.models import TranslationFile
+from mobetta.patching import mark_changed
+from mobetta.search_index import (
+    PO, SearchIndex, get_search_index, needs_refresh, refresh_search_index
+)
+
+from .utils import POFileTestCase
+
+
+class SearchIndexTestMixin(object):
+
+    def setUp(self):
+        super(SearchIndexTestMixin, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(
+            mobetta_settings, 'SEARCH_INDEX_PATH', os.path.join(self.directory, 'index.sqlite3'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # searches check whether the index needs a refresh once per process
+        patcher = mock.patch.object(jobs, '_refresh_checked', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        super(SearchIndexTestMixin, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def search(self, query, **kwargs):
+        return [result.msgid for result in get_search_index().search(query, **kwargs)]
+
+
+class SearchIndexTests(SearchIndexTestMixin, POFileTestCase):
+
+    def test_refresh_and_search(self):
+        self.assertTrue(needs_refresh())
+        self.assertEqual(refresh_search_index(), (1, 0, 0))
+        self.assertFalse(needs_refresh())
+
+        self.assertEqual(self.search('translation'), ['String 2'])
+        self.assertEqual(self.search('STRI 3'), ['String 3 with comment'])
+        self.assertEqual(self.search('hint'), ['String 4'])
+        self.assertEqual(self.search('base.html'), ['String 3 with comment'])
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(self.search('string', languages=['de']), [])
+        self.assertEqual(len(self.search('string', languages=['nl'], kind=PO)), 4)
+
+        result = get_search_index().search('translation')[0]
+        self.assertEqual((result.kind, result.file_id, result.language_code), (PO, self.transfile.pk, 'nl'))
+        self.assertEqual(result.get_file_url(), '/mobetta/file/{}/?search_tags=String+2'.format(self.transfile.pk))
+
+    def test_only_changed_files_are_indexed_again(self):
+        refresh_search_index()
+        self.assertEqual(refresh_search_index(), (0, 0, 0))
+
+        with io.open(self.pofile_path, 'a', encoding='utf-8') as f:
+            f.write(u'\nmsgid "String 5"\nmsgstr "Vijfde"\n')
+        self.assertEqual(refresh_search_index(), (1, 0, 0))
+        self.assertEqual(self.search('vijfde'), ['String 5'])
+
+    def test_removed_files(self):
+        refresh_search_index()
+        TranslationFile.objects.all().delete()
+
+        self.assertEqual(refresh_search_index(), (0, 1, 0))
+        self.assertEqual(self.search('string'), [])
+
+    def test_saving_updates_the_changed_messages(self):
+        refresh_search_index()
+
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = [entry for entry in pofile if entry.msgid == 'String 1'][0]
+        entry.msgstr = 'Eerste vertaling'
+        mark_changed(pofile, entry)
+        self.transfile.save_polib_object(pofile)
+
+        self.assertEqual(self.search('eerste'), ['String 1'])
+        # the index is up to date with the saved file
+        self.assertEqual(refresh_search_index(), (0, 0, 0))
+
+    def test_saving_a_changed_file_leaves_it_to_the_refresh(self):
+        refresh_search_index()
+        with io.open(self.pofile_path, 'a', encoding='utf-8') as f:
+            f.write(u'\nmsgid "String 5"\nmsgstr ""\n')
+
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = [entry for entry in pofile if entry.msgid == 'String 1'][0]
+        entry.msgstr = 'Eerste vertaling'
+        mark_changed(pofile, entry)
+        self.transfile.save_polib_object(pofile)
+
+        self.assertEqual(self.search('eerste'), [])
+        self.assertEqual(refresh_search_index(), (1, 0, 0))
+        self.assertEqual(self.search('eerste'), ['String 1'])
+
+
+class LikeSearchIndexTests(SearchIndexTestMixin, TestCase):
+
+    def test_search(self):
+        index = SearchIndex(os.path.join(self.directory, 'like.sqlite3'), use_fts=False)
+        translation_file = TranslationFile(pk=1, name='app', language_code='nl')
+        index.index_catalog(PO, translation_file, [
+            (0, ('a', '', 'Open file', 'Bestand openen', 'views.py:1', 'Open file')),
+            (1, ('b', 'menu', '100% done_', 'Klaar', '', '100% done_')),
+        ], 'signature')
+
+        self.assertFalse(index.fts)
+        self.assertEqual([result.msgid for result in index.search('OPEN views')], ['Open file'])
+        self.assertEqual([result.msgid for result in index.search('% done_')], ['100% done_'])
+        self.assertEqual([result.msgid for result in index.search('_')], ['100% done_'])
+        self.assertEqual(index.search('open', languages=['de']), [])
@@ -3,6 +3,8 @@
 from django.template import Context, Template
 from django.test import TestCase
 
+from .factories import EditLogFactory, MessageCommentFactory
+
 
 class MessageTagTests(TestCase):
 
@@ -11,3 +13,29 @@ class MessageTagTests(TestCase):
         rendered = template.render(Context({}))
 
         self.assertEqual(rendered, "One token: <span class=\"format-token\">{token}</span>")
+
+    def test_comment_count(self):
+        comment = MessageCommentFactory.create()
+        template = Template("{% load message_tags %}{% comment_count file msghash counts %}")
+
+        rendered = template.render(Context({'file': comment.translation_file, 'msghash': comment.msghash}))
+        self.assertEqual(rendered, "1")
+
+        with self.assertNumQueries(0):
+            rendered = template.render(Context({
+                'file': comment.translation_file, 'msghash': comment.msghash, 'counts': {},
+            }))
+        self.assertEqual(rendered, "0")
+
+    def test_last_edit(self):
+        log = EditLogFactory.create()
+        template = Template("{% load message_tags %}{% last_edit file msghash last_edits %}")
+
+        rendered = template.render(Context({'file': log.file_edited, 'msghash': log.msghash}))
+        self.assertIn("Last edited by admin", rendered)
+
+        with self.assertNumQueries(0):
+            rendered = template.render(Context({
+                'file': log.file_edited, 'msghash': log.msghash, 'last_edits': {},
+            }))
+        self.assertIn("No edits found", rendered)
@@ -0,0 +1,111 @@
+# coding=utf8
+import pickle
+import unittest
+
+from mobetta.reader import Catalog
+from mobetta.search import get_matcher
+from mobetta.trigrams import CatalogMsgidIndex, CatalogTextIndex, TrigramIndex
+
+CATALOG = u'''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "Open the file"
+msgstr "Open het bestand"
+
+msgid "Open the files"
+msgstr "Open de bestanden"
+
+msgctxt "address"
+msgid "Street"
+msgstr "Straße"
+
+msgid "Close the file"
+msgstr ""
+
+#~ msgid "Open the old file"
+#~ msgstr "Open het oude bestand"
+'''
+
+
+class TrigramIndexTests(unittest.TestCase):
+
+    def test_candidates(self):
+        index = TrigramIndex([u'abcd', u'bcde', u'xyz', u'klm', u'nop', u'rst'])
+
+        self.assertEqual(index.candidates(u'bcd'), [0, 1])
+        self.assertEqual(index.candidates(u'xyz'), [2])
+        self.assertEqual(index.candidates(u'xyzz'), [])
+        self.assertEqual(index.candidates(u'qqq'), [])
+        self.assertIsNone(index.candidates(u'bc'))
+
+    def test_common_text(self):
+        index = TrigramIndex([u'abcd', u'bcde', u'xyz'])
+
+        self.assertIsNone(index.candidates(u'bcd'))
+        self.assertEqual(index.candidates(u'xyz'), [2])
+
+    def test_candidates_intersect_large_sets(self):
+        texts = [u'abc {}'.format(i) for i in range(50)] + [u'bcd {}'.format(i) for i in range(50)]
+        index = TrigramIndex(texts + [u'abcd'] + [u'xyz'] * 100)
+
+        self.assertEqual(index.candidates(u'abcd'), [100])
+
+    def test_similar(self):
+        index = TrigramIndex([u'abcdef', u'abcxyz', u'abcdeg', u'qrstuv'])
+
+        self.assertEqual(
+            [position for similarity, position in index.similar(u'abcdef', min_similarity=0.1)],
+            [0, 2, 1],
+        )
+        self.assertEqual(index.similar(u'abcdef', limit=1), [(1.0, 0)])
+        self.assertEqual(index.similar(u'ab'), [])
+
+
+class CatalogIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = Catalog(CATALOG)
+
+    def test_text_candidates(self):
+        index = CatalogTextIndex(self.catalog)
+
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.candidates(u'THE FILES'), [1])
+        self.assertEqual(index.candidates(u'bestanden'), [1])
+        self.assertEqual(index.candidates(u'Close'), [3])
+        # case folded like the literal matcher
+        self.assertEqual(index.candidates(u'STRASSE'), [2])
+        self.assertEqual(index.candidates(u'address'), [2])
+        # regexes, short queries and text in most entries are matched
+        # against all entries
+        self.assertIsNone(index.candidates(u'files?'))
+        self.assertIsNone(index.candidates(u'de'))
+        self.assertIsNone(index.candidates(u'the file'))
+
+    def test_text_candidates_include_all_matches(self):
+        index = CatalogTextIndex(self.catalog)
+
+        for query in (u'open', u'het', u'e file', u'bestand', u'straße', u'xyz'):
+            matcher = get_matcher(query)
+            matches = [
+                position for position, entry in enumerate(self.catalog)
+                if matcher.matches(entry.msgid, entry.msgstr, entry.msgctxt)
+            ]
+            candidates = index.candidates(query)
+            if candidates is not None:
+                self.assertEqual(set(matches) - set(candidates), set(), query)
+
+    def test_similar_msgids(self):
+        index = CatalogMsgidIndex(self.catalog)
+
+        results = index.similar(u'Open the file')
+        self.assertEqual([position for similarity, position in results], [0, 1, 3])
+        self.assertEqual(results[0][0], 1.0)
+        # whitespace and case don't matter, obsolete entries are left out
+        self.assertEqual(index.similar(u'open  THE old file')[0][1], 0)
+
+    def test_pickle(self):
+        index = pickle.loads(pickle.dumps(CatalogTextIndex(self.catalog)))
+
+        self.assertEqual(index.candidates(u'bestanden'), [1])
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
+import os
 import re
+import shutil
+import tempfile
 from unittest import TestCase
 
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.six import StringIO
+
 from mobetta import util
 from mobetta.models import TranslationFile
 from mobetta.util import get_token_regexes
 
-from .utils import POFileTestCase
+from .utils import MultiplePOFilesTestCase, POFileTestCase
 
 
 class TokenRegexTests(TestCase):
@@ -44,7 +52,7 @@ class POFileTests(POFileTestCase):
         transfile = TranslationFile.objects.get(filepath=self.pofile_path)
         self.assertEqual(transfile.filepath, self.pofile_path)
 
-        pofile = transfile.get_polib_object()
+        pofile = transfile.get_polib_object(for_update=True)
 
         msgid_to_change = u"String 1"
         poentry = pofile.find(msgid_to_change)
@@ -100,7 +108,7 @@ class POFileTests(POFileTestCase):
     def test_edit_metadata(self):
         transfile = TranslationFile.objects.get(filepath=self.pofile_path)
 
-        pofile = transfile.get_polib_object()
+        pofile = transfile.get_polib_object(for_update=True)
 
         # Use unicode in name to test unicode handling
         util.update_metadata(pofile, u'Ŧest', u'User', u'test@user.nl')
@@ -112,3 +120,109 @@ class POFileTests(POFileTestCase):
 
         version_code = u'Mobetta {}'.format(util.__version__)
         self.assertEqual(pofile.metadata['X-Translated-Using'], version_code)
+
+
+class MessageIndexTests(POFileTestCase):
+
+    def test_index_maps_hashes_to_entries(self):
+        pofile = self.transfile.get_polib_object()
+        index = util.get_message_index(pofile)
+
+        self.assertEqual(len(index), len(pofile))
+        for entry in pofile:
+            self.assertIs(index[util.get_message_hash(entry)], entry)
+
+    def test_index_is_reused(self):
+        pofile = self.transfile.get_polib_object()
+
+        self.assertIs(util.get_message_index(pofile), util.get_message_index(pofile))
+
+    def test_index_follows_context_changes(self):
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = pofile.find(u"String 1")
+        old_hash = util.get_message_hash(entry)
+
+        changes = [(None, [{
+            'msgid': entry.msgid,
+            'md5hash': old_hash,
+            'field': 'context',
+            'from': entry.msgctxt,
+            'to': u'new context',
+        }])]
+        applied_changes, rejected_changes = util.update_translations(pofile, changes)
+
+        self.assertEqual(len(applied_changes), 1)
+        index = util.get_message_index(pofile)
+        self.assertNotIn(old_hash, index)
+        self.assertIs(index[util.get_message_hash(entry)], entry)
+
+
+class CatalogStatisticsTests(POFileTestCase):
+    test_pofile_name = 'statstest.po.example'
+
+    def test_matches_polib(self):
+        self.create_poentry(u'A fuzzy string', u'Fuzzy', fuzzy=True)
+        pofile = self.transfile.get_polib_object(for_update=True)
+        obsolete = pofile.find(u'String 2')
+        obsolete.obsolete = True
+
+        stats = util.get_catalog_statistics(pofile)
+
+        self.assertEqual(stats['translated_messages'], len(pofile.translated_entries()))
+        self.assertEqual(stats['untranslated_messages'], len(pofile.untranslated_entries()))
+        self.assertEqual(stats['fuzzy_messages'], len(pofile.fuzzy_entries()))
+        self.assertEqual(stats['obsolete_messages'], len(pofile.obsolete_entries()))
+        self.assertEqual(stats['percent_translated'], pofile.percent_translated())
+
+    def test_word_and_character_counts(self):
+        stats = util.get_catalog_statistics(self.transfile.get_polib_object())
+
+        # "String 1", "String 2", "String 3 with comment", "String 4"
+        self.assertEqual(stats['total_words'], 10)
+        self.assertEqual(stats['translated_words'], 2)
+        self.assertEqual(stats['total_characters'], 45)
+        self.assertEqual(stats['translated_characters'], 8)
+
+
+class FindPOFilesTests(MultiplePOFilesTestCase):
+    test_pofiles = [
+        ('django.po.example', 'nl'),
+        ('django.po.example', 'cy'),
+    ]
+
+    def get_path(self, language_code):
+        return os.path.join(settings.PROJECT_DIR, 'locale', language_code, 'LC_MESSAGES', 'django.po')
+
+    def test_find_all_pofiles(self):
+        self.assertEqual(util.find_all_pofiles(['nl', 'de', 'cy']), [
+            ('cy', self.get_path('cy')),
+            ('nl', self.get_path('nl')),
+        ])
+        self.assertEqual(util.find_pofiles('nl'), [self.get_path('nl')])
+
+    def test_language_variants(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        messages_dir = os.path.join(directory, 'pt_BR', 'LC_MESSAGES')
+        os.makedirs(messages_dir)
+        for name in ('django.po', 'djangojs.po', 'other.po'):
+            open(os.path.join(messages_dir, name), 'w').close()
+
+        with override_settings(LOCALE_PATHS=settings.LOCALE_PATHS + [directory]):
+            self.assertEqual(util.find_all_pofiles(['pt-br', 'nl']), [
+                ('nl', self.get_path('nl')),
+                ('pt-br', os.path.join(messages_dir, 'django.po')),
+                ('pt-br', os.path.join(messages_dir, 'djangojs.po')),
+            ])
+
+    def test_locate_translation_files(self):
+        self.assertEqual(
+            sorted(TranslationFile.objects.values_list('language_code', 'filepath')),
+            [('cy', self.get_path('cy')), ('nl', self.get_path('nl'))],
+        )
+
+        stdout = StringIO()
+        call_command('locate_translation_files', stdout=stdout)
+
+        self.assertEqual(TranslationFile.objects.count(), 2)
+        self.assertIn('{} Created: False'.format(self.get_path('nl')), stdout.getvalue())
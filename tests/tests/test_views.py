@@ -1,17 +1,28 @@
 # coding=utf8
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.translation import ugettext as _
 
 from django_webtest import WebTest
 
-from mobetta.models import TranslationFile
-from mobetta.util import get_hash_from_msgid_context
+from mobetta.conf import settings as mobetta_settings
+from mobetta.models import EditLog, Job, TranslationFile
+from mobetta.util import get_hash_from_msgid_context, get_message_hash
+from mobetta.views import FileDetailView
 
 from .factories import AdminFactory, EditLogFactory, UserFactory
+from .test_autofill import AutofillTestMixin
+from .test_search_index import SearchIndexTestMixin
 from .utils import MultiplePOFilesTestCase, POFileTestCase
 
 
@@ -45,7 +56,9 @@ class CompilePoFilesViewTests(POFileTestCase, WebTest):
         self.app.get(self.url, user=self.user, status=302)
 
     def test_compile_files(self):
-        self.app.get(self.url, user=self.admin_user, status=302)
+        response = self.app.get(self.url, user=self.admin_user, status=302).follow()
+        self.assertContains(response, 'Compiled 1 translation files')
+        self.assertEqual(Job.objects.get().status, Job.DONE)
 
 
 class FindPoFilesViewTests(POFileTestCase, WebTest):
@@ -66,6 +79,40 @@ class FindPoFilesViewTests(POFileTestCase, WebTest):
         self.app.get(self.url, user=self.admin_user, status=302)
 
 
+class AutofillViewTests(AutofillTestMixin, POFileTestCase, WebTest):
+
+    def setUp(self):
+        super(AutofillViewTests, self).setUp()
+
+        self.other_user = UserFactory.create()
+        self.url = reverse('mobetta:autofill_file', args=(self.transfile.pk,))
+
+    def test_login_required(self):
+        self.app.post(self.url, status=302)
+
+    def test_no_permission(self):
+        self.app.post(self.url, user=self.other_user, status=403)
+
+    def test_get_not_allowed(self):
+        self.app.get(self.url, user=self.user, status=405)
+
+    def test_autofill_file(self):
+        response = self.app.get(reverse('mobetta:file_detail', args=(self.transfile.pk,)), user=self.user)
+        response = response.forms['autofill'].submit().follow()
+
+        self.assertEqual(response.request.path, reverse('mobetta:file_detail', args=(self.transfile.pk,)))
+        self.assertContains(response, 'Filled 1 of 3 untranslated messages in 1 translation files')
+        self.assertEqual(self.transfile.get_polib_object().find('String 1').msgstr, 'Tekst 1')
+
+    def test_autofill_language(self):
+        response = self.app.get(reverse('mobetta:file_list', args=('nl',)), user=self.user)
+        response = response.forms['autofill'].submit().follow()
+
+        self.assertEqual(response.request.path, reverse('mobetta:file_list', args=('nl',)))
+        self.assertContains(response, 'Filled 1 of 3 untranslated messages in 2 translation files')
+        self.assertEqual(Job.objects.get().created_by, self.user)
+
+
 class FileDetailViewTests(POFileTestCase, WebTest):
 
     def setUp(self):
@@ -81,6 +128,42 @@ class FileDetailViewTests(POFileTestCase, WebTest):
     def test_no_permission(self):
         self.app.get(self.url, user=self.user, status=403)
 
+    def test_only_current_page_is_converted(self):
+        for i in range(20):
+            self.create_poentry(u'Extra string {}'.format(i))
+        total = len(self.transfile.get_polib_object())
+
+        with mock.patch.object(FileDetailView, 'get_translation', autospec=True,
+                               side_effect=FileDetailView.get_translation) as get_translation:
+            response = self.app.get(self.url, {'page': 2}, user=self.admin_user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_translation.call_count, total - FileDetailView.paginate_by)
+
+    def test_edits_and_comments_fetched_per_page(self):
+        pofile = self.transfile.get_polib_object()
+        for entry in pofile:
+            EditLogFactory.create(file_edited=self.transfile, msghash=get_message_hash(entry))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.app.get(self.url, user=self.admin_user)
+
+        self.assertEqual(response.status_code, 200)
+        edit_log_queries = [q for q in queries if 'mobetta_editlog' in q['sql']]
+        comment_queries = [q for q in queries if 'mobetta_messagecomment' in q['sql']]
+        self.assertEqual(len(edit_log_queries), 1)
+        self.assertEqual(len(comment_queries), 1)
+        self.assertEqual(response.text.count('Last edited by'), len(pofile))
+
+    def test_last_edit_is_the_newest(self):
+        msghash = get_message_hash(self.transfile.get_polib_object()[0])
+        newest, older = EditLogFactory.create_batch(2, file_edited=self.transfile, msghash=msghash)
+        EditLog.objects.filter(pk=newest.pk).update(created=older.created + timedelta(minutes=1))
+        view = FileDetailView()
+        view.translation_file = self.transfile
+
+        self.assertEqual(view.get_last_edits([msghash]), {msghash: newest})
+
     def test_single_edit(self):
         """
         Go to the file detail view, make an edit to a translation, and submit.
@@ -113,6 +196,33 @@ class FileDetailViewTests(POFileTestCase, WebTest):
         self.assertEqual(only_file_edit.msghash, msghash_to_edit)
         self.assertEqual(only_file_edit.new_value, new_translation)
 
+    @mock.patch.object(mobetta_settings, 'FILE_LOCK_TIMEOUT', 0)
+    def test_edit_while_file_is_locked(self):
+        response = self.app.get(self.url, user=self.admin_user)
+        translation_edit_form = response.forms['translation-edit']
+        msgid_to_edit = translation_edit_form['form-0-msgid'].value
+        translation_edit_form['form-0-translation'] = u'Locked out'
+
+        with self.transfile.lock():
+            response = translation_edit_form.submit()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'is being saved by someone else')
+        self.assertEqual(self.transfile.get_polib_object().find(msgid_to_edit).msgstr, u'')
+        self.assertEqual(self.transfile.edit_logs.count(), 0)
+
+    def test_failed_save_leaves_cached_file_unchanged(self):
+        response = self.app.get(self.url, user=self.admin_user)
+        translation_edit_form = response.forms['translation-edit']
+        msgid_to_edit = translation_edit_form['form-0-msgid'].value
+        translation_edit_form['form-0-translation'] = u'Never saved'
+
+        with mock.patch.object(TranslationFile, 'save_polib_object', side_effect=IOError):
+            with self.assertRaises(IOError):
+                translation_edit_form.submit()
+
+        self.assertEqual(self.transfile.get_polib_object().find(msgid_to_edit).msgstr, u'')
+
     def test_multiple_edits(self):
         """
         Go to the file detail view, make an edit to one translation
@@ -434,6 +544,31 @@ class FileDetailViewTests(POFileTestCase, WebTest):
         self.assertContains(response, "Context hint")  # The context hint we searched for
         self.assertContains(response, "String 4")  # The message string associated with the context result
 
+    def test_search_catastrophic_regex(self):
+        response = self.app.get(self.url, {'search_tags': '(s+)+$'}, user=self.admin_user)
+
+        self.assertNotIn('form-0-msgid', response.forms['translation-edit'].fields)
+        self.assertIn('too complex', [str(message) for message in response.context['messages']][0])
+
+    def test_search_filtered_by_type(self):
+        response = self.app.get(self.url, {'type': 'untranslated', 'search_tags': 'string'}, user=self.admin_user)
+
+        form = response.forms['translation-edit']
+        self.assertEqual(
+            [form['form-{}-msgid'.format(i)].value for i in range(3)],
+            ['String 1', 'String 3 with comment', 'String 4'],
+        )
+        self.assertNotIn('form-3-msgid', form.fields)
+
+    @mock.patch.object(mobetta_settings, 'MMAP_THRESHOLD', 0)
+    def test_search_memory_mapped_file(self):
+        response = self.app.get('{}?type=translated&search_tags=translation'.format(self.url), user=self.admin_user)
+
+        form = response.forms['translation-edit']
+        self.assertEqual(form['form-0-msgid'].value, 'String 2')
+        self.assertEqual(form['form-0-translation'].value, 'Translation of string 2')
+        self.assertNotIn('form-1-msgid', form.fields)
+
     def test_single_edit_filter_on_type(self):
         """
         Go to the file detail view, make an edit to a translation, and submit.
@@ -598,6 +733,47 @@ class FileListViewTests(POFileTestCase, WebTest):
         self.assertEqual(stats_results['filename'], self.pofile_path)
 
 
+class SearchViewTests(SearchIndexTestMixin, POFileTestCase, WebTest):
+
+    def setUp(self):
+        super(SearchViewTests, self).setUp()
+
+        self.admin_user = AdminFactory.create()
+        self.user = UserFactory.create()
+        self.url = reverse('mobetta:search')
+
+    def test_login_required(self):
+        self.app.get(self.url, status=302)
+
+    def test_search(self):
+        form = self.app.get(reverse('mobetta:language_list'), user=self.admin_user).forms['search-all']
+        form['q'] = 'translation'
+        response = form.submit()
+
+        # the index is refreshed by a job on the first search
+        self.assertEqual(Job.objects.get().name, 'update_search_index')
+        link = response.html.tbody.find('a')
+        self.assertEqual(link.text, 'tests')
+        self.assertEqual(link['href'], '/mobetta/file/{}/?search_tags=String+2'.format(self.transfile.pk))
+        self.assertContains(response, 'Translation of string 2')
+
+        response = self.app.get(self.url, {'q': 'translation'}, user=self.admin_user)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertContains(response, 'Translation of string 2')
+
+    def test_search_pages(self):
+        with mock.patch('mobetta.views.SearchView.paginate_by', 3):
+            response = self.app.get(self.url, {'q': 'string'}, user=self.admin_user)
+            self.assertEqual(len(response.html.tbody.find_all('tr')), 3)
+
+            response = response.click(href='page=2')
+            self.assertEqual(len(response.html.tbody.find_all('tr')), 1)
+
+    def test_only_translatable_languages(self):
+        response = self.app.get(self.url, {'q': 'translation'}, user=self.user)
+        self.assertContains(response, 'No messages found.')
+
+
 def get_column(response, column_name):
     """
     Return a list of BeautifulSoup <td> Tag for a given column name.
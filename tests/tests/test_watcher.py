@@ -0,0 +1,189 @@
+import os
+import threading
+
+from django.test import TestCase
+from django.utils.six import text_type
+
+from mobetta import cache, jobs
+from mobetta.cache import get_catalog_cache, get_current_signature
+from mobetta.conf import settings as mobetta_settings
+from mobetta.files import atomic_write
+from mobetta.models import Job, TranslationFile
+from mobetta.patching import mark_changed
+from mobetta.search_index import get_search_index, refresh_search_index
+from mobetta.watcher import (
+    InotifyWatcher, PollingWatcher, _load_libc, refresh_changed_files,
+    start_watcher, stop_watcher
+)
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from .test_search_index import SearchIndexTestMixin
+from .utils import POFileTestCase
+
+
+def rewrite(path, old, new):
+    with open(path, 'rb') as f:
+        content = f.read()
+    atomic_write(path, content.replace(old, new))
+
+
+class WatcherTests(POFileTestCase):
+
+    def setUp(self):
+        super(WatcherTests, self).setUp()
+        self.changed = []
+        self.watcher = PollingWatcher(callback=self.changed.extend)
+        self.addCleanup(cache.set_file_watcher, None)
+
+    def test_check(self):
+        self.watcher.update_paths()
+        self.assertEqual(self.watcher.watched, {self.pofile_path})
+        # files that weren't seen before aren't reported as changed
+        self.assertEqual(self.changed, [])
+
+        self.assertEqual(self.watcher.check([self.pofile_path]), [])
+        rewrite(self.pofile_path, b'Translation of string 2', b'Vertaling van tekst 2')
+        self.assertEqual(self.watcher.check([self.pofile_path]), [self.pofile_path])
+        self.assertEqual(self.changed, [self.pofile_path])
+
+    def test_current_signature(self):
+        self.watcher.update_paths()
+        cache.set_file_watcher(self.watcher)
+        signature = get_current_signature(self.pofile_path)
+
+        rewrite(self.pofile_path, b'Translation of string 2', b'Vertaling van tekst 2')
+
+        # the watcher didn't see the change yet
+        self.assertEqual(get_current_signature(self.pofile_path), signature)
+        self.watcher.check([self.pofile_path])
+        self.assertEqual(get_current_signature(self.pofile_path), cache.get_file_signature(self.pofile_path))
+        # files that aren't watched are checked on disk
+        self.assertIsNone(get_current_signature('/does/not/exist/django.po'))
+
+    def test_saved_files_are_seen_right_away(self):
+        self.watcher.update_paths()
+        cache.set_file_watcher(self.watcher)
+        self.transfile.get_catalog()
+        self.transfile.get_statistics()
+
+        pofile = self.transfile.get_polib_object(for_update=True)
+        entry = pofile.find('String 1')
+        entry.msgstr = 'Tekst 1'
+        mark_changed(pofile, entry)
+        self.transfile.save_polib_object(pofile)
+
+        self.assertEqual(get_current_signature(self.pofile_path), cache.get_file_signature(self.pofile_path))
+        self.assertEqual(self.transfile.get_catalog()[0].msgstr, 'Tekst 1')
+        with mock.patch.object(TranslationFile, 'refresh_statistics') as refresh_statistics:
+            self.transfile.get_statistics()
+        refresh_statistics.assert_not_called()
+
+    def test_files_that_are_no_longer_valid(self):
+        self.watcher.update_paths()
+        self.transfile.is_valid = False
+        self.transfile.save()
+
+        self.watcher.update_paths()
+
+        self.assertEqual(self.watcher.watched, set())
+        self.assertEqual(self.watcher.signatures, {})
+
+
+class RefreshChangedFilesTests(SearchIndexTestMixin, POFileTestCase):
+
+    def test_refresh_changed_files(self):
+        refresh_search_index()
+        self.transfile.get_catalog()
+        signature = cache.get_file_signature(self.pofile_path)
+        self.assertEqual(self.transfile.get_statistics()['translated_messages'], 2)
+
+        rewrite(self.pofile_path, b'comment"\nmsgstr ""', b'comment"\nmsgstr "Tekst 3"')
+        refresh_changed_files([self.pofile_path])
+
+        # the catalog of the old version of the file isn't cached anymore
+        self.assertIsNone(get_catalog_cache().lookup('reader:{}'.format(self.pofile_path), signature))
+        self.transfile.refresh_from_db()
+        self.assertEqual(self.transfile.translated_messages, 3)
+        self.assertEqual(
+            [text_type(result.msgid) for result in get_search_index().search('tekst')],
+            ['String 3 with comment'],
+        )
+
+    @mock.patch.object(jobs, '_job_runner', jobs.DatabaseJobRunner())
+    def test_one_job_for_all_processes(self):
+        # the watchers of all processes see the same change
+        refresh_changed_files([self.pofile_path])
+        refresh_changed_files([self.pofile_path])
+
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.status), ('refresh_translation_files', Job.PENDING))
+
+
+class InotifyWatcherTests(POFileTestCase):
+
+    def setUp(self):
+        super(InotifyWatcherTests, self).setUp()
+        if _load_libc() is None:
+            self.skipTest("inotify is not available")
+
+    def test_inotify(self):
+        ready = threading.Event()
+        changed = threading.Event()
+        watcher = InotifyWatcher(delay=0, callback=lambda paths: changed.set())
+
+        def update_paths():
+            # the watcher thread has its own database connection, which can't
+            # see the translation files of this test
+            watcher.watched = watcher.update_watches({self.pofile_path})
+            watcher.check(watcher.watched)
+            ready.set()
+
+        watcher.update_paths = update_paths
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        self.assertTrue(ready.wait(5))
+
+        rewrite(self.pofile_path, b'Translation of string 2', b'Vertaling van tekst 2')
+
+        self.assertTrue(changed.wait(5))
+        self.assertEqual(watcher.get_signature(self.pofile_path), cache.get_file_signature(self.pofile_path))
+
+
+class WatcherPerProcessTests(TestCase):
+
+    def setUp(self):
+        for name, value in [('FILE_WATCHER', 'mobetta.watcher.PollingWatcher'), ('FILE_WATCHER_OPTIONS', {})]:
+            patcher = mock.patch.object(mobetta_settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # no watcher was started or stopped in this process yet
+        patcher = mock.patch.object(cache, '_file_watcher', (None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(PollingWatcher, 'update_paths')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(stop_watcher)
+
+    def test_started_on_first_use(self):
+        watcher = cache.get_file_watcher()
+
+        self.assertIsInstance(watcher, PollingWatcher)
+        self.assertEqual(watcher.pid, os.getpid())
+        self.assertIs(cache.get_file_watcher(), watcher)
+
+    def test_watcher_of_parent_process_is_replaced(self):
+        inherited = start_watcher()
+        # as if this process was forked after the watcher was started
+        inherited.pid = os.getpid() + 1
+        cache._file_watcher = (inherited, inherited.pid)
+
+        watcher = cache.get_file_watcher()
+
+        self.assertIsNot(watcher, inherited)
+        self.assertEqual(watcher.pid, os.getpid())
+        self.assertTrue(inherited._stopped.is_set())
@@ -7,9 +7,18 @@ from django.test import TestCase
 
 from polib import POEntry
 
+from mobetta.cache import get_catalog_cache
+from mobetta.files import get_lock_path
 from mobetta.models import TranslationFile
 
 
+def remove_pofile(path):
+    # along with the lock file left next to it by saves
+    for filepath in (path, get_lock_path(path)):
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
 class POFileTestCase(TestCase):
     """
     Base class that creates a new copy of a .po file before each test
@@ -29,13 +38,15 @@ class POFileTestCase(TestCase):
 
         self.pofile_path = os.path.join(trans_dir, 'django.po')
 
+        # tests may modify cached catalogs without saving them
+        get_catalog_cache().clear()
         TranslationFile.objects.all().delete()
         call_command('locate_translation_files')
 
         self.transfile = TranslationFile.objects.get(filepath=self.pofile_path)
 
     def tearDown(self):
-        os.remove(self.pofile_path)
+        remove_pofile(self.pofile_path)
 
         TranslationFile.objects.all().delete()
 
@@ -48,7 +59,7 @@ class POFileTestCase(TestCase):
         if fuzzy:
             entry.flags.append('fuzzy')
 
-        po = self.transfile.get_polib_object()
+        po = self.transfile.get_polib_object(for_update=True)
         po.append(entry)
         po.save(self.pofile_path)
 
@@ -70,12 +81,13 @@ class MultiplePOFilesTestCase(TestCase):
 
             shutil.copy(os.path.join(pofiles_dir, filename), os.path.join(trans_dir, 'django.po'))
 
+        get_catalog_cache().clear()
         TranslationFile.objects.all().delete()
         call_command('locate_translation_files')
 
     def tearDown(self):
         for filename, language_code in self.test_pofiles:
             trans_dir = os.path.join(settings.PROJECT_DIR, 'locale', language_code, 'LC_MESSAGES')
-            os.remove(os.path.join(trans_dir, 'django.po'))
+            remove_pofile(os.path.join(trans_dir, 'django.po'))
 
         TranslationFile.objects.all().delete()